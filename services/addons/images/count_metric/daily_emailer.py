@@ -1,6 +1,9 @@
 import os
 import logging
+import functools
 import gen_email
+import mongo_counter
+import parallel
 from common.emailSender import EmailSender
 import common.pgquery as pgquery
 from common.email_util import get_email_list
@@ -10,78 +13,107 @@ from pymongo import MongoClient
 message_types = ["BSM", "TIM", "Map", "SPaT", "SRM", "SSM"]
 
 
-# Modify the rsu_dict with the specified date range's mongoDB "in" counts for each message type
-# The rsu_dict is modified in place
-def query_mongo_in_counts(rsu_dict, start_dt, end_dt, mongo_db):
-    for type in message_types:
-        collection = mongo_db[f"OdeRawEncoded{type.upper()}Json"]
-        # Perform mongoDB aggregate query
-        agg_result = collection.aggregate(
-            [
-                {
-                    "$match": {
-                        "recordGeneratedAt": {
-                            "$gte": start_dt,
-                            "$lt": end_dt,
-                        }
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": "$metadata.originIp",
-                        "count": {"$sum": 1},
+# Returns a dict of each RSU's message count in the collection over the specified date range
+def query_collection_counts(collection, start_dt, end_dt):
+    # Perform mongoDB aggregate query
+    agg_result = collection.aggregate(
+        [
+            {
+                "$match": {
+                    "recordGeneratedAt": {
+                        "$gte": start_dt,
+                        "$lt": end_dt,
                     }
-                },
-            ]
-        )
-        for record in agg_result:
-            if not record["_id"]:
-                continue
-            rsu_ip = record["_id"]
-            count = record["count"]
-
-            logging.debug(f"{type.title()} In count received for {rsu_ip}: {count}")
-
-            # If the RSU is a part of the organization, add it to the rsu_dict
-            if rsu_ip in rsu_dict:
-                rsu_dict[rsu_ip]["counts"][type]["in"] = count
+                }
+            },
+            {
+                "$group": {
+                    "_id": "$metadata.originIp",
+                    "count": {"$sum": 1},
+                }
+            },
+        ]
+    )
+    return {record["_id"]: record["count"] for record in agg_result if record["_id"]}
 
 
-# Modify the rsu_dict with the specified date range's mongoDB "out" counts for each message type
-# The rsu_dict is modified in place
-def query_mongo_out_counts(rsu_dict, start_dt, end_dt, mongo_db):
+# Returns the "out" counts of each message type the daily counter has counted past end_dt, read from
+# its CVCounts windows instead of the raw collection
+def query_cvcounts_out_counts(start_dt, end_dt, mongo_db):
+    types = []
     for type in message_types:
-        collection = mongo_db[f"Ode{type.title()}Json"]
-        # Perform mongoDB aggregate query
-        agg_result = collection.aggregate(
-            [
-                {
-                    "$match": {
-                        "recordGeneratedAt": {
-                            "$gte": start_dt,
-                            "$lt": end_dt,
-                        }
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": "$metadata.originIp",
-                        "count": {"$sum": 1},
-                    }
-                },
-            ]
-        )
-        for record in agg_result:
-            if not record["_id"]:
-                continue
-            rsu_ip = record["_id"]
-            count = record["count"]
+        checkpoint = mongo_counter.get_checkpoint(mongo_db, type)
+        if checkpoint and checkpoint >= end_dt:
+            types.append(type)
+    if not types:
+        return {}
+
+    agg_result = mongo_db["CVCounts"].aggregate(
+        [
+            {
+                "$match": {
+                    "messageType": {"$in": types},
+                    "timestamp": {
+                        "$gte": start_dt,
+                        "$lt": end_dt,
+                    },
+                }
+            },
+            {
+                "$group": {
+                    "_id": {"messageType": "$messageType", "rsuIp": "$rsuIp"},
+                    "count": {"$sum": "$count"},
+                }
+            },
+        ]
+    )
+    counts = {type: {} for type in types}
+    for record in agg_result:
+        counts[record["_id"]["messageType"]][record["_id"]["rsuIp"]] = record["count"]
+    return counts
+
+
+# Returns the specified date range's mongoDB "in" and "out" counts of every RSU for each message type.
+# The counts are queried once and shared by every organization's report.
+def query_mongo_counts(start_dt, end_dt, mongo_db):
+    out_counts = {}
+    if os.getenv("EMAILER_USE_CVCOUNTS", "False") == "True":
+        out_counts = query_cvcounts_out_counts(start_dt, end_dt, mongo_db)
+
+    counts = {
+        type: {"in": {}, "out": out_counts.get(type, {})} for type in message_types
+    }
+    collections = {}
+    for type in message_types:
+        collections[f"OdeRawEncoded{type.upper()}Json"] = (type, "in")
+        if type not in out_counts:
+            collections[f"Ode{type.title()}Json"] = (type, "out")
+
+    collection_counts = parallel.run_parallel(
+        {
+            collection_name: functools.partial(
+                query_collection_counts, mongo_db[collection_name], start_dt, end_dt
+            )
+            for collection_name in collections
+        }
+    )
+    for collection_name, rsu_counts in collection_counts.items():
+        type, direction = collections[collection_name]
+        counts[type][direction] = rsu_counts
+    return counts
 
-            logging.debug(f"{type.title()} Out count received for {rsu_ip}: {count}")
 
-            # If the RSU is a part of the organization, add it to the rsu_dict
-            if rsu_ip in rsu_dict:
-                rsu_dict[rsu_ip]["counts"][type]["out"] = count
+# Modify the rsu_dict with the counts of the RSUs that are a part of the organization
+# The rsu_dict is modified in place
+def add_rsu_counts(rsu_dict, counts):
+    for type, directions in counts.items():
+        for direction, rsu_counts in directions.items():
+            for rsu_ip, count in rsu_counts.items():
+                if rsu_ip in rsu_dict:
+                    logging.debug(
+                        f"{type.title()} {direction.title()} count received for {rsu_ip}: {count}"
+                    )
+                    rsu_dict[rsu_ip]["counts"][type][direction] = count
 
 
 def prepare_org_rsu_dict():
@@ -159,10 +191,12 @@ def run_daily_emailer():
     # Grab the RSU dictionary for each CV Manager organization to build separate reports
     org_rsu_dict = prepare_org_rsu_dict()
 
+    # Query the counts of every RSU once and share them between the organizations
+    counts = query_mongo_counts(start_dt, end_dt, mongo_db)
+
     for org_name, rsu_dict in org_rsu_dict.items():
         # Populate rsu_dict with counts from mongoDB
-        query_mongo_in_counts(rsu_dict, start_dt, end_dt, mongo_db)
-        query_mongo_out_counts(rsu_dict, start_dt, end_dt, mongo_db)
+        add_rsu_counts(rsu_dict, counts)
 
         # Generate the email content with the populated rsu_dict
         email_body = gen_email.generate_email_body(
@@ -1,80 +1,139 @@
 import os
 import logging
-from pymongo import MongoClient
+import functools
+import parallel
+from pymongo import MongoClient, UpdateOne, ASCENDING
 from datetime import datetime, timedelta
 
 message_types = ["BSM", "TIM", "Map", "SPaT", "SRM", "SSM", "PSM"]
 
+# Each message type's counts are complete up to the high-water mark stored in this collection, so a
+# run only aggregates the hourly windows that closed since the previous run
+checkpoint_collection = "CVCountsCheckpoints"
+
+
+def get_checkpoint(mongo_db, message_type):
+    checkpoint = mongo_db[checkpoint_collection].find_one({"_id": message_type})
+    return checkpoint["processedUntil"] if checkpoint else None
+
+
+def set_checkpoint(mongo_db, message_type, end_dt):
+    mongo_db[checkpoint_collection].update_one(
+        {"_id": message_type}, {"$set": {"processedUntil": end_dt}}, upsert=True
+    )
+
+
 def write_counts(mongo_db, counts):
     try:
         if not counts:
             logging.info("Counts list is empty")
         else:
             output_collection = mongo_db["CVCounts"]
-            output_collection.insert_many(counts)
-            logging.debug(f"Inserted {len(counts)} records into CVCounts collection")
+            # Upserting on the window key keeps reruns of a window from duplicating its counts
+            output_collection.bulk_write(
+                [
+                    UpdateOne(
+                        {
+                            "messageType": count["messageType"],
+                            "rsuIp": count["rsuIp"],
+                            "timestamp": count["timestamp"],
+                        },
+                        {"$set": {"count": count["count"]}},
+                        upsert=True,
+                    )
+                    for count in counts
+                ],
+                ordered=False,
+            )
+            logging.debug(f"Upserted {len(counts)} records into CVCounts collection")
+        return True
     except Exception as e:
         logging.error(f"Error writing counts to MongoDB: {e}")
+        return False
 
 
 def count_query(mongo_db, message_type, start_dt, end_dt):
     collection = mongo_db[f"Ode{message_type.capitalize()}Json"]
     logging.debug(f"Counting {message_type} messages in {collection.name}")
     counts = []
-    try:
-        # Perform mongoDB aggregate query
-        agg_result = collection.aggregate(
-            [
-                {
-                    "$match": {
-                        "recordGeneratedAt": {
-                            "$gte": start_dt,
-                            "$lt": end_dt,
-                        }
-                    }
-                },
-                {
-                    "$group": {
-                        "_id": "$metadata.originIp",
-                        "count": {"$sum": 1},
+    # Perform mongoDB aggregate query, grouping the messages into hourly windows per RSU
+    agg_result = collection.aggregate(
+        [
+            {
+                "$match": {
+                    "recordGeneratedAt": {
+                        "$gte": start_dt,
+                        "$lt": end_dt,
                     }
-                },
-            ]
-        )
-
-        for record in agg_result:
-            if not record["_id"]:
-                continue
-            count_record = {
-                "messageType": message_type,
-                "rsuIp": record["_id"],
-                "timestamp": start_dt,
-                "count": record["count"],
-            }
-            counts.append(count_record)
-
-        logging.debug(f"Found {len(counts)} {message_type} records")
-        return counts
+                }
+            },
+            {
+                "$group": {
+                    "_id": {
+                        "rsuIp": "$metadata.originIp",
+                        "timestamp": {
+                            "$dateTrunc": {"date": "$recordGeneratedAt", "unit": "hour"}
+                        },
+                    },
+                    "count": {"$sum": 1},
+                }
+            },
+        ]
+    )
+
+    for record in agg_result:
+        if not record["_id"]["rsuIp"]:
+            continue
+        count_record = {
+            "messageType": message_type,
+            "rsuIp": record["_id"]["rsuIp"],
+            "timestamp": record["_id"]["timestamp"],
+            "count": record["count"],
+        }
+        counts.append(count_record)
+
+    logging.debug(f"Found {len(counts)} {message_type} records")
+    return counts
+
+
+def count_message_type(mongo_db, message_type, end_dt):
+    # Without a checkpoint, start with the trailing 24 hours
+    start_dt = get_checkpoint(mongo_db, message_type) or end_dt - timedelta(days=1)
+    if start_dt >= end_dt:
+        logging.debug(f"{message_type} counts are up to date")
+        return
+
+    logging.info(
+        f"Making {message_type} counts for time period: {start_dt.strftime('%Y-%m-%d %H:%M:%S')} to {end_dt.strftime('%Y-%m-%d %H:%M:%S')}"
+    )
+    try:
+        counts = count_query(mongo_db, message_type, start_dt, end_dt)
     except Exception as e:
         logging.error(f"Error counting {message_type} messages: {e}")
-        return counts
+        return
+
+    # The checkpoint only advances once the window's counts are written
+    if write_counts(mongo_db, counts):
+        set_checkpoint(mongo_db, message_type, end_dt)
 
 
 def run_mongo_counter(mongo_db):
-    start_dt = (datetime.now() - timedelta(days=1)).replace(
-        minute=0, second=0, microsecond=0
+    # Only count windows that closed at least COUNTER_DELAY_MINUTES ago so late messages are included
+    delay = timedelta(minutes=int(os.getenv("COUNTER_DELAY_MINUTES", 5)))
+    end_dt = (datetime.now() - delay).replace(minute=0, second=0, microsecond=0)
+    mongo_db["CVCounts"].create_index(
+        [("messageType", ASCENDING), ("rsuIp", ASCENDING), ("timestamp", ASCENDING)]
     )
-    end_dt = (datetime.now()).replace(minute=0, second=0, microsecond=0)
-
-    logging.info(f"Making counts for time period: {start_dt.strftime("%Y-%m-%d %H:%M:%S")} to {end_dt.strftime("%Y-%m-%d %H:%M:%S")}")
 
-    rsu_counts = []
-    for message_type in message_types:
-        # Append counts to list so they can be written to MongoDB in one request
-        rsu_counts = rsu_counts + count_query(mongo_db, message_type, start_dt, end_dt)
-
-    logging.info("Writing counts to MongoDB")
-    write_counts(mongo_db, rsu_counts)
+    # Every message type is counted from its own collection, so they are aggregated in parallel
+    parallel.run_parallel(
+        {
+            message_type: functools.partial(
+                count_message_type, mongo_db, message_type, end_dt
+            )
+            for message_type in message_types
+        }
+    )
 
 
 if __name__ == "__main__":
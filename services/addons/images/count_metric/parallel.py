@@ -0,0 +1,31 @@
+import os
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Number of collections aggregated at the same time. MongoClient is thread-safe, so every worker
+# shares the caller's client and its connection pool.
+max_workers = int(os.getenv("COUNT_METRIC_WORKERS", 7))
+
+
+def run_timed(name, task):
+    start = time.perf_counter()
+    try:
+        return task()
+    finally:
+        logging.info(f"{name} finished in {time.perf_counter() - start:.2f} seconds")
+
+
+# Runs every task in a dict of names to callables on a thread pool and returns a dict of the names
+# to each task's result. An exception raised by a task is raised again here.
+def run_parallel(tasks):
+    if not tasks:
+        return {}
+    with ThreadPoolExecutor(
+        max_workers=max(1, min(max_workers, len(tasks))),
+        thread_name_prefix="count_metric",
+    ) as executor:
+        futures = {
+            name: executor.submit(run_timed, name, task) for name, task in tasks.items()
+        }
+        return {name: future.result() for name, future in futures.items()}
@@ -0,0 +1,184 @@
+import os
+import logging
+import functools
+import parallel
+from pymongo import MongoClient, ASCENDING
+from datetime import datetime, timedelta
+
+message_types = ["BSM", "TIM", "Map", "SPaT", "SRM", "SSM", "PSM"]
+
+# Rollup tiers from finest to coarsest. The hourly tier is counted from the raw ODE collections and
+# every other tier is summed from the tier before it.
+tiers = [
+    ("hour", "CVCountsHourly"),
+    ("day", "CVCountsDaily"),
+    ("month", "CVCountsMonthly"),
+]
+
+
+def floor_dt(dt, unit):
+    dt = dt.replace(minute=0, second=0, microsecond=0)
+    if unit in ("day", "month"):
+        dt = dt.replace(hour=0)
+    if unit == "month":
+        dt = dt.replace(day=1)
+    return dt
+
+
+def next_dt(dt, unit):
+    if unit == "hour":
+        return dt + timedelta(hours=1)
+    if unit == "day":
+        return dt + timedelta(days=1)
+    return (dt.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def ceil_dt(dt, unit):
+    floored = floor_dt(dt, unit)
+    return floored if floored == dt else next_dt(floored, unit)
+
+
+def merge_stage(collection_name):
+    # Recounted windows overwrite their previous count, so rerunning a window is idempotent
+    return {
+        "$merge": {
+            "into": collection_name,
+            "on": ["messageType", "rsuIp", "timestamp"],
+            "whenMatched": "merge",
+            "whenNotMatched": "insert",
+        }
+    }
+
+
+def ensure_indexes(mongo_db):
+    # $merge requires a unique index on its "on" fields, which also serves the API's count queries
+    for _, collection_name in tiers:
+        mongo_db[collection_name].create_index(
+            [
+                ("messageType", ASCENDING),
+                ("rsuIp", ASCENDING),
+                ("timestamp", ASCENDING),
+            ],
+            unique=True,
+        )
+
+
+def rollup_hourly(mongo_db, message_type, start_dt, end_dt):
+    collection = mongo_db[f"Ode{message_type.capitalize()}Json"]
+    logging.debug(f"Rolling up hourly {message_type} counts from {collection.name}")
+    try:
+        collection.aggregate(
+            [
+                {
+                    "$match": {
+                        "recordGeneratedAt": {
+                            "$gte": start_dt,
+                            "$lt": end_dt,
+                        }
+                    }
+                },
+                {
+                    "$group": {
+                        "_id": {
+                            "rsuIp": "$metadata.originIp",
+                            "timestamp": {
+                                "$dateTrunc": {
+                                    "date": "$recordGeneratedAt",
+                                    "unit": "hour",
+                                }
+                            },
+                        },
+                        "count": {"$sum": 1},
+                    }
+                },
+                {"$match": {"_id.rsuIp": {"$nin": [None, ""]}}},
+                {
+                    "$project": {
+                        "_id": 0,
+                        "messageType": {"$literal": message_type},
+                        "rsuIp": "$_id.rsuIp",
+                        "timestamp": "$_id.timestamp",
+                        "count": 1,
+                    }
+                },
+                merge_stage(tiers[0][1]),
+            ]
+        )
+    except Exception as e:
+        logging.error(f"Error rolling up hourly {message_type} counts: {e}")
+
+
+def rollup_tier(mongo_db, source_name, target_name, unit, start_dt, end_dt):
+    logging.debug(f"Rolling up {source_name} into {target_name}")
+    try:
+        mongo_db[source_name].aggregate(
+            [
+                {"$match": {"timestamp": {"$gte": start_dt, "$lt": end_dt}}},
+                {
+                    "$group": {
+                        "_id": {
+                            "messageType": "$messageType",
+                            "rsuIp": "$rsuIp",
+                            "timestamp": {
+                                "$dateTrunc": {"date": "$timestamp", "unit": unit}
+                            },
+                        },
+                        "count": {"$sum": "$count"},
+                    }
+                },
+                {
+                    "$project": {
+                        "_id": 0,
+                        "messageType": "$_id.messageType",
+                        "rsuIp": "$_id.rsuIp",
+                        "timestamp": "$_id.timestamp",
+                        "count": 1,
+                    }
+                },
+                merge_stage(target_name),
+            ]
+        )
+    except Exception as e:
+        logging.error(f"Error rolling up {source_name} into {target_name}: {e}")
+
+
+def run_rollups(mongo_db, start_dt, end_dt):
+    # Recounts every hour in the range, then every day and month that overlaps those hours
+    ensure_indexes(mongo_db)
+
+    unit, source_name = tiers[0]
+    start_dt = floor_dt(start_dt, unit)
+    end_dt = ceil_dt(end_dt, unit)
+    logging.info(
+        f"Rolling up counts for time period: {start_dt.strftime('%Y-%m-%d %H:%M:%S')} to {end_dt.strftime('%Y-%m-%d %H:%M:%S')}"
+    )
+    parallel.run_parallel(
+        {
+            message_type: functools.partial(
+                rollup_hourly, mongo_db, message_type, start_dt, end_dt
+            )
+            for message_type in message_types
+        }
+    )
+
+    for unit, target_name in tiers[1:]:
+        rollup_tier(
+            mongo_db,
+            source_name,
+            target_name,
+            unit,
+            floor_dt(start_dt, unit),
+            ceil_dt(end_dt, unit),
+        )
+        source_name = target_name
+
+
+if __name__ == "__main__":
+    logging.info("Starting the MongoDB count rollups")
+    client = MongoClient(os.getenv("MONGO_DB_URI"))
+    mongo_db = client[os.getenv("MONGO_DB_NAME")]
+    # Late arriving messages are picked up by recounting the previous hours along with the current one
+    lookback_hours = int(os.getenv("ROLLUP_LOOKBACK_HOURS", 2))
+    now = datetime.now()
+    run_rollups(mongo_db, now - timedelta(hours=lookback_hours), now)
+    logging.info("MongoDB count rollups have finished")
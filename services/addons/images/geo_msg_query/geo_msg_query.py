@@ -1,10 +1,38 @@
 import os
 from concurrent.futures import ThreadPoolExecutor
 import logging
+import multiprocessing
+import signal
+import threading
+import time
 from pymongo import MongoClient, DESCENDING, GEOSPHERE
+from pymongo.errors import BulkWriteError, OperationFailure
 from datetime import datetime
 import traceback
 
+# Each watcher's resume token is saved in this collection so a restarted watcher continues after the
+# last change it handled instead of missing the changes made while it was down
+resume_token_collection = os.getenv("GEO_RESUME_TOKEN_COLLECTION", "GeoMsgResumeTokens")
+resume_token_interval = float(os.getenv("GEO_RESUME_TOKEN_INTERVAL", 10))
+restart_delay_min = 1
+restart_delay_max = 60
+# Change stream error codes for a resume token that can no longer be resumed from:
+# InvalidResumeToken, ChangeStreamFatalError and ChangeStreamHistoryLost
+lost_token_codes = (260, 280, 286)
+
+# Path of the position create_message reads from each message type
+position_fields = {
+    "Bsm": "payload.data.coreData.position",
+    "Psm": "payload.data.position",
+}
+
+# Seconds between checks that every worker process is still running
+worker_check_interval = 5
+
+latest_tokens = {}
+saved_tokens = {}
+stopped = threading.Event()
+
 
 def set_mongo_client(MONGO_DB_URI, MONGO_DB):
     client = MongoClient(MONGO_DB_URI)
@@ -62,10 +90,66 @@ def create_message(original_message, msg_type):
         return None
 
 
-def process_message(message, db, collection, msg_type):
+class BufferedWriter:
+    """Buffers GeoJSON messages and inserts them into the output collection in batches.
+
+    A batch is inserted once it reaches batch_size messages, or by a background thread every
+    flush_interval seconds. Full batches are inserted by the thread that filled them, so a
+    watcher cannot read its change stream faster than MongoDB accepts the inserts.
+    """
+
+    def __init__(self, collection, batch_size=500, flush_interval=1.0):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.buffer = []
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(
+            target=self.flush_periodically, name="geo_msg_flusher", daemon=True
+        )
+        self.flusher.start()
+
+    def write(self, message):
+        with self.lock:
+            self.buffer.append(message)
+            if len(self.buffer) < self.batch_size:
+                return
+            batch = self.buffer
+            self.buffer = []
+        self.insert(batch)
+
+    def flush(self):
+        with self.lock:
+            batch = self.buffer
+            self.buffer = []
+        if batch:
+            self.insert(batch)
+
+    def insert(self, batch):
+        try:
+            self.collection.insert_many(batch, ordered=False)
+            logging.debug(f"Inserted {len(batch)} messages into {self.collection.name}")
+        except BulkWriteError as e:
+            logging.error(
+                f"Failed to insert {len(e.details.get('writeErrors', []))} of {len(batch)} messages: {e}"
+            )
+        except Exception as e:
+            logging.error(f"Failed to insert {len(batch)} messages: {e}")
+
+    def flush_periodically(self):
+        while not self.stopped.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        self.stopped.set()
+        self.flush()
+
+
+def process_message(message, writer, msg_type):
     new_message = create_message(message, msg_type)
     if new_message:
-        db[collection].insert_one(new_message)
+        writer.write(new_message)
     else:
         logging.error(
             f"process_message: Could not create a message from the input {msg_type} message: {message}"
@@ -111,30 +195,150 @@ def set_indexes(db, collection, mongo_ttl):
             logging.info("ttl_index already exists with the correct TTL value")
 
 
-def watch_collection(db, input_collection, output_collection):
-    try:
-        msg_type = input_collection.replace("Ode", "").replace("Json", "")
-        logging.info(f"Watching collection: {input_collection}")
-        count = 0
-        with db[input_collection].watch(full_document="updateLookup") as stream:
-            for change in stream:
+def load_resume_token(db, input_collection):
+    token = db[resume_token_collection].find_one({"_id": input_collection})
+    return token["token"] if token else None
+
+
+def save_resume_token(db, input_collection, token):
+    db[resume_token_collection].update_one(
+        {"_id": input_collection}, {"$set": {"token": token}}, upsert=True
+    )
+    saved_tokens[input_collection] = token
+
+
+def checkpoint(db, input_collections, writer):
+    # A token is recorded after its message is handed to the writer, so once the writer is flushed
+    # every message before the tokens read here has been inserted and the tokens can be saved
+    tokens = {
+        input_collection: latest_tokens[input_collection]
+        for input_collection in input_collections
+        if latest_tokens.get(input_collection) is not None
+        and latest_tokens[input_collection] != saved_tokens.get(input_collection)
+    }
+    writer.flush()
+    for input_collection, token in tokens.items():
+        save_resume_token(db, input_collection, token)
+
+
+def watch_name(input_collection, shard=0, shards=1):
+    return input_collection if shards == 1 else f"{input_collection}:{shard}/{shards}"
+
+
+def shard_watches(input_collections, bsm_shards):
+    # BSMs are split between bsm_shards change streams, every other collection has a single stream
+    watches = []
+    for input_collection in input_collections:
+        shards = bsm_shards if input_collection == "OdeBsmJson" else 1
+        for shard in range(shards):
+            watches.append((input_collection, shard, shards))
+    return watches
+
+
+def origin_ip_shard(shards):
+    # Sums the octets of the origin IP, so every message from an RSU lands in the same shard. Values
+    # that are not IPv4 addresses all land in shard 0.
+    octets = [
+        {
+            "$convert": {
+                "input": {
+                    "$arrayElemAt": [
+                        {"$split": ["$fullDocument.metadata.originIp", "."]},
+                        index,
+                    ]
+                },
+                "to": "int",
+                "onError": 0,
+                "onNull": 0,
+            }
+        }
+        for index in range(4)
+    ]
+    return {"$mod": [{"$sum": octets}, shards]}
+
+
+def change_stream_pipeline(msg_type, shard=0, shards=1):
+    # Only inserts are sent by the server, trimmed down to the fields create_message uses
+    positions = (
+        [position_fields[msg_type]]
+        if msg_type in position_fields
+        else list(position_fields.values())
+    )
+    project = {
+        "operationType": 1,
+        "fullDocument.metadata.originIp": 1,
+        "fullDocument.metadata.odeReceivedAt": 1,
+    }
+    for position in positions:
+        project[f"fullDocument.{position}.latitude"] = 1
+        project[f"fullDocument.{position}.longitude"] = 1
+    match = {"operationType": "insert"}
+    if shards > 1:
+        match["$expr"] = {"$eq": [origin_ip_shard(shards), shard]}
+    return [{"$match": match}, {"$project": project}]
+
+
+def watch_collection(db, input_collection, writer, shard=0, shards=1):
+    msg_type = input_collection.replace("Ode", "").replace("Json", "")
+    name = watch_name(input_collection, shard, shards)
+    resume_token = load_resume_token(db, name)
+    if resume_token:
+        logging.info(f"Watching collection: {name} from its last resume token")
+    else:
+        logging.info(f"Watching collection: {name}")
+    count = 0
+    last_checkpoint = time.monotonic()
+    # Inserts already carry the full document, so there is no need to look it up
+    with db[input_collection].watch(
+        change_stream_pipeline(msg_type, shard, shards),
+        resume_after=resume_token,
+        max_await_time_ms=1000,
+    ) as stream:
+        while stream.alive and not stopped.is_set():
+            change = stream.try_next()
+            if change is not None:
                 if change.get("operationType") in ["insert"]:
                     count += 1
                     logging.debug(f"Change: {change}")
-                    process_message(
-                        change["fullDocument"], db, output_collection, msg_type
-                    )
+                    process_message(change["fullDocument"], writer, msg_type)
                     logging.debug(f"{msg_type} Count: {count}")
                 else:
                     logging.debug(
                         f"Ignoring change with operationType: {change.get('operationType')}"
                     )
-    except Exception as e:
-        logging.error(
-            f"An error occurred while watching collection: {input_collection}"
-        )
-        logging.error(str(e))
-        logging.error(traceback.format_exc())
+                latest_tokens[name] = stream.resume_token
+
+            if time.monotonic() - last_checkpoint >= resume_token_interval:
+                checkpoint(db, [name], writer)
+                last_checkpoint = time.monotonic()
+
+
+def supervise_collection(db, input_collection, writer, shard=0, shards=1):
+    # Restarts the watcher with an increasing delay whenever it stops, until the service is stopped
+    name = watch_name(input_collection, shard, shards)
+    delay = restart_delay_min
+    while not stopped.is_set():
+        started = time.monotonic()
+        try:
+            watch_collection(db, input_collection, writer, shard, shards)
+        except Exception as e:
+            logging.error(f"An error occurred while watching collection: {name}")
+            logging.error(str(e))
+            logging.error(traceback.format_exc())
+            if isinstance(e, OperationFailure) and e.code in lost_token_codes:
+                logging.warning(
+                    f"The resume token for {name} can no longer be used, watching from the current time"
+                )
+                db[resume_token_collection].delete_one({"_id": name})
+                latest_tokens.pop(name, None)
+                saved_tokens.pop(name, None)
+
+        if time.monotonic() - started >= restart_delay_max:
+            delay = restart_delay_min
+        if stopped.wait(delay):
+            break
+        logging.info(f"Restarting the watcher for collection: {name}")
+        delay = min(delay * 2, restart_delay_max)
 
 
 def run():
@@ -167,16 +371,97 @@ def run():
 
     db = set_mongo_client(MONGO_DB_URI, MONGO_DB)
     set_indexes(db, MONGO_GEO_OUTPUT_COLLECTION, MONGO_TTL)
-    input_collections = MONGO_INPUT_COLLECTIONS.split(",")
+    input_collections = [
+        collection.strip() for collection in MONGO_INPUT_COLLECTIONS.split(",")
+    ]
+    watches = shard_watches(input_collections, int(os.getenv("GEO_BSM_SHARDS", 1)))
+    processes = max(1, min(int(os.getenv("GEO_WORKER_PROCESSES", 1)), len(watches)))
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        for collection in input_collections:
+    if processes == 1:
+        run_worker(watches, MONGO_DB_URI, MONGO_DB, MONGO_GEO_OUTPUT_COLLECTION, db)
+    else:
+        partitions = [watches[index::processes] for index in range(processes)]
+        run_workers(partitions, MONGO_DB_URI, MONGO_DB, MONGO_GEO_OUTPUT_COLLECTION)
+
+
+def run_worker(watches, mongo_db_uri, mongo_db, output_collection, db=None):
+    # Watches each (collection, shard, shards) in watches on its own thread, sharing one client and
+    # one writer
+    if db is None:
+        log_level = os.environ.get("LOGGING_LEVEL", "INFO")
+        logging.basicConfig(format="%(levelname)s:%(message)s", level=log_level)
+        db = set_mongo_client(mongo_db_uri, mongo_db)
+
+    writer = BufferedWriter(
+        db[output_collection],
+        batch_size=int(os.getenv("GEO_WRITE_BATCH_SIZE", 500)),
+        flush_interval=float(os.getenv("GEO_WRITE_FLUSH_INTERVAL", 1.0)),
+    )
+    names = [watch_name(*watch) for watch in watches]
+
+    # The watcher threads never return, so buffered messages are flushed and the resume tokens are
+    # saved before exiting on a signal
+    def shutdown(signum, frame):
+        logging.info("Shutting down, flushing buffered messages")
+        stopped.set()
+        checkpoint(db, names, writer)
+        writer.close()
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    with ThreadPoolExecutor(max_workers=len(watches)) as executor:
+        for input_collection, shard, shards in watches:
             executor.submit(
-                watch_collection,
+                supervise_collection,
                 db,
-                collection.strip(),
-                MONGO_GEO_OUTPUT_COLLECTION,
+                input_collection,
+                writer,
+                shard,
+                shards,
+            )
+
+
+def run_workers(partitions, mongo_db_uri, mongo_db, output_collection):
+    # Runs a worker process per partition of the watches, each with its own client and writer, and
+    # restarts any worker that exits. Workers are spawned rather than forked so they never inherit
+    # the parent's MongoClient.
+    context = multiprocessing.get_context("spawn")
+    workers = [None] * len(partitions)
+
+    def shutdown(signum, frame):
+        logging.info("Shutting down the worker processes")
+        stopped.set()
+        for worker in workers:
+            if worker is not None and worker.is_alive():
+                worker.terminate()
+        for worker in workers:
+            if worker is not None:
+                worker.join()
+        os._exit(0)
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    while not stopped.is_set():
+        for index, partition in enumerate(partitions):
+            worker = workers[index]
+            if worker is not None and worker.is_alive():
+                continue
+            if worker is not None:
+                logging.error(
+                    f"Worker {index} exited with code {worker.exitcode}, restarting"
+                )
+            names = ", ".join(watch_name(*watch) for watch in partition)
+            logging.info(f"Starting worker {index} for: {names}")
+            workers[index] = context.Process(
+                target=run_worker,
+                args=(partition, mongo_db_uri, mongo_db, output_collection),
+                name=f"geo_msg_query_{index}",
             )
+            workers[index].start()
+        stopped.wait(worker_check_interval)
 
 
 if __name__ == "__main__":
@@ -1,7 +1,7 @@
 from typing import Any
 from fastapi import FastAPI, Request, Response, HTTPException, Depends
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from common import gcs_utils, pgquery
+from common import gcs_utils, pgquery_async
 import commsignia_manifest
 import os
 import glob
@@ -125,24 +125,18 @@ async def read_file(
         raise HTTPException(status_code=500, detail="Error reading file")
 
 
-def removed_old_logs(serialnum: str):
+async def removed_old_logs(serialnum: str):
     try:
         max_count = int(os.getenv("MAX_COUNT", 10))
-        success_count = pgquery.query_db(
-            f"SELECT COUNT(*) FROM public.obu_ota_requests WHERE obu_sn = '{serialnum}' AND error_status = B'0'"
+        # Keep the newest max_count successful requests and delete the rest in a single statement
+        await pgquery_async.write_db(
+            "DELETE FROM public.obu_ota_requests WHERE request_id IN ("
+            "SELECT request_id FROM public.obu_ota_requests WHERE obu_sn = :serialnum AND error_status = B'0' "
+            "ORDER BY request_datetime DESC OFFSET :max_count"
+            ")",
+            {"serialnum": serialnum, "max_count": max_count},
         )
-        if success_count[0][0] > max_count:
-            excess_count = success_count[0][0] - max_count
-            oldest_entries = pgquery.query_db(
-                f"SELECT request_id FROM public.obu_ota_requests WHERE obu_sn = '{serialnum}' AND error_status = B'0' ORDER BY request_datetime ASC LIMIT {excess_count}"
-            )
-            oldest_ids = [entry[0] for entry in oldest_entries]
-            pgquery.write_db(
-                f"DELETE FROM public.obu_ota_requests WHERE request_id IN ({','.join(map(str, oldest_ids))})"
-            )
-            logging.debug(
-                f"removed_old_logs: Removed {excess_count} old logs for serialnum: {serialnum}"
-            )
+        logging.debug(f"removed_old_logs: Removed old logs for serialnum: {serialnum}")
     except Exception as e:
         logging.error(f"removed_old_logs: Error removing old entry: {e}")
 
@@ -162,11 +156,25 @@ async def log_request(
         origin_ip = request.client.host
 
         current_dt = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        query = f"INSERT INTO public.obu_ota_requests (obu_sn, manufacturer, request_datetime, origin_ip, obu_firmware_version, requested_firmware_version, error_status, error_message) VALUES\
-                ('{serialnum}', {manufacturer}, '{current_dt}', '{origin_ip}', '{version}', '{firmware_id}', B'{error_status}', '{error_message}')"
-        logging.debug(f"Logging request to postgres with insert query: \n{query}")
-        pgquery.write_db(query)
-        removed_old_logs(serialnum)
+        query = (
+            "INSERT INTO public.obu_ota_requests (obu_sn, manufacturer, request_datetime, origin_ip, obu_firmware_version, requested_firmware_version, error_status, error_message) "
+            "VALUES (:serialnum, :manufacturer, :request_datetime, :origin_ip, :version, :firmware_id, :error_status, :error_message)"
+        )
+        params = {
+            "serialnum": serialnum,
+            "manufacturer": manufacturer,
+            "request_datetime": current_dt,
+            "origin_ip": origin_ip,
+            "version": version,
+            "firmware_id": firmware_id,
+            "error_status": str(error_status),
+            "error_message": error_message,
+        }
+        logging.debug(
+            f"Logging request to postgres with insert query: \n{query} and params: {params}"
+        )
+        await pgquery_async.write_db(query, params)
+        await removed_old_logs(serialnum)
     except Exception as e:
         logging.error(f"log_request: Error logging request: {e} with query: {query}")
 
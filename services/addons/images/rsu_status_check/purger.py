@@ -5,12 +5,11 @@ import common.pgquery as pgquery
 
 
 def get_all_rsus():
-    query = "SELECT to_jsonb(row) FROM (SELECT rsu_id FROM public.rsus) AS row ORDER BY rsu_id"
-    data = pgquery.query_db(query)
+    query = "SELECT rsu_id FROM public.rsus ORDER BY rsu_id"
+    data = pgquery.query_db(query, mapping=True)
 
     rsu_obj = {}
     for row in data:
-        row = dict(row[0])
         rsu_obj[row["rsu_id"]] = None
 
     return rsu_obj
@@ -18,8 +17,6 @@ def get_all_rsus():
 
 def get_last_online_rsu_records(rsu_dict):
     query = (
-        "SELECT to_jsonb(row) "
-        "FROM ("
         "SELECT a.ping_id, a.rsu_id, a.timestamp "
         "FROM ("
         "SELECT pd.ping_id, pd.rsu_id, pd.timestamp, ROW_NUMBER() OVER (PARTITION BY pd.rsu_id order by pd.timestamp DESC) AS row_id "
@@ -27,15 +24,12 @@ def get_last_online_rsu_records(rsu_dict):
         "WHERE pd.result = '1'"
         ") AS a "
         "WHERE a.row_id <= 1 ORDER BY rsu_id"
-        ") as row"
     )
-    data = pgquery.query_db(query)
+    data = pgquery.stream_db(query, mapping=True)
 
     # Create list of RSU last online ping records
     # Tuple in the format of (ping_id, rsu_id, timestamp (UTC))
     for row in data:
-        row = dict(row[0])
-
         if row["rsu_id"] not in rsu_dict:
             # If there is ping data for a RSU not in the PostgreSQL 'rsus' table, it is most likely old and no longer tracked
             # This will allow for all of the stale ping data to be removed
@@ -43,7 +37,7 @@ def get_last_online_rsu_records(rsu_dict):
         else:
             rsu_dict[row["rsu_id"]] = {
                 "ping_id": row["ping_id"],
-                "timestamp": datetime.strptime(row["timestamp"], "%Y-%m-%dT%H:%M:%S"),
+                "timestamp": row["timestamp"],
             }
     return rsu_dict
 
@@ -1,6 +1,7 @@
 import requests
 import os
 import logging
+from datetime import datetime, timezone
 import common.pgquery as pgquery
 
 
@@ -24,13 +25,22 @@ def insert_rsu_ping(request_json):
     histories = request_json["histories"]
 
     logging.debug(f"Inserting {len(histories)} new Ping records for RsuData {rsu_id}")
-    for history in histories:
-        try:
-            query = f'INSERT INTO public.ping (timestamp, result, rsu_id) VALUES (to_timestamp({history["clock"]}), B\'{history["value"]}\', {rsu_id})'
-            pgquery.write_db(query)
-        except Exception as e:
-            logging.exception(f"Error inserting Ping record: {e}")
-            return False
+    # Zabbix clock values are epoch seconds, stored as UTC timestamps
+    rows = [
+        (
+            datetime.fromtimestamp(int(history["clock"]), timezone.utc).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            ),
+            history["value"],
+            rsu_id,
+        )
+        for history in histories
+    ]
+    try:
+        pgquery.bulk_insert("public.ping", ["timestamp", "result", "rsu_id"], rows)
+    except Exception as e:
+        logging.exception(f"Error inserting Ping records: {e}")
+        return False
 
     return True
 
@@ -4,169 +4,131 @@ from mock import MagicMock, patch
 from addons.images.count_metric import daily_emailer
 
 
-def test_query_mongo_in_counts():
-    # prepare mocks and known variables
-    mock_db = MagicMock()
+def test_query_collection_counts():
     mock_collection = MagicMock()
-    mock_db.__getitem__.side_effect = mock_collection
-    mock_collection().aggregate.return_value = [
+    mock_collection.aggregate.return_value = [
         {"_id": "10.0.0.1", "count": 5},
+        {"_id": None, "count": 3},
         {"_id": "10.0.0.2", "count": 25},
     ]
 
-    start_dt = (datetime.now() - timedelta(1)).replace(
-        hour=0, minute=0, second=0, microsecond=0
+    result = daily_emailer.query_collection_counts(
+        mock_collection, datetime(2024, 1, 1), datetime(2024, 1, 2)
     )
-    end_dt = (datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
 
-    rsu_dict = {
-        "10.0.0.1": {
-            "primary_route": "Route 1",
-            "counts": {"BSM": {"in": 0, "out": 0}},
-        }
-    }
+    assert result == {"10.0.0.1": 5, "10.0.0.2": 25}
 
-    daily_emailer.message_types = ["BSM"]
 
-    # run the command
-    daily_emailer.query_mongo_in_counts(rsu_dict, start_dt, end_dt, mock_db)
+@patch.dict(os.environ, {"EMAILER_USE_CVCOUNTS": "False"})
+@patch("addons.images.count_metric.daily_emailer.query_collection_counts")
+def test_query_mongo_counts(mock_query_collection_counts):
+    mock_db = MagicMock()
+    mock_db.__getitem__.side_effect = lambda name: name
+    mock_query_collection_counts.side_effect = lambda name, start, end: {
+        "10.0.0.1": 5 if name.startswith("OdeRawEncoded") else 4
+    }
+    start_dt = datetime(2024, 1, 1)
+    end_dt = datetime(2024, 1, 2)
 
-    # make assertions
-    mock_collection().aggregate.assert_called_once_with(
-        [
-            {
-                "$match": {
-                    "recordGeneratedAt": {
-                        "$gte": start_dt,
-                        "$lt": end_dt,
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": "$metadata.originIp",
-                    "count": {"$sum": 1},
-                }
-            },
-        ]
-    )
-    assert rsu_dict["10.0.0.1"]["counts"]["BSM"]["in"] == 5
-    assert len(rsu_dict) == 1
+    with patch.object(daily_emailer, "message_types", ["BSM", "SPaT"]):
+        result = daily_emailer.query_mongo_counts(start_dt, end_dt, mock_db)
 
-    daily_emailer.message_types = ["BSM", "TIM", "Map", "SPaT", "SRM", "SSM"]
+    assert result == {
+        "BSM": {"in": {"10.0.0.1": 5}, "out": {"10.0.0.1": 4}},
+        "SPaT": {"in": {"10.0.0.1": 5}, "out": {"10.0.0.1": 4}},
+    }
+    assert mock_query_collection_counts.call_count == 4
+    mock_query_collection_counts.assert_any_call(
+        "OdeRawEncodedBSMJson", start_dt, end_dt
+    )
+    mock_query_collection_counts.assert_any_call("OdeSpatJson", start_dt, end_dt)
 
 
-def test_query_mongo_in_counts_no_id():
-    # prepare mocks and known variables
+@patch.dict(os.environ, {"EMAILER_USE_CVCOUNTS": "True"})
+@patch("addons.images.count_metric.daily_emailer.query_cvcounts_out_counts")
+@patch("addons.images.count_metric.daily_emailer.query_collection_counts")
+def test_query_mongo_counts_cvcounts(
+    mock_query_collection_counts, mock_query_cvcounts_out_counts
+):
     mock_db = MagicMock()
-    mock_collection = MagicMock()
-    mock_db.__getitem__.side_effect = mock_collection
-    mock_collection().aggregate.return_value = [{"_id": None, "count": 5}]
-
-    start_dt = (datetime.now() - timedelta(1)).replace(
-        hour=0, minute=0, second=0, microsecond=0
-    )
-    end_dt = (datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
-
-    rsu_dict = {
-        "10.0.0.1": {
-            "primary_route": "Route 1",
-            "counts": {"BSM": {"in": 0, "out": 0}},
-        }
+    mock_db.__getitem__.side_effect = lambda name: name
+    mock_query_collection_counts.return_value = {"10.0.0.1": 5}
+    mock_query_cvcounts_out_counts.return_value = {"BSM": {"10.0.0.1": 6}}
+    start_dt = datetime(2024, 1, 1)
+    end_dt = datetime(2024, 1, 2)
+
+    with patch.object(daily_emailer, "message_types", ["BSM", "TIM"]):
+        result = daily_emailer.query_mongo_counts(start_dt, end_dt, mock_db)
+
+    assert result == {
+        "BSM": {"in": {"10.0.0.1": 5}, "out": {"10.0.0.1": 6}},
+        "TIM": {"in": {"10.0.0.1": 5}, "out": {"10.0.0.1": 5}},
     }
+    # The BSM out counts come from CVCounts instead of OdeBsmJson
+    assert mock_query_collection_counts.call_count == 3
 
-    daily_emailer.message_types = ["BSM"]
 
-    # run the command
-    daily_emailer.query_mongo_in_counts(rsu_dict, start_dt, end_dt, mock_db)
+@patch("addons.images.count_metric.daily_emailer.mongo_counter.get_checkpoint")
+def test_query_cvcounts_out_counts(mock_get_checkpoint):
+    mock_db = MagicMock()
+    mock_collection = mock_db.__getitem__.return_value
+    mock_collection.aggregate.return_value = [
+        {"_id": {"messageType": "BSM", "rsuIp": "10.0.0.1"}, "count": 6},
+        {"_id": {"messageType": "BSM", "rsuIp": "10.0.0.2"}, "count": 8},
+    ]
+    start_dt = datetime(2024, 1, 1)
+    end_dt = datetime(2024, 1, 2)
+    # Only the BSM counts have been counted through the end of the date range
+    mock_get_checkpoint.side_effect = lambda db, type: {
+        "BSM": datetime(2024, 1, 2, 6),
+        "TIM": datetime(2024, 1, 1, 20),
+    }.get(type)
 
-    # make assertions
-    assert rsu_dict["10.0.0.1"]["counts"]["BSM"]["in"] == 0
+    with patch.object(daily_emailer, "message_types", ["BSM", "TIM", "Map"]):
+        result = daily_emailer.query_cvcounts_out_counts(start_dt, end_dt, mock_db)
 
-    daily_emailer.message_types = ["BSM", "TIM", "Map", "SPaT", "SRM", "SSM"]
+    assert result == {"BSM": {"10.0.0.1": 6, "10.0.0.2": 8}}
+    mock_db.__getitem__.assert_called_with("CVCounts")
+    pipeline = mock_collection.aggregate.call_args[0][0]
+    assert pipeline[0]["$match"]["messageType"] == {"$in": ["BSM"]}
 
 
-def test_query_mongo_out_counts():
-    # prepare mocks and known variables
+@patch("addons.images.count_metric.daily_emailer.mongo_counter.get_checkpoint")
+def test_query_cvcounts_out_counts_no_checkpoints(mock_get_checkpoint):
     mock_db = MagicMock()
-    mock_collection = MagicMock()
-    mock_db.__getitem__.side_effect = mock_collection
-    mock_collection().aggregate.return_value = [
-        {"_id": "10.0.0.1", "count": 5},
-        {"_id": "10.0.0.2", "count": 25},
-    ]
+    mock_get_checkpoint.return_value = None
 
-    start_dt = (datetime.now() - timedelta(1)).replace(
-        hour=0, minute=0, second=0, microsecond=0
+    result = daily_emailer.query_cvcounts_out_counts(
+        datetime(2024, 1, 1), datetime(2024, 1, 2), mock_db
     )
-    end_dt = (datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
 
+    assert result == {}
+    mock_db.__getitem__.return_value.aggregate.assert_not_called()
+
+
+def test_add_rsu_counts():
     rsu_dict = {
         "10.0.0.1": {
             "primary_route": "Route 1",
             "counts": {"BSM": {"in": 0, "out": 0}},
         }
     }
+    counts = {
+        "BSM": {
+            "in": {"10.0.0.1": 5, "10.0.0.2": 25},
+            "out": {"10.0.0.1": 4},
+        }
+    }
 
-    daily_emailer.message_types = ["BSM"]
-
-    # run the command
-    daily_emailer.query_mongo_out_counts(rsu_dict, start_dt, end_dt, mock_db)
-
-    # make assertions
-    mock_collection().aggregate.assert_called_once_with(
-        [
-            {
-                "$match": {
-                    "recordGeneratedAt": {
-                        "$gte": start_dt,
-                        "$lt": end_dt,
-                    }
-                }
-            },
-            {
-                "$group": {
-                    "_id": f"$metadata.originIp",
-                    "count": {"$sum": 1},
-                }
-            },
-        ]
-    )
-    assert rsu_dict["10.0.0.1"]["counts"]["BSM"]["out"] == 5
-    assert len(rsu_dict) == 1
-
-    daily_emailer.message_types = ["BSM", "TIM", "Map", "SPaT", "SRM", "SSM"]
-
-
-def test_query_mongo_out_counts_no_id():
-    # prepare mocks and known variables
-    mock_db = MagicMock()
-    mock_collection = MagicMock()
-    mock_db.__getitem__.side_effect = mock_collection
-    mock_collection().aggregate.return_value = [{"_id": None, "count": 5}]
-
-    start_dt = (datetime.now() - timedelta(1)).replace(
-        hour=0, minute=0, second=0, microsecond=0
-    )
-    end_dt = (datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    daily_emailer.add_rsu_counts(rsu_dict, counts)
 
-    rsu_dict = {
+    assert rsu_dict == {
         "10.0.0.1": {
             "primary_route": "Route 1",
-            "counts": {"BSM": {"in": 0, "out": 0}},
+            "counts": {"BSM": {"in": 5, "out": 4}},
         }
     }
 
-    daily_emailer.message_types = ["BSM"]
-
-    # run the command
-    daily_emailer.query_mongo_out_counts(rsu_dict, start_dt, end_dt, mock_db)
-
-    # make assertions
-    assert rsu_dict["10.0.0.1"]["counts"]["BSM"]["out"] == 0
-
-    daily_emailer.message_types = ["BSM", "TIM", "Map", "SPaT", "SRM", "SSM"]
-
 
 @patch("addons.images.count_metric.daily_emailer.pgquery.query_db")
 def test_prepare_org_rsu_dict(mock_query_db):
@@ -238,21 +200,23 @@ def test_email_daily_counts(mock_email_list, mock_emailsender):
 @patch("addons.images.count_metric.daily_emailer.MongoClient", MagicMock())
 @patch("addons.images.count_metric.daily_emailer.gen_email.generate_email_body")
 @patch("addons.images.count_metric.daily_emailer.email_daily_counts")
-@patch("addons.images.count_metric.daily_emailer.query_mongo_out_counts")
-@patch("addons.images.count_metric.daily_emailer.query_mongo_in_counts")
+@patch("addons.images.count_metric.daily_emailer.add_rsu_counts")
+@patch("addons.images.count_metric.daily_emailer.query_mongo_counts")
 @patch("addons.images.count_metric.daily_emailer.prepare_org_rsu_dict")
 def test_run_daily_emailer(
     mock_prepare_org_rsu_dict,
-    mock_query_mongo_in_counts,
-    mock_query_mongo_out_counts,
+    mock_query_mongo_counts,
+    mock_add_rsu_counts,
     mock_email_daily_counts,
     mock_gen_email,
 ):
-    mock_prepare_org_rsu_dict.return_value = {"Test Org": {}}
+    mock_prepare_org_rsu_dict.return_value = {"Test Org": {}, "Other Org": {}}
     daily_emailer.run_daily_emailer()
 
     mock_prepare_org_rsu_dict.assert_called_once()
-    mock_query_mongo_in_counts.assert_called_once()
-    mock_query_mongo_out_counts.assert_called_once()
-    mock_email_daily_counts.assert_called_once()
-    mock_gen_email.assert_called_once()
+    # The counts are only queried once for every organization
+    mock_query_mongo_counts.assert_called_once()
+    assert mock_add_rsu_counts.call_count == 2
+    mock_add_rsu_counts.assert_called_with({}, mock_query_mongo_counts.return_value)
+    assert mock_email_daily_counts.call_count == 2
+    assert mock_gen_email.call_count == 2
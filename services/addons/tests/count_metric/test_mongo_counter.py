@@ -4,22 +4,96 @@ from mock import MagicMock, patch
 from addons.images.count_metric import mongo_counter
 
 
+def test_get_checkpoint():
+    mock_collection = MagicMock()
+    mock_collection.find_one.return_value = {
+        "_id": "BSM",
+        "processedUntil": datetime(2024, 1, 1, 10),
+    }
+    mock_mongo_db = {"CVCountsCheckpoints": mock_collection}
+
+    result = mongo_counter.get_checkpoint(mock_mongo_db, "BSM")
+
+    mock_collection.find_one.assert_called_with({"_id": "BSM"})
+    assert result == datetime(2024, 1, 1, 10)
+
+
+def test_get_checkpoint_missing():
+    mock_collection = MagicMock()
+    mock_collection.find_one.return_value = None
+    mock_mongo_db = {"CVCountsCheckpoints": mock_collection}
+
+    assert mongo_counter.get_checkpoint(mock_mongo_db, "BSM") is None
+
+
+def test_set_checkpoint():
+    mock_collection = MagicMock()
+    mock_mongo_db = {"CVCountsCheckpoints": mock_collection}
+
+    mongo_counter.set_checkpoint(mock_mongo_db, "BSM", datetime(2024, 1, 1, 10))
+
+    mock_collection.update_one.assert_called_with(
+        {"_id": "BSM"},
+        {"$set": {"processedUntil": datetime(2024, 1, 1, 10)}},
+        upsert=True,
+    )
+
+
 def test_write_counts():
     mock_collection = MagicMock()
     mock_mongo_db = {"CVCounts": mock_collection}
+    timestamp = datetime(2024, 1, 1, 10)
+
+    result = mongo_counter.write_counts(
+        mock_mongo_db,
+        [
+            {
+                "messageType": "BSM",
+                "rsuIp": "10.0.0.1",
+                "timestamp": timestamp,
+                "count": 5,
+            }
+        ],
+    )
 
-    mongo_counter.write_counts(mock_mongo_db, ["test"])
-
-    mock_collection.insert_many.assert_called_with(["test"])
+    assert result
+    operations = mock_collection.bulk_write.call_args[0][0]
+    assert len(operations) == 1
+    assert operations[0]._filter == {
+        "messageType": "BSM",
+        "rsuIp": "10.0.0.1",
+        "timestamp": timestamp,
+    }
+    assert operations[0]._doc == {"$set": {"count": 5}}
+    assert operations[0]._upsert
+    assert mock_collection.bulk_write.call_args[1] == {"ordered": False}
 
 
 def test_write_counts_empty():
     mock_collection = MagicMock()
     mock_mongo_db = {"CVCounts": mock_collection}
 
-    mongo_counter.write_counts(mock_mongo_db, [])
+    assert mongo_counter.write_counts(mock_mongo_db, [])
 
-    mock_collection.insert_many.assert_not_called()
+    mock_collection.bulk_write.assert_not_called()
+
+
+def test_write_counts_error():
+    mock_collection = MagicMock()
+    mock_collection.bulk_write.side_effect = Exception("Write failed")
+    mock_mongo_db = {"CVCounts": mock_collection}
+
+    assert not mongo_counter.write_counts(
+        mock_mongo_db,
+        [
+            {
+                "messageType": "BSM",
+                "rsuIp": "10.0.0.1",
+                "timestamp": datetime(2024, 1, 1),
+                "count": 5,
+            }
+        ],
+    )
 
 
 @patch.dict(os.environ, {"MONGO_DB_URI": "uri", "MONGO_DB_NAME": "name"})
@@ -27,18 +101,18 @@ def test_count_query_bsm():
     mock_collection = MagicMock()
     mock_collection.aggregate.return_value = [
         {
-            "_id": "10.0.0.1",
+            "_id": {"rsuIp": "10.0.0.1", "timestamp": datetime(2024, 1, 1, 10)},
             "count": 5,
-        }
+        },
+        {
+            "_id": {"rsuIp": None, "timestamp": datetime(2024, 1, 1, 10)},
+            "count": 2,
+        },
     ]
     mock_mongo_db = {"OdeBsmJson": mock_collection}
 
-    start_dt = datetime.now().replace(
-        year=2024, month=1, day=1, minute=0, second=0, microsecond=0
-    )
-    end_dt = datetime.now().replace(
-        year=2024, month=1, day=2, minute=0, second=0, microsecond=0
-    )
+    start_dt = datetime(2024, 1, 1, 10)
+    end_dt = datetime(2024, 1, 1, 12)
 
     result = mongo_counter.count_query(mock_mongo_db, "bsm", start_dt, end_dt)
 
@@ -46,40 +120,131 @@ def test_count_query_bsm():
         {
             "messageType": "bsm",
             "rsuIp": "10.0.0.1",
-            "timestamp": start_dt,
+            "timestamp": datetime(2024, 1, 1, 10),
             "count": 5,
         }
     ]
     assert result == expected_result
+    pipeline = mock_collection.aggregate.call_args[0][0]
+    assert pipeline[0] == {
+        "$match": {"recordGeneratedAt": {"$gte": start_dt, "$lt": end_dt}}
+    }
 
 
-@patch.dict(os.environ, {"MONGO_DB_URI": "uri", "MONGO_DB_NAME": "name"})
+@patch.dict(os.environ, {"COUNTER_DELAY_MINUTES": "5"})
+@patch("addons.images.count_metric.mongo_counter.datetime")
+@patch("addons.images.count_metric.mongo_counter.set_checkpoint")
+@patch("addons.images.count_metric.mongo_counter.get_checkpoint")
 @patch("addons.images.count_metric.mongo_counter.write_counts")
 @patch("addons.images.count_metric.mongo_counter.count_query")
-def test_run_mongo_counter(mock_count_query, mock_write_counts):
-    start_dt = datetime.now().replace(
-        year=2024, month=1, day=1, minute=0, second=0, microsecond=0
+def test_run_mongo_counter(
+    mock_count_query,
+    mock_write_counts,
+    mock_get_checkpoint,
+    mock_set_checkpoint,
+    mock_datetime,
+):
+    mock_datetime.now.return_value = datetime(2024, 1, 2, 12, 3)
+    mock_get_checkpoint.return_value = datetime(2024, 1, 2, 9)
+    mock_count_query.return_value = ["count"]
+    mock_write_counts.return_value = True
+    mock_mongo_db = MagicMock()
+
+    with patch.object(mongo_counter, "message_types", ["BSM"]):
+        mongo_counter.run_mongo_counter(mock_mongo_db)
+
+    # The 11:00 window has not been closed for 5 minutes yet
+    mock_count_query.assert_called_once_with(
+        mock_mongo_db, "BSM", datetime(2024, 1, 2, 9), datetime(2024, 1, 2, 11)
     )
-    mock_count_query.return_value = [
-        {
-            "messageType": "test",
-            "rsuIp": "10.0.0.1",
-            "timestamp": start_dt,
-            "count": 5,
-        }
-    ]
+    mock_write_counts.assert_called_with(mock_mongo_db, ["count"])
+    mock_set_checkpoint.assert_called_once_with(
+        mock_mongo_db, "BSM", datetime(2024, 1, 2, 11)
+    )
+
+
+@patch("addons.images.count_metric.mongo_counter.datetime")
+@patch("addons.images.count_metric.mongo_counter.set_checkpoint")
+@patch("addons.images.count_metric.mongo_counter.get_checkpoint")
+@patch("addons.images.count_metric.mongo_counter.write_counts")
+@patch("addons.images.count_metric.mongo_counter.count_query")
+def test_run_mongo_counter_no_checkpoint(
+    mock_count_query,
+    mock_write_counts,
+    mock_get_checkpoint,
+    mock_set_checkpoint,
+    mock_datetime,
+):
+    mock_datetime.now.return_value = datetime(2024, 1, 2, 12, 30)
+    mock_get_checkpoint.return_value = None
+    mock_count_query.return_value = []
+    mock_write_counts.return_value = True
     mock_mongo_db = MagicMock()
-    mongo_counter.message_types = ["test"]
 
-    mongo_counter.run_mongo_counter(mock_mongo_db)
+    with patch.object(mongo_counter, "message_types", ["BSM"]):
+        mongo_counter.run_mongo_counter(mock_mongo_db)
 
-    expected = [
-        {
-            "messageType": "test",
-            "rsuIp": "10.0.0.1",
-            "timestamp": start_dt,
-            "count": 5,
-        }
-    ]
-    mock_count_query.assert_called_once()
-    mock_write_counts.assert_called_with(mock_mongo_db, expected)
+    mock_count_query.assert_called_once_with(
+        mock_mongo_db, "BSM", datetime(2024, 1, 1, 12), datetime(2024, 1, 2, 12)
+    )
+    mock_set_checkpoint.assert_called_once()
+
+
+@patch("addons.images.count_metric.mongo_counter.datetime")
+@patch("addons.images.count_metric.mongo_counter.set_checkpoint")
+@patch("addons.images.count_metric.mongo_counter.get_checkpoint")
+@patch("addons.images.count_metric.mongo_counter.count_query")
+def test_run_mongo_counter_up_to_date(
+    mock_count_query, mock_get_checkpoint, mock_set_checkpoint, mock_datetime
+):
+    mock_datetime.now.return_value = datetime(2024, 1, 2, 12, 30)
+    mock_get_checkpoint.return_value = datetime(2024, 1, 2, 12)
+    mock_mongo_db = MagicMock()
+
+    with patch.object(mongo_counter, "message_types", ["BSM"]):
+        mongo_counter.run_mongo_counter(mock_mongo_db)
+
+    mock_count_query.assert_not_called()
+    mock_set_checkpoint.assert_not_called()
+
+
+@patch("addons.images.count_metric.mongo_counter.datetime")
+@patch("addons.images.count_metric.mongo_counter.set_checkpoint")
+@patch("addons.images.count_metric.mongo_counter.get_checkpoint")
+@patch("addons.images.count_metric.mongo_counter.write_counts")
+@patch("addons.images.count_metric.mongo_counter.count_query")
+def test_run_mongo_counter_write_failed(
+    mock_count_query,
+    mock_write_counts,
+    mock_get_checkpoint,
+    mock_set_checkpoint,
+    mock_datetime,
+):
+    mock_datetime.now.return_value = datetime(2024, 1, 2, 12, 30)
+    mock_get_checkpoint.return_value = datetime(2024, 1, 2, 9)
+    mock_count_query.return_value = ["count"]
+    mock_write_counts.return_value = False
+    mock_mongo_db = MagicMock()
+
+    with patch.object(mongo_counter, "message_types", ["BSM"]):
+        mongo_counter.run_mongo_counter(mock_mongo_db)
+
+    mock_set_checkpoint.assert_not_called()
+
+
+@patch("addons.images.count_metric.mongo_counter.datetime")
+@patch("addons.images.count_metric.mongo_counter.set_checkpoint")
+@patch("addons.images.count_metric.mongo_counter.get_checkpoint")
+@patch("addons.images.count_metric.mongo_counter.count_query")
+def test_run_mongo_counter_query_failed(
+    mock_count_query, mock_get_checkpoint, mock_set_checkpoint, mock_datetime
+):
+    mock_datetime.now.return_value = datetime(2024, 1, 2, 12, 30)
+    mock_get_checkpoint.return_value = datetime(2024, 1, 2, 9)
+    mock_count_query.side_effect = Exception("Aggregate failed")
+    mock_mongo_db = MagicMock()
+
+    with patch.object(mongo_counter, "message_types", ["BSM"]):
+        mongo_counter.run_mongo_counter(mock_mongo_db)
+
+    mock_set_checkpoint.assert_not_called()
@@ -0,0 +1,45 @@
+import threading
+import pytest
+from mock import MagicMock, patch
+from addons.images.count_metric import parallel
+
+
+def test_run_parallel():
+    result = parallel.run_parallel({"BSM": lambda: 5, "TIM": lambda: 10})
+
+    assert result == {"BSM": 5, "TIM": 10}
+
+
+def test_run_parallel_empty():
+    assert parallel.run_parallel({}) == {}
+
+
+def test_run_parallel_concurrent():
+    # Both tasks must be running at the same time for the barrier to release
+    barrier = threading.Barrier(2, timeout=5)
+
+    result = parallel.run_parallel({"BSM": barrier.wait, "TIM": barrier.wait})
+
+    assert sorted(result.values()) == [0, 1]
+
+
+@patch("addons.images.count_metric.parallel.max_workers", 1)
+def test_run_parallel_max_workers():
+    thread_names = set()
+
+    def task():
+        thread_names.add(threading.current_thread().name)
+
+    parallel.run_parallel({"BSM": task, "TIM": task, "Map": task})
+
+    assert len(thread_names) == 1
+
+
+@patch("addons.images.count_metric.parallel.logging")
+def test_run_parallel_error(mock_logging):
+    task = MagicMock(side_effect=Exception("Aggregate failed"))
+
+    with pytest.raises(Exception):
+        parallel.run_parallel({"BSM": task})
+
+    mock_logging.info.assert_called_once()
@@ -0,0 +1,126 @@
+from datetime import datetime
+from mock import MagicMock, patch, call
+from addons.images.count_metric import rollup_counter
+
+
+def test_floor_dt():
+    dt = datetime(2024, 3, 15, 13, 45, 10)
+    assert rollup_counter.floor_dt(dt, "hour") == datetime(2024, 3, 15, 13)
+    assert rollup_counter.floor_dt(dt, "day") == datetime(2024, 3, 15)
+    assert rollup_counter.floor_dt(dt, "month") == datetime(2024, 3, 1)
+
+
+def test_ceil_dt():
+    assert rollup_counter.ceil_dt(datetime(2024, 3, 15, 13, 45), "hour") == datetime(
+        2024, 3, 15, 14
+    )
+    assert rollup_counter.ceil_dt(datetime(2024, 3, 15), "day") == datetime(2024, 3, 15)
+    assert rollup_counter.ceil_dt(datetime(2024, 12, 15), "month") == datetime(
+        2025, 1, 1
+    )
+
+
+def test_ensure_indexes():
+    mock_mongo_db = MagicMock()
+
+    rollup_counter.ensure_indexes(mock_mongo_db)
+
+    mock_mongo_db.__getitem__.assert_has_calls(
+        [call("CVCountsHourly"), call("CVCountsDaily"), call("CVCountsMonthly")],
+        any_order=True,
+    )
+    mock_mongo_db.__getitem__.return_value.create_index.assert_called_with(
+        [("messageType", 1), ("rsuIp", 1), ("timestamp", 1)], unique=True
+    )
+
+
+def test_rollup_hourly():
+    mock_collection = MagicMock()
+    mock_mongo_db = {"OdeBsmJson": mock_collection}
+    start_dt = datetime(2024, 1, 1, 10)
+    end_dt = datetime(2024, 1, 1, 12)
+
+    rollup_counter.rollup_hourly(mock_mongo_db, "BSM", start_dt, end_dt)
+
+    pipeline = mock_collection.aggregate.call_args[0][0]
+    assert pipeline[0] == {
+        "$match": {"recordGeneratedAt": {"$gte": start_dt, "$lt": end_dt}}
+    }
+    assert pipeline[3]["$project"]["messageType"] == {"$literal": "BSM"}
+    assert pipeline[-1] == {
+        "$merge": {
+            "into": "CVCountsHourly",
+            "on": ["messageType", "rsuIp", "timestamp"],
+            "whenMatched": "merge",
+            "whenNotMatched": "insert",
+        }
+    }
+
+
+@patch("addons.images.count_metric.rollup_counter.logging")
+def test_rollup_hourly_error(mock_logging):
+    mock_collection = MagicMock()
+    mock_collection.aggregate.side_effect = Exception("Aggregate failed")
+    mock_mongo_db = {"OdeBsmJson": mock_collection}
+
+    rollup_counter.rollup_hourly(
+        mock_mongo_db, "BSM", datetime(2024, 1, 1), datetime(2024, 1, 2)
+    )
+
+    mock_logging.error.assert_called_once()
+
+
+def test_rollup_tier():
+    mock_collection = MagicMock()
+    mock_mongo_db = {"CVCountsHourly": mock_collection}
+    start_dt = datetime(2024, 1, 1)
+    end_dt = datetime(2024, 1, 2)
+
+    rollup_counter.rollup_tier(
+        mock_mongo_db, "CVCountsHourly", "CVCountsDaily", "day", start_dt, end_dt
+    )
+
+    pipeline = mock_collection.aggregate.call_args[0][0]
+    assert pipeline[0] == {"$match": {"timestamp": {"$gte": start_dt, "$lt": end_dt}}}
+    assert pipeline[1]["$group"]["_id"]["timestamp"] == {
+        "$dateTrunc": {"date": "$timestamp", "unit": "day"}
+    }
+    assert pipeline[1]["$group"]["count"] == {"$sum": "$count"}
+    assert pipeline[-1]["$merge"]["into"] == "CVCountsDaily"
+
+
+@patch("addons.images.count_metric.rollup_counter.ensure_indexes")
+@patch("addons.images.count_metric.rollup_counter.rollup_tier")
+@patch("addons.images.count_metric.rollup_counter.rollup_hourly")
+def test_run_rollups(mock_rollup_hourly, mock_rollup_tier, mock_ensure_indexes):
+    mock_mongo_db = MagicMock()
+
+    rollup_counter.run_rollups(
+        mock_mongo_db, datetime(2024, 1, 31, 22, 30), datetime(2024, 2, 1, 0, 15)
+    )
+
+    mock_ensure_indexes.assert_called_once_with(mock_mongo_db)
+    assert mock_rollup_hourly.call_count == len(rollup_counter.message_types)
+    mock_rollup_hourly.assert_called_with(
+        mock_mongo_db, "PSM", datetime(2024, 1, 31, 22), datetime(2024, 2, 1, 1)
+    )
+    mock_rollup_tier.assert_has_calls(
+        [
+            call(
+                mock_mongo_db,
+                "CVCountsHourly",
+                "CVCountsDaily",
+                "day",
+                datetime(2024, 1, 31),
+                datetime(2024, 2, 2),
+            ),
+            call(
+                mock_mongo_db,
+                "CVCountsDaily",
+                "CVCountsMonthly",
+                "month",
+                datetime(2024, 1, 1),
+                datetime(2024, 3, 1),
+            ),
+        ]
+    )
@@ -1,11 +1,14 @@
 import os
 from pymongo import MongoClient, DESCENDING, GEOSPHERE
 from datetime import datetime
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock, PropertyMock, patch
 import logging
+import threading
 import pytest
+from pymongo.errors import BulkWriteError, OperationFailure
 from addons.images.geo_msg_query import geo_msg_query
 from addons.images.geo_msg_query.geo_msg_query import (
+    BufferedWriter,
     create_message,
     process_message,
     set_indexes,
@@ -115,18 +118,17 @@ def test_create_message_invalid_type():
 
 # process_message unit tests
 @patch("addons.images.geo_msg_query.geo_msg_query.create_message")
-def test_process_message_inserts_new_message_when_created_successfully(
+def test_process_message_writes_new_message_when_created_successfully(
     mock_process_message,
 ):
     message = "Test message"
-    db = MagicMock()
-    collection = "test_collection"
+    writer = MagicMock()
     msg_type = "test_type"
 
     mock_process_message.return_value = "New message"
-    process_message(message, db, collection, msg_type)
+    process_message(message, writer, msg_type)
 
-    db[collection].insert_one.assert_called_once()
+    writer.write.assert_called_once_with("New message")
 
 
 @patch("addons.images.geo_msg_query.geo_msg_query.create_message")
@@ -135,18 +137,84 @@ def test_process_message_logs_error_when_message_creation_fails(
     mock_logging, mock_process_message
 ):
     message = "Invalid message"
-    db = MagicMock()
-    collection = "test_collection"
+    writer = MagicMock()
     msg_type = "test_type"
 
     mock_process_message.return_value = None
-    process_message(message, db, collection, msg_type)
+    process_message(message, writer, msg_type)
+
+    writer.write.assert_not_called()
 
     mock_logging.assert_called_once_with(
         f"process_message: Could not create a message from the input {msg_type} message: {message}"
     )
 
 
+# BufferedWriter unit tests
+def test_buffered_writer_batch_size():
+    mock_collection = MagicMock()
+    writer = BufferedWriter(mock_collection, batch_size=2, flush_interval=60)
+
+    writer.write({"id": 1})
+    mock_collection.insert_many.assert_not_called()
+    writer.write({"id": 2})
+
+    mock_collection.insert_many.assert_called_once_with(
+        [{"id": 1}, {"id": 2}], ordered=False
+    )
+    writer.close()
+
+
+def test_buffered_writer_flush_interval():
+    mock_collection = MagicMock()
+    inserted = threading.Event()
+    mock_collection.insert_many.side_effect = lambda batch, ordered: inserted.set()
+    writer = BufferedWriter(mock_collection, batch_size=100, flush_interval=0.01)
+
+    writer.write({"id": 1})
+
+    assert inserted.wait(5)
+    mock_collection.insert_many.assert_called_once_with([{"id": 1}], ordered=False)
+    writer.close()
+
+
+def test_buffered_writer_close():
+    mock_collection = MagicMock()
+    writer = BufferedWriter(mock_collection, batch_size=100, flush_interval=60)
+
+    writer.write({"id": 1})
+    writer.close()
+
+    mock_collection.insert_many.assert_called_once_with([{"id": 1}], ordered=False)
+    assert writer.stopped.is_set()
+
+
+def test_buffered_writer_flush_empty():
+    mock_collection = MagicMock()
+    writer = BufferedWriter(mock_collection, batch_size=100, flush_interval=60)
+
+    writer.close()
+
+    mock_collection.insert_many.assert_not_called()
+
+
+@patch("logging.error")
+def test_buffered_writer_insert_error(mock_logging):
+    mock_collection = MagicMock()
+    mock_collection.insert_many.side_effect = BulkWriteError(
+        {"writeErrors": [{"index": 0}], "nInserted": 1}
+    )
+    writer = BufferedWriter(mock_collection, batch_size=2, flush_interval=60)
+
+    writer.write({"id": 1})
+    writer.write({"id": 2})
+
+    mock_logging.assert_called_once()
+    assert "Failed to insert 1 of 2 messages" in mock_logging.call_args[0][0]
+    assert writer.buffer == []
+    writer.close()
+
+
 @patch("logging.info")
 def test_set_indexes_empty(mock_logging):
     mock_db = MagicMock()
@@ -219,6 +287,56 @@ def test_set_indexes_exists(mock_logging):
     assert mock_logging.call_count == 3
 
 
+@pytest.fixture(autouse=True)
+def reset_watchers():
+    geo_msg_query.latest_tokens.clear()
+    geo_msg_query.saved_tokens.clear()
+    geo_msg_query.stopped.clear()
+    yield
+    geo_msg_query.stopped.clear()
+
+
+def mock_change_stream(mock_db, changes):
+    mock_stream = MagicMock()
+    type(mock_stream).alive = PropertyMock(side_effect=[True] * len(changes) + [False])
+    mock_stream.try_next.side_effect = changes
+    mock_stream.resume_token = {"_data": "token"}
+    mock_collection = mock_db.__getitem__.return_value
+    mock_collection.watch.return_value.__enter__.return_value = mock_stream
+    mock_collection.find_one.return_value = None
+    return mock_stream
+
+
+# change_stream_pipeline unit tests
+def test_change_stream_pipeline_bsm():
+    assert geo_msg_query.change_stream_pipeline("Bsm") == [
+        {"$match": {"operationType": "insert"}},
+        {
+            "$project": {
+                "operationType": 1,
+                "fullDocument.metadata.originIp": 1,
+                "fullDocument.metadata.odeReceivedAt": 1,
+                "fullDocument.payload.data.coreData.position.latitude": 1,
+                "fullDocument.payload.data.coreData.position.longitude": 1,
+            }
+        },
+    ]
+
+
+def test_change_stream_pipeline_psm():
+    project = geo_msg_query.change_stream_pipeline("Psm")[1]["$project"]
+
+    assert "fullDocument.payload.data.position.latitude" in project
+    assert "fullDocument.payload.data.coreData.position.latitude" not in project
+
+
+def test_change_stream_pipeline_unknown_type():
+    project = geo_msg_query.change_stream_pipeline("Tim")[1]["$project"]
+
+    assert "fullDocument.payload.data.position.longitude" in project
+    assert "fullDocument.payload.data.coreData.position.longitude" in project
+
+
 # watch_collection method unit tests
 @patch("logging.debug")
 @patch("addons.images.geo_msg_query.geo_msg_query.process_message")
@@ -227,25 +345,25 @@ def test_watch_collection_success(mock_process_message, mock_logging):
 
     mock_db = MagicMock()
     mock_input_collection = "OdeBsmJson"
-    mock_output_collection = "GeoMsg"
+    mock_writer = MagicMock()
     mock_change = {
         "fullDocument": {"message": "Test message"},
         "operationType": "insert",
     }
-    mock_stream = MagicMock()
-    mock_stream.__iter__.return_value = [mock_change]
-    mock_db.__getitem__.return_value.watch.return_value.__enter__.return_value = (
-        mock_stream
-    )
+    mock_change_stream(mock_db, [mock_change])
 
-    geo_msg_query.watch_collection(
-        mock_db, mock_input_collection, mock_output_collection
-    )
+    geo_msg_query.watch_collection(mock_db, mock_input_collection, mock_writer)
 
+    mock_db.__getitem__.return_value.watch.assert_called_once_with(
+        geo_msg_query.change_stream_pipeline("Bsm"),
+        resume_after=None,
+        max_await_time_ms=1000,
+    )
     mock_process_message.assert_called_once_with(
-        mock_change["fullDocument"], mock_db, mock_output_collection, "Bsm"
+        mock_change["fullDocument"], mock_writer, "Bsm"
     )
     mock_logging.assert_any_call("Bsm Count: 1")
+    assert geo_msg_query.latest_tokens["OdeBsmJson"] == {"_data": "token"}
 
 
 @patch("logging.debug")
@@ -255,41 +373,117 @@ def test_watch_collection_ttl_ignore(mock_process_message, mock_logging):
 
     mock_db = MagicMock()
     mock_input_collection = "OdeBsmJson"
-    mock_output_collection = "GeoMsg"
+    mock_writer = MagicMock()
     mock_change = {
         "operationType": "delete",
     }
-    mock_stream = MagicMock()
-    mock_stream.__iter__.return_value = [mock_change]
-    mock_db.__getitem__.return_value.watch.return_value.__enter__.return_value = (
-        mock_stream
+    mock_change_stream(mock_db, [mock_change])
+
+    geo_msg_query.watch_collection(mock_db, mock_input_collection, mock_writer)
+
+    mock_logging.assert_any_call(f"Ignoring change with operationType: delete")
+    mock_process_message.assert_not_called()
+
+
+@patch("addons.images.geo_msg_query.geo_msg_query.process_message", MagicMock())
+def test_watch_collection_resume():
+    mock_db = MagicMock()
+    mock_change_stream(mock_db, [None])
+    mock_collection = mock_db.__getitem__.return_value
+    mock_collection.find_one.return_value = {
+        "_id": "OdeBsmJson",
+        "token": {"_data": "saved"},
+    }
+
+    geo_msg_query.watch_collection(mock_db, "OdeBsmJson", MagicMock())
+
+    mock_collection.find_one.assert_called_once_with({"_id": "OdeBsmJson"})
+    mock_collection.watch.assert_called_once_with(
+        geo_msg_query.change_stream_pipeline("Bsm"),
+        resume_after={"_data": "saved"},
+        max_await_time_ms=1000,
     )
 
-    geo_msg_query.watch_collection(
-        mock_db, mock_input_collection, mock_output_collection
+
+@patch("addons.images.geo_msg_query.geo_msg_query.resume_token_interval", 0)
+@patch("addons.images.geo_msg_query.geo_msg_query.process_message", MagicMock())
+def test_watch_collection_checkpoint():
+    mock_db = MagicMock()
+    mock_writer = MagicMock()
+    mock_change_stream(mock_db, [{"operationType": "insert", "fullDocument": {}}])
+
+    geo_msg_query.watch_collection(mock_db, "OdeBsmJson", mock_writer)
+
+    mock_writer.flush.assert_called_once()
+    mock_db.__getitem__.return_value.update_one.assert_called_once_with(
+        {"_id": "OdeBsmJson"}, {"$set": {"token": {"_data": "token"}}}, upsert=True
     )
+    assert geo_msg_query.saved_tokens["OdeBsmJson"] == {"_data": "token"}
 
-    mock_logging.assert_any_call(f"Ignoring change with operationType: delete")
 
+def test_checkpoint_skips_saved_tokens():
+    mock_db = MagicMock()
+    mock_writer = MagicMock()
+    geo_msg_query.latest_tokens["OdeBsmJson"] = {"_data": "saved"}
+    geo_msg_query.saved_tokens["OdeBsmJson"] = {"_data": "saved"}
+    geo_msg_query.latest_tokens["OdePsmJson"] = {"_data": "new"}
+
+    geo_msg_query.checkpoint(mock_db, ["OdeBsmJson", "OdePsmJson"], mock_writer)
+
+    mock_writer.flush.assert_called_once()
+    mock_db.__getitem__.return_value.update_one.assert_called_once_with(
+        {"_id": "OdePsmJson"}, {"$set": {"token": {"_data": "new"}}}, upsert=True
+    )
 
+
+# supervise_collection method unit tests
+@patch("addons.images.geo_msg_query.geo_msg_query.restart_delay_min", 0)
+@patch("addons.images.geo_msg_query.geo_msg_query.watch_collection")
 @patch("logging.error")
-def test_watch_collection_exception(mock_logging):
+def test_supervise_collection_restarts(mock_logging, mock_watch_collection):
     mock_db = MagicMock()
-    mock_input_collection = "OdeBsmJson"
-    mock_output_collection = "GeoMsg"
+    mock_writer = MagicMock()
     mock_error = Exception("Test error")
-    mock_db.__getitem__.side_effect = mock_error
 
-    geo_msg_query.watch_collection(
-        mock_db, mock_input_collection, mock_output_collection
-    )
+    def watch(db, input_collection, writer):
+        if mock_watch_collection.call_count == 2:
+            geo_msg_query.stopped.set()
+            return
+        raise mock_error
+
+    mock_watch_collection.side_effect = watch
 
+    geo_msg_query.supervise_collection(mock_db, "OdeBsmJson", mock_writer)
+
+    assert mock_watch_collection.call_count == 2
     mock_logging.assert_any_call(
         "An error occurred while watching collection: OdeBsmJson"
     )
     mock_logging.assert_any_call(str(mock_error))
 
 
+@patch("addons.images.geo_msg_query.geo_msg_query.watch_collection")
+@patch("logging.warning")
+@patch("logging.error", MagicMock())
+def test_supervise_collection_lost_token(mock_logging, mock_watch_collection):
+    mock_db = MagicMock()
+    geo_msg_query.latest_tokens["OdeBsmJson"] = {"_data": "old"}
+
+    def watch(db, input_collection, writer):
+        geo_msg_query.stopped.set()
+        raise OperationFailure("History lost", code=286)
+
+    mock_watch_collection.side_effect = watch
+
+    geo_msg_query.supervise_collection(mock_db, "OdeBsmJson", MagicMock())
+
+    mock_db.__getitem__.return_value.delete_one.assert_called_once_with(
+        {"_id": "OdeBsmJson"}
+    )
+    assert "OdeBsmJson" not in geo_msg_query.latest_tokens
+    mock_logging.assert_called_once()
+
+
 # run method unit tests
 @patch.dict(
     os.environ,
@@ -301,7 +495,9 @@ def test_watch_collection_exception(mock_logging):
         "MONGO_TTL": "7",
     },
 )
-@patch("addons.images.geo_msg_query.geo_msg_query.watch_collection")
+@patch("addons.images.geo_msg_query.geo_msg_query.signal")
+@patch("addons.images.geo_msg_query.geo_msg_query.BufferedWriter")
+@patch("addons.images.geo_msg_query.geo_msg_query.supervise_collection")
 @patch("addons.images.geo_msg_query.geo_msg_query.set_indexes")
 @patch("addons.images.geo_msg_query.geo_msg_query.set_mongo_client")
 @patch("addons.images.geo_msg_query.geo_msg_query.ThreadPoolExecutor")
@@ -309,7 +505,9 @@ def test_run(
     mock_thread_pool_executor,
     mock_set_mongo_client,
     mock_set_indexes,
-    mock_watch_collection,
+    mock_supervise_collection,
+    mock_buffered_writer,
+    mock_signal,
 ):
 
     mock_db = MagicMock()
@@ -317,7 +515,6 @@ def test_run(
     geo_msg_query.set_mongo_client = mock_set_mongo_client
     mock_set_mongo_client.return_value = mock_db
     geo_msg_query.set_indexes = mock_set_indexes
-    geo_msg_query.watch_collection = mock_watch_collection
 
     geo_msg_query.run()
 
@@ -326,12 +523,17 @@ def test_run(
 
     mock_thread_pool_executor.assert_called_once_with(max_workers=5)
     mock_executer = mock_thread_pool_executor.return_value.__enter__.return_value
+    mock_buffered_writer.assert_called_once_with(
+        mock_db["GeoMsg"], batch_size=500, flush_interval=1.0
+    )
+    mock_writer = mock_buffered_writer.return_value
     mock_executer.submit.assert_any_call(
-        mock_watch_collection, mock_db, "OdePsmJson", "GeoMsg"
+        mock_supervise_collection, mock_db, "OdePsmJson", mock_writer
     )
     mock_executer.submit.assert_any_call(
-        mock_watch_collection, mock_db, "OdeBsmJson", "GeoMsg"
+        mock_supervise_collection, mock_db, "OdeBsmJson", mock_writer
     )
+    assert mock_signal.signal.call_count == 2
 
 
 @patch("addons.images.geo_msg_query.geo_msg_query.set_indexes")
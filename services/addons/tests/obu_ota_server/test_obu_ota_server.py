@@ -239,10 +239,10 @@ async def test_get_fw(mock_read_file, mock_parse_range_header, mock_get_firmware
 
 
 @pytest.mark.asyncio
-@patch("addons.images.obu_ota_server.obu_ota_server.pgquery")
+@patch("addons.images.obu_ota_server.obu_ota_server.pgquery_async.write_db")
 @patch("addons.images.obu_ota_server.obu_ota_server.datetime")
 @patch("addons.images.obu_ota_server.obu_ota_server.removed_old_logs")
-async def test_log_request(mock_removed_old_logs, mock_datetime, mock_pgquery):
+async def test_log_request(mock_removed_old_logs, mock_datetime, mock_write_db):
     fixed_datetime = datetime(2024, 7, 30, 0, 0, 0)
     mock_datetime.now.return_value = fixed_datetime
     mock_datetime.strftime = datetime.strftime
@@ -264,58 +264,53 @@ async def test_log_request(mock_removed_old_logs, mock_datetime, mock_pgquery):
         manufacturer, mock_request, firmware_id, error_status, error_message
     )
 
-    # Verify the query passed to write_db
+    # Verify the query and parameters passed to write_db
     expected_query = (
-        f"INSERT INTO public.obu_ota_requests (obu_sn, manufacturer, request_datetime, origin_ip, obu_firmware_version, requested_firmware_version, error_status, error_message) VALUES"
-        f"('{mock_request.query_params['serialnum']}', {manufacturer}, '{fixed_datetime.strftime('%Y-%m-%d %H:%M:%S')}', '{mock_request.client.host}', '{mock_request.query_params['version']}', '{firmware_id}', B'{error_status}', '{error_message}')"
-    ).replace(" ", "")
-
-    actual_query = mock_pgquery.write_db.call_args[0][0].replace(" ", "")
-
-    assert expected_query == actual_query
+        "INSERT INTO public.obu_ota_requests (obu_sn, manufacturer, request_datetime, origin_ip, obu_firmware_version, requested_firmware_version, error_status, error_message) "
+        "VALUES (:serialnum, :manufacturer, :request_datetime, :origin_ip, :version, :firmware_id, :error_status, :error_message)"
+    )
+    expected_params = {
+        "serialnum": "111111111111",
+        "manufacturer": manufacturer,
+        "request_datetime": "2024-07-30 00:00:00",
+        "origin_ip": "127.0.0.1",
+        "version": "y11.11.1-b11111",
+        "firmware_id": firmware_id,
+        "error_status": "0",
+        "error_message": error_message,
+    }
+    mock_write_db.assert_awaited_once_with(expected_query, expected_params)
 
-    mock_removed_old_logs.assert_called_once_with(
+    mock_removed_old_logs.assert_awaited_once_with(
         mock_request.query_params["serialnum"]
     )
 
 
-@patch.dict("os.environ", {"MAX_COUNT": "10"})
-@patch("addons.images.obu_ota_server.obu_ota_server.pgquery")
-def test_removed_old_logs_no_removal(mock_pgquery):
-    mock_pgquery.query_db.side_effect = [
-        [(5,)],  # success_count
-    ]
-
+@pytest.mark.asyncio
+@patch.dict("os.environ", {"MAX_COUNT": "5"})
+@patch("addons.images.obu_ota_server.obu_ota_server.pgquery_async.write_db")
+async def test_removed_old_logs(mock_write_db):
     serialnum = "test_serialnum"
-    removed_old_logs(serialnum)
-
-    mock_pgquery.query_db.assert_called_once_with(
-        f"SELECT COUNT(*) FROM public.obu_ota_requests WHERE obu_sn = '{serialnum}' AND error_status = B'0'"
+    await removed_old_logs(serialnum)
+
+    mock_write_db.assert_awaited_once_with(
+        "DELETE FROM public.obu_ota_requests WHERE request_id IN ("
+        "SELECT request_id FROM public.obu_ota_requests WHERE obu_sn = :serialnum AND error_status = B'0' "
+        "ORDER BY request_datetime DESC OFFSET :max_count"
+        ")",
+        {"serialnum": serialnum, "max_count": 5},
     )
-    mock_pgquery.write_db.assert_not_called()
 
 
-@patch.dict("os.environ", {"MAX_COUNT": "5"})
-@patch("addons.images.obu_ota_server.obu_ota_server.pgquery")
-def test_removed_old_logs_with_removal(mock_pgquery):
-    mock_pgquery.query_db.side_effect = [
-        [(10,)],  # success_count
-        [(1,), (2,), (3,), (4,), (5,)],  # oldest_entries
-    ]
+@pytest.mark.asyncio
+@patch("addons.images.obu_ota_server.obu_ota_server.pgquery_async.write_db")
+async def test_removed_old_logs_exception(mock_write_db):
+    mock_write_db.side_effect = Exception("test exception")
 
-    serialnum = "test_serialnum"
-    removed_old_logs(serialnum)
+    # exceptions are logged rather than raised into the request task
+    await removed_old_logs("test_serialnum")
 
-    assert mock_pgquery.query_db.call_count == 2
-    mock_pgquery.query_db.assert_any_call(
-        f"SELECT COUNT(*) FROM public.obu_ota_requests WHERE obu_sn = '{serialnum}' AND error_status = B'0'"
-    )
-    mock_pgquery.query_db.assert_any_call(
-        f"SELECT request_id FROM public.obu_ota_requests WHERE obu_sn = '{serialnum}' AND error_status = B'0' ORDER BY request_datetime ASC LIMIT 5"
-    )
-    mock_pgquery.write_db.assert_called_once_with(
-        "DELETE FROM public.obu_ota_requests WHERE request_id IN (1,2,3,4,5)"
-    )
+    mock_write_db.assert_awaited_once()
 
 
 @patch.dict("os.environ", {"OTA_USERNAME": "username", "OTA_PASSWORD": "password"})
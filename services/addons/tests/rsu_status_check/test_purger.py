@@ -8,14 +8,17 @@ from freezegun import freeze_time
 def test_get_all_rsus(mock_query_db):
     # mock
     mock_query_db.return_value = [
-        ({"rsu_id": 1},),
-        ({"rsu_id": 2},),
-        ({"rsu_id": 3},),
-        ({"rsu_id": 4},),
+        {"rsu_id": 1},
+        {"rsu_id": 2},
+        {"rsu_id": 3},
+        {"rsu_id": 4},
     ]
 
     # call
     result = purger.get_all_rsus()
+    mock_query_db.assert_called_once_with(
+        "SELECT rsu_id FROM public.rsus ORDER BY rsu_id", mapping=True
+    )
 
     # check
     assert 1 in result and result[1] is None
@@ -25,11 +28,11 @@ def test_get_all_rsus(mock_query_db):
     assert 5 not in result
 
 
-@patch("addons.images.rsu_status_check.purger.pgquery.query_db")
-def test_get_last_online_rsu_records(mock_query_db):
+@patch("addons.images.rsu_status_check.purger.pgquery.stream_db")
+def test_get_last_online_rsu_records(mock_stream_db):
     # mock
-    mock_query_db.return_value = [
-        ({"ping_id": 1, "rsu_id": 1, "timestamp": "2023-07-06T00:00:00"},),
+    mock_stream_db.return_value = [
+        {"ping_id": 1, "rsu_id": 1, "timestamp": datetime(2023, 7, 6)},
     ]
     rsu_dict = {1: None}
 
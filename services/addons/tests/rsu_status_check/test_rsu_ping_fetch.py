@@ -15,8 +15,8 @@ def test_get_rsu_data(mock_query_db):
     mock_query_db.assert_called_once()
 
 
-@patch("addons.images.rsu_status_check.purger.pgquery.write_db")
-def test_insert_rsu_ping(mock_write_db):
+@patch("addons.images.rsu_status_check.rsu_ping_fetch.pgquery.bulk_insert")
+def test_insert_rsu_ping(mock_bulk_insert):
     # call
     testJson = {
         "histories": [
@@ -54,27 +54,41 @@ def test_insert_rsu_ping(mock_write_db):
         "rsu_id": 230,
         "rsu_ip": "172.16.28.51",
     }
-    rsu_ping_fetch.insert_rsu_ping(testJson)
+    result = rsu_ping_fetch.insert_rsu_ping(testJson)
 
     # check
-    expected_calls = [
-        call(
-            "INSERT INTO public.ping (timestamp, result, rsu_id) VALUES (to_timestamp(1632350648), B'1', 230)"
-        ),
-        call(
-            "INSERT INTO public.ping (timestamp, result, rsu_id) VALUES (to_timestamp(1632350348), B'1', 230)"
-        ),
-        call(
-            "INSERT INTO public.ping (timestamp, result, rsu_id) VALUES (to_timestamp(1632350048), B'1', 230)"
-        ),
-        call(
-            "INSERT INTO public.ping (timestamp, result, rsu_id) VALUES (to_timestamp(1632349748), B'1', 230)"
-        ),
-        call(
-            "INSERT INTO public.ping (timestamp, result, rsu_id) VALUES (to_timestamp(1632349448), B'1', 230)"
-        ),
+    expected_rows = [
+        ("2021-09-22 22:44:08", "1", 230),
+        ("2021-09-22 22:39:08", "1", 230),
+        ("2021-09-22 22:34:08", "1", 230),
+        ("2021-09-22 22:29:08", "1", 230),
+        ("2021-09-22 22:24:08", "1", 230),
     ]
-    mock_write_db.assert_has_calls(expected_calls)
+    mock_bulk_insert.assert_called_once_with(
+        "public.ping", ["timestamp", "result", "rsu_id"], expected_rows
+    )
+    assert result == True
+
+
+@patch("addons.images.rsu_status_check.rsu_ping_fetch.pgquery.bulk_insert")
+def test_insert_rsu_ping_exception(mock_bulk_insert):
+    mock_bulk_insert.side_effect = Exception("test exception")
+    testJson = {
+        "histories": [
+            {
+                "itemid": "487682",
+                "clock": "1632350648",
+                "value": "1",
+                "ns": "447934900",
+            },
+        ],
+        "rsu_id": 230,
+    }
+
+    result = rsu_ping_fetch.insert_rsu_ping(testJson)
+
+    mock_bulk_insert.assert_called_once()
+    assert result == False
 
 
 def createRsuStatusFetchInstance():
@@ -2,6 +2,7 @@ import logging
 import common.pgquery as pgquery
 import sqlalchemy
 import admin_new_user
+import middleware
 import os
 
 
@@ -144,71 +145,70 @@ def modify_org(org_spec):
         }, 500
 
     try:
-        # Modify the existing organization data
-        query = (
-            "UPDATE public.organizations SET "
-            f"name = '{org_spec['name']}', "
-            f"email = '{org_spec['email']}' "
-            f"WHERE name = '{org_spec['orig_name']}'"
-        )
-        pgquery.write_db(query)
-
-        # Add the user-to-organization relationships
-        if len(org_spec["users_to_add"]) > 0:
-            user_add_query = "INSERT INTO public.user_organization(user_id, organization_id, role_id) VALUES"
-            for user in org_spec["users_to_add"]:
-                user_add_query += (
-                    " ("
-                    f"(SELECT user_id FROM public.users WHERE email = '{user['email']}'), "
-                    f"(SELECT organization_id FROM public.organizations WHERE name = '{org_spec['name']}'), "
-                    f"(SELECT role_id FROM public.roles WHERE name = '{user['role']}')"
-                    "),"
-                )
-            user_add_query = user_add_query[:-1]
-            pgquery.write_db(user_add_query)
-
-        # Modify the user-to-organization relationships
-        for user in org_spec["users_to_modify"]:
-            user_modify_query = (
-                "UPDATE public.user_organization "
-                f"SET role_id = (SELECT role_id FROM public.roles WHERE name = '{user['role']}') "
-                f"WHERE user_id = (SELECT user_id FROM public.users WHERE email = '{user['email']}') "
-                f"AND organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{org_spec['name']}')"
+        with pgquery.transaction() as transaction:
+            # Modify the existing organization data
+            query = (
+                "UPDATE public.organizations SET "
+                f"name = '{org_spec['name']}', "
+                f"email = '{org_spec['email']}' "
+                f"WHERE name = '{org_spec['orig_name']}'"
             )
-            pgquery.write_db(user_modify_query)
-
-        # Remove the user-to-organization relationships
-        for user in org_spec["users_to_remove"]:
-            user_remove_query = (
-                "DELETE FROM public.user_organization WHERE "
-                f"user_id = (SELECT user_id FROM public.users WHERE email = '{user['email']}') "
-                f"AND organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{org_spec['name']}')"
-            )
-            pgquery.write_db(user_remove_query)
-
-        # Add the rsu-to-organization relationships
-        if len(org_spec["rsus_to_add"]) > 0:
-            rsu_add_query = (
-                "INSERT INTO public.rsu_organization(rsu_id, organization_id) VALUES"
-            )
-            for rsu in org_spec["rsus_to_add"]:
-                rsu_add_query += (
-                    " ("
-                    f"(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu}'), "
-                    f"(SELECT organization_id FROM public.organizations WHERE name = '{org_spec['name']}')"
-                    "),"
+            transaction.write_db(query)
+
+            # Add the user-to-organization relationships
+            if len(org_spec["users_to_add"]) > 0:
+                user_add_query = "INSERT INTO public.user_organization(user_id, organization_id, role_id) VALUES"
+                for user in org_spec["users_to_add"]:
+                    user_add_query += (
+                        " ("
+                        f"(SELECT user_id FROM public.users WHERE email = '{user['email']}'), "
+                        f"(SELECT organization_id FROM public.organizations WHERE name = '{org_spec['name']}'), "
+                        f"(SELECT role_id FROM public.roles WHERE name = '{user['role']}')"
+                        "),"
+                    )
+                user_add_query = user_add_query[:-1]
+                transaction.write_db(user_add_query)
+
+            # Modify the user-to-organization relationships
+            for user in org_spec["users_to_modify"]:
+                user_modify_query = (
+                    "UPDATE public.user_organization "
+                    f"SET role_id = (SELECT role_id FROM public.roles WHERE name = '{user['role']}') "
+                    f"WHERE user_id = (SELECT user_id FROM public.users WHERE email = '{user['email']}') "
+                    f"AND organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{org_spec['name']}')"
                 )
-            rsu_add_query = rsu_add_query[:-1]
-            pgquery.write_db(rsu_add_query)
-
-        # Remove the rsu-to-organization relationships
-        for rsu in org_spec["rsus_to_remove"]:
-            rsu_remove_query = (
-                "DELETE FROM public.rsu_organization WHERE "
-                f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu}') "
-                f"AND organization_id=(SELECT organization_id FROM public.organizations WHERE name = '{org_spec['name']}')"
-            )
-            pgquery.write_db(rsu_remove_query)
+                transaction.write_db(user_modify_query)
+
+            # Remove the user-to-organization relationships
+            for user in org_spec["users_to_remove"]:
+                user_remove_query = (
+                    "DELETE FROM public.user_organization WHERE "
+                    f"user_id = (SELECT user_id FROM public.users WHERE email = '{user['email']}') "
+                    f"AND organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{org_spec['name']}')"
+                )
+                transaction.write_db(user_remove_query)
+
+            # Add the rsu-to-organization relationships
+            if len(org_spec["rsus_to_add"]) > 0:
+                rsu_add_query = "INSERT INTO public.rsu_organization(rsu_id, organization_id) VALUES"
+                for rsu in org_spec["rsus_to_add"]:
+                    rsu_add_query += (
+                        " ("
+                        f"(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu}'), "
+                        f"(SELECT organization_id FROM public.organizations WHERE name = '{org_spec['name']}')"
+                        "),"
+                    )
+                rsu_add_query = rsu_add_query[:-1]
+                transaction.write_db(rsu_add_query)
+
+            # Remove the rsu-to-organization relationships
+            for rsu in org_spec["rsus_to_remove"]:
+                rsu_remove_query = (
+                    "DELETE FROM public.rsu_organization WHERE "
+                    f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu}') "
+                    f"AND organization_id=(SELECT organization_id FROM public.organizations WHERE name = '{org_spec['name']}')"
+                )
+                transaction.write_db(rsu_remove_query)
     except sqlalchemy.exc.IntegrityError as e:
         failed_value = e.orig.args[0]["D"]
         failed_value = failed_value.replace("(", '"')
@@ -220,6 +220,8 @@ def modify_org(org_spec):
         logging.error(f"Exception encountered: {e}")
         return {"message": "Encountered unknown issue"}, 500
 
+    # Renaming an organization changes the permissions of every member, not only the listed users
+    middleware.invalidate_all_users()
     return {"message": "Organization successfully modified"}, 200
 
 
@@ -235,24 +237,28 @@ def delete_org(org_name):
             "message": "Cannot delete organization that has one or more users only associated with this organization"
         }, 400
 
-    # Delete user-to-organization relationships
-    user_org_remove_query = (
-        "DELETE FROM public.user_organization WHERE "
-        f"organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{org_name}')"
-    )
-    pgquery.write_db(user_org_remove_query)
+    with pgquery.transaction() as transaction:
+        # Delete user-to-organization relationships
+        user_org_remove_query = (
+            "DELETE FROM public.user_organization WHERE "
+            f"organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{org_name}')"
+        )
+        transaction.write_db(user_org_remove_query)
 
-    # Delete rsu-to-organization relationships
-    rsu_org_remove_query = (
-        "DELETE FROM public.rsu_organization WHERE "
-        f"organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{org_name}')"
-    )
-    pgquery.write_db(rsu_org_remove_query)
+        # Delete rsu-to-organization relationships
+        rsu_org_remove_query = (
+            "DELETE FROM public.rsu_organization WHERE "
+            f"organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{org_name}')"
+        )
+        transaction.write_db(rsu_org_remove_query)
 
-    # Delete organization data
-    org_remove_query = "DELETE FROM public.organizations WHERE " f"name = '{org_name}'"
-    pgquery.write_db(org_remove_query)
+        # Delete organization data
+        org_remove_query = (
+            "DELETE FROM public.organizations WHERE " f"name = '{org_name}'"
+        )
+        transaction.write_db(org_remove_query)
 
+    middleware.invalidate_all_users()
     return {"message": "Organization successfully deleted"}, 200
 
 
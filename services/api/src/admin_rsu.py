@@ -80,46 +80,45 @@ def modify_rsu(rsu_spec):
     model = rsu_spec["model"][(space_index + 1) :]
 
     try:
-        # Modify the existing RSU data
-        query = (
-            "UPDATE public.rsus SET "
-            f"geography=ST_GeomFromText('POINT({str(rsu_spec['geo_position']['longitude'])} {str(rsu_spec['geo_position']['latitude'])})'), "
-            f"milepost={str(rsu_spec['milepost'])}, "
-            f"ipv4_address='{rsu_spec['ip']}', "
-            f"serial_number='{rsu_spec['serial_number']}', "
-            f"primary_route='{rsu_spec['primary_route']}', "
-            f"model=(SELECT rsu_model_id FROM public.rsu_models WHERE name = '{model}'), "
-            f"credential_id=(SELECT credential_id FROM public.rsu_credentials WHERE nickname = '{rsu_spec['ssh_credential_group']}'), "
-            f"snmp_credential_id=(SELECT snmp_credential_id FROM public.snmp_credentials WHERE nickname = '{rsu_spec['snmp_credential_group']}'), "
-            f"snmp_protocol_id=(SELECT snmp_protocol_id FROM public.snmp_protocols WHERE nickname = '{rsu_spec['snmp_version_group']}'), "
-            f"iss_scms_id='{rsu_spec['scms_id']}' "
-            f"WHERE ipv4_address='{rsu_spec['orig_ip']}'"
-        )
-        pgquery.write_db(query)
-
-        # Add the rsu-to-organization relationships for the organizations to add
-        if len(rsu_spec["organizations_to_add"]) > 0:
-            org_add_query = (
-                "INSERT INTO public.rsu_organization(rsu_id, organization_id) VALUES"
+        with pgquery.transaction() as transaction:
+            # Modify the existing RSU data
+            query = (
+                "UPDATE public.rsus SET "
+                f"geography=ST_GeomFromText('POINT({str(rsu_spec['geo_position']['longitude'])} {str(rsu_spec['geo_position']['latitude'])})'), "
+                f"milepost={str(rsu_spec['milepost'])}, "
+                f"ipv4_address='{rsu_spec['ip']}', "
+                f"serial_number='{rsu_spec['serial_number']}', "
+                f"primary_route='{rsu_spec['primary_route']}', "
+                f"model=(SELECT rsu_model_id FROM public.rsu_models WHERE name = '{model}'), "
+                f"credential_id=(SELECT credential_id FROM public.rsu_credentials WHERE nickname = '{rsu_spec['ssh_credential_group']}'), "
+                f"snmp_credential_id=(SELECT snmp_credential_id FROM public.snmp_credentials WHERE nickname = '{rsu_spec['snmp_credential_group']}'), "
+                f"snmp_protocol_id=(SELECT snmp_protocol_id FROM public.snmp_protocols WHERE nickname = '{rsu_spec['snmp_version_group']}'), "
+                f"iss_scms_id='{rsu_spec['scms_id']}' "
+                f"WHERE ipv4_address='{rsu_spec['orig_ip']}'"
             )
-            for organization in rsu_spec["organizations_to_add"]:
-                org_add_query += (
-                    " ("
-                    f"(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_spec['ip']}'), "
-                    f"(SELECT organization_id FROM public.organizations WHERE name = '{organization}')"
-                    "),"
+            transaction.write_db(query)
+
+            # Add the rsu-to-organization relationships for the organizations to add
+            if len(rsu_spec["organizations_to_add"]) > 0:
+                org_add_query = "INSERT INTO public.rsu_organization(rsu_id, organization_id) VALUES"
+                for organization in rsu_spec["organizations_to_add"]:
+                    org_add_query += (
+                        " ("
+                        f"(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_spec['ip']}'), "
+                        f"(SELECT organization_id FROM public.organizations WHERE name = '{organization}')"
+                        "),"
+                    )
+                org_add_query = org_add_query[:-1]
+                transaction.write_db(org_add_query)
+
+            # Remove the rsu-to-organization relationships for the organizations to remove
+            for organization in rsu_spec["organizations_to_remove"]:
+                org_remove_query = (
+                    "DELETE FROM public.rsu_organization WHERE "
+                    f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_spec['ip']}') "
+                    f"AND organization_id=(SELECT organization_id FROM public.organizations WHERE name = '{organization}')"
                 )
-            org_add_query = org_add_query[:-1]
-            pgquery.write_db(org_add_query)
-
-        # Remove the rsu-to-organization relationships for the organizations to remove
-        for organization in rsu_spec["organizations_to_remove"]:
-            org_remove_query = (
-                "DELETE FROM public.rsu_organization WHERE "
-                f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_spec['ip']}') "
-                f"AND organization_id=(SELECT organization_id FROM public.organizations WHERE name = '{organization}')"
-            )
-            pgquery.write_db(org_remove_query)
+                transaction.write_db(org_remove_query)
     except sqlalchemy.exc.IntegrityError as e:
         failed_value = e.orig.args[0]["D"]
         failed_value = failed_value.replace("(", '"')
@@ -135,37 +134,38 @@ def modify_rsu(rsu_spec):
 
 
 def delete_rsu(rsu_ip):
-    # Delete RSU to Organization relationships
-    org_remove_query = (
-        "DELETE FROM public.rsu_organization WHERE "
-        f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_ip}')"
-    )
-    pgquery.write_db(org_remove_query)
+    with pgquery.transaction() as transaction:
+        # Delete RSU to Organization relationships
+        org_remove_query = (
+            "DELETE FROM public.rsu_organization WHERE "
+            f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_ip}')"
+        )
+        transaction.write_db(org_remove_query)
 
-    # Delete recorded RSU ping data
-    ping_remove_query = (
-        "DELETE FROM public.ping WHERE "
-        f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_ip}')"
-    )
-    pgquery.write_db(ping_remove_query)
+        # Delete recorded RSU ping data
+        ping_remove_query = (
+            "DELETE FROM public.ping WHERE "
+            f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_ip}')"
+        )
+        transaction.write_db(ping_remove_query)
 
-    # Delete recorded RSU SCMS health data
-    scms_remove_query = (
-        "DELETE FROM public.scms_health WHERE "
-        f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_ip}')"
-    )
-    pgquery.write_db(scms_remove_query)
+        # Delete recorded RSU SCMS health data
+        scms_remove_query = (
+            "DELETE FROM public.scms_health WHERE "
+            f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_ip}')"
+        )
+        transaction.write_db(scms_remove_query)
 
-    # Delete snmp message forward config data
-    msg_config_remove_query = (
-        "DELETE FROM public.snmp_msgfwd_config WHERE "
-        f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_ip}')"
-    )
-    pgquery.write_db(msg_config_remove_query)
+        # Delete snmp message forward config data
+        msg_config_remove_query = (
+            "DELETE FROM public.snmp_msgfwd_config WHERE "
+            f"rsu_id=(SELECT rsu_id FROM public.rsus WHERE ipv4_address = '{rsu_ip}')"
+        )
+        transaction.write_db(msg_config_remove_query)
 
-    # Delete RSU data
-    rsu_remove_query = "DELETE FROM public.rsus WHERE " f"ipv4_address = '{rsu_ip}'"
-    pgquery.write_db(rsu_remove_query)
+        # Delete RSU data
+        rsu_remove_query = "DELETE FROM public.rsus WHERE " f"ipv4_address = '{rsu_ip}'"
+        transaction.write_db(rsu_remove_query)
 
     return {"message": "RSU successfully deleted"}
 
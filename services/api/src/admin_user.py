@@ -2,6 +2,7 @@ import logging
 import common.pgquery as pgquery
 import sqlalchemy
 import admin_new_user
+import middleware
 import os
 
 
@@ -92,49 +93,50 @@ def modify_user(user_spec):
         }, 500
 
     try:
-        # Modify the existing user data
-        query = (
-            "UPDATE public.users SET "
-            f"email='{user_spec['email']}', "
-            f"first_name='{user_spec['first_name']}', "
-            f"last_name='{user_spec['last_name']}', "
-            f"super_user='{'1' if user_spec['super_user'] else '0'}' "
-            f"WHERE email = '{user_spec['orig_email']}'"
-        )
-        pgquery.write_db(query)
-
-        # Add the user-to-organization relationships
-        if len(user_spec["organizations_to_add"]) > 0:
-            org_add_query = "INSERT INTO public.user_organization(user_id, organization_id, role_id) VALUES"
-            for organization in user_spec["organizations_to_add"]:
-                org_add_query += (
-                    " ("
-                    f"(SELECT user_id FROM public.users WHERE email = '{user_spec['email']}'), "
-                    f"(SELECT organization_id FROM public.organizations WHERE name = '{organization['name']}'), "
-                    f"(SELECT role_id FROM public.roles WHERE name = '{organization['role']}')"
-                    "),"
-                )
-            org_add_query = org_add_query[:-1]
-            pgquery.write_db(org_add_query)
-
-        # Modify the user-to-organization relationships
-        for organization in user_spec["organizations_to_modify"]:
-            org_modify_query = (
-                "UPDATE public.user_organization "
-                f"SET role_id = (SELECT role_id FROM public.roles WHERE name = '{organization['role']}') "
-                f"WHERE user_id = (SELECT user_id FROM public.users WHERE email = '{user_spec['email']}') "
-                f"AND organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{organization['name']}')"
+        with pgquery.transaction() as transaction:
+            # Modify the existing user data
+            query = (
+                "UPDATE public.users SET "
+                f"email='{user_spec['email']}', "
+                f"first_name='{user_spec['first_name']}', "
+                f"last_name='{user_spec['last_name']}', "
+                f"super_user='{'1' if user_spec['super_user'] else '0'}' "
+                f"WHERE email = '{user_spec['orig_email']}'"
             )
-            pgquery.write_db(org_modify_query)
-
-        # Remove the user-to-organization relationships
-        for organization in user_spec["organizations_to_remove"]:
-            org_remove_query = (
-                "DELETE FROM public.user_organization WHERE "
-                f"user_id = (SELECT user_id FROM public.users WHERE email = '{user_spec['email']}') "
-                f"AND organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{organization['name']}')"
-            )
-            pgquery.write_db(org_remove_query)
+            transaction.write_db(query)
+
+            # Add the user-to-organization relationships
+            if len(user_spec["organizations_to_add"]) > 0:
+                org_add_query = "INSERT INTO public.user_organization(user_id, organization_id, role_id) VALUES"
+                for organization in user_spec["organizations_to_add"]:
+                    org_add_query += (
+                        " ("
+                        f"(SELECT user_id FROM public.users WHERE email = '{user_spec['email']}'), "
+                        f"(SELECT organization_id FROM public.organizations WHERE name = '{organization['name']}'), "
+                        f"(SELECT role_id FROM public.roles WHERE name = '{organization['role']}')"
+                        "),"
+                    )
+                org_add_query = org_add_query[:-1]
+                transaction.write_db(org_add_query)
+
+            # Modify the user-to-organization relationships
+            for organization in user_spec["organizations_to_modify"]:
+                org_modify_query = (
+                    "UPDATE public.user_organization "
+                    f"SET role_id = (SELECT role_id FROM public.roles WHERE name = '{organization['role']}') "
+                    f"WHERE user_id = (SELECT user_id FROM public.users WHERE email = '{user_spec['email']}') "
+                    f"AND organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{organization['name']}')"
+                )
+                transaction.write_db(org_modify_query)
+
+            # Remove the user-to-organization relationships
+            for organization in user_spec["organizations_to_remove"]:
+                org_remove_query = (
+                    "DELETE FROM public.user_organization WHERE "
+                    f"user_id = (SELECT user_id FROM public.users WHERE email = '{user_spec['email']}') "
+                    f"AND organization_id = (SELECT organization_id FROM public.organizations WHERE name = '{organization['name']}')"
+                )
+                transaction.write_db(org_remove_query)
     except sqlalchemy.exc.IntegrityError as e:
         failed_value = e.orig.args[0]["D"]
         failed_value = failed_value.replace("(", '"')
@@ -146,21 +148,25 @@ def modify_user(user_spec):
         logging.error(f"Exception encountered: {e}")
         return {"message": "Encountered unknown issue"}, 500
 
+    middleware.invalidate_user(user_spec["orig_email"])
+    middleware.invalidate_user(user_spec["email"])
     return {"message": "User successfully modified"}, 200
 
 
 def delete_user(user_email):
-    # Delete user-to-organization relationships
-    org_remove_query = (
-        "DELETE FROM public.user_organization WHERE "
-        f"user_id = (SELECT user_id FROM public.users WHERE email = '{user_email}')"
-    )
-    pgquery.write_db(org_remove_query)
+    with pgquery.transaction() as transaction:
+        # Delete user-to-organization relationships
+        org_remove_query = (
+            "DELETE FROM public.user_organization WHERE "
+            f"user_id = (SELECT user_id FROM public.users WHERE email = '{user_email}')"
+        )
+        transaction.write_db(org_remove_query)
 
-    # Delete user data
-    user_remove_query = "DELETE FROM public.users WHERE " f"email = '{user_email}'"
-    pgquery.write_db(user_remove_query)
+        # Delete user data
+        user_remove_query = "DELETE FROM public.users WHERE " f"email = '{user_email}'"
+        transaction.write_db(user_remove_query)
 
+    middleware.invalidate_user(user_email)
     return {"message": "User successfully deleted"}
 
 
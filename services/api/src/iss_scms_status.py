@@ -18,12 +18,12 @@ def get_iss_scms_status(organization):
         ") AS a "
         "WHERE a.row_id <= 1 ORDER BY rsu_id"
         ") AS scms_health_data ON rd.rsu_id = scms_health_data.rsu_id "
-        f"WHERE ron_v.name = '{organization}' "
+        "WHERE ron_v.name = :organization "
         "ORDER BY rd.ipv4_address"
     )
 
     logging.debug(f'Executing query "{query};"')
-    data = pgquery.query_db(query)
+    data = pgquery.query_db(query, {"organization": organization})
 
     logging.info("Parsing results...")
     result = {}
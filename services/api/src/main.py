@@ -10,7 +10,7 @@ from admin_new_email_notification import AdminNewNotification
 from userauth import UserAuth
 from healthcheck import HealthCheck
 from rsuinfo import RsuInfo
-from rsu_querycounts import RsuQueryCounts
+from rsu_querycounts import RsuQueryCounts, ensure_counts_index
 from rsu_querymsgfwd import RsuQueryMsgFwd
 from rsu_online_status import RsuOnlineStatus
 from rsu_commands import RsuCommandRequest
@@ -64,5 +64,7 @@ api.add_resource(AdminNewNotification, "/admin-new-notification")
 api.add_resource(ContactSupportResource, "/contact-support")
 api.add_resource(RSUErrorSummaryResource, "/rsu-error-summary")
 
+ensure_counts_index()
+
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
@@ -1,39 +1,168 @@
 from werkzeug.wrappers import Request, Response
 from keycloak import KeycloakOpenID
+from jose import jwt, JWTError
+from common.util import TTLCache
+import hashlib
 import logging
 import os
+import threading
+import time
 import common.pgquery as pgquery
+import common.clients as clients
 
+# Introspected tokens are cached by token hash for at most token_cache_ttl seconds, and never past
+# the token's own expiry. User permissions are cached by email until an admin endpoint modifies them.
+token_cache_ttl = int(os.getenv("TOKEN_CACHE_TTL", 60))
+user_cache_ttl = int(os.getenv("USER_CACHE_TTL", 300))
+token_cache = TTLCache(int(os.getenv("TOKEN_CACHE_SIZE", 1000)))
+user_cache = TTLCache(int(os.getenv("USER_CACHE_SIZE", 1000)))
 
-def get_user_role(token):
-    keycloak_openid = KeycloakOpenID(
-        server_url=os.getenv("KEYCLOAK_ENDPOINT"),
-        realm_name=os.getenv("KEYCLOAK_REALM"),
-        client_id=os.getenv("KEYCLOAK_API_CLIENT_ID"),
-        client_secret_key=os.getenv("KEYCLOAK_API_CLIENT_SECRET_KEY"),
+# With the LOCAL auth mode, signed JWTs are verified against the realm's cached JWKS and Keycloak is
+# only called to introspect opaque tokens or tokens signed by a key that is not in the JWKS
+auth_mode = os.getenv("KEYCLOAK_AUTH_MODE", "INTROSPECT").upper()
+jwks_refresh_interval = int(os.getenv("JWKS_REFRESH_INTERVAL", 300))
+# Minimum number of seconds between JWKS refreshes triggered by an unknown key ID
+jwks_min_refresh_interval = 10
+jwks_lock = threading.Lock()
+jwks_keys = {}
+jwks_fetched = None
+
+
+def get_keycloak_openid():
+    return clients.get_client(
+        "keycloak",
+        lambda: KeycloakOpenID(
+            server_url=os.getenv("KEYCLOAK_ENDPOINT"),
+            realm_name=os.getenv("KEYCLOAK_REALM"),
+            client_id=os.getenv("KEYCLOAK_API_CLIENT_ID"),
+            client_secret_key=os.getenv("KEYCLOAK_API_CLIENT_SECRET_KEY"),
+        ),
     )
-    logging.debug(f"Middleware get_user_role introspect token {token}")
-    introspect = keycloak_openid.introspect(token)
-    data = []
-
-    if introspect["active"]:
-        userinfo = keycloak_openid.userinfo(token)
-        logging.debug(f"Middleware get_user_role get user info of {userinfo['email']}")
-
-        email = userinfo["email"]
-        query = (
-            "SELECT jsonb_build_object('email', u.email, 'first_name', u.first_name, 'last_name', u.last_name, 'organization', org.name, 'role', roles.name, 'super_user', u.super_user) "
-            "FROM public.users u "
-            "JOIN public.user_organization uo on u.user_id = uo.user_id "
-            "JOIN public.organizations org on uo.organization_id = org.organization_id "
-            "JOIN public.roles on uo.role_id = roles.role_id "
-            f"WHERE u.email = '{email}'"
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def get_signing_key(kid):
+    global jwks_keys, jwks_fetched
+    with jwks_lock:
+        now = time.monotonic()
+        age = None if jwks_fetched is None else now - jwks_fetched
+        stale = age is None or age >= jwks_refresh_interval
+        # Keys rotated in Keycloak are picked up early, without letting bad key IDs hammer the realm
+        unknown_kid = (
+            not stale and kid not in jwks_keys and age >= jwks_min_refresh_interval
         )
+        if stale or unknown_kid:
+            logging.debug("Middleware refreshing realm JWKS")
+            certs = get_keycloak_openid().certs()
+            jwks_keys = {key["kid"]: key for key in certs["keys"] if "kid" in key}
+            jwks_fetched = now
+        return jwks_keys.get(kid)
+
+
+def verify_token_locally(token):
+    # Returns the verified claims, or None when the token cannot be verified locally. Tokens with
+    # a bad signature or expired claims raise a JWTError.
+    try:
+        header = jwt.get_unverified_header(token)
+    except JWTError:
+        logging.debug("Middleware token is not a JWT, falling back to introspection")
+        return None
+
+    key = get_signing_key(header.get("kid"))
+    if key is None:
+        logging.debug(
+            "Middleware token key ID is unknown, falling back to introspection"
+        )
+        return None
+
+    # Keycloak access tokens are issued for the account audience rather than the API client
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=[key.get("alg", "RS256")],
+        options={"verify_aud": False},
+    )
+    if "email" not in claims:
+        logging.debug(
+            "Middleware token has no email claim, falling back to introspection"
+        )
+        return None
+    return claims
+
+
+def cache_token(token_hash, email, exp):
+    ttl = token_cache_ttl
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    token_cache.set(token_hash, email, ttl)
+
+
+def get_token_email(token):
+    token_hash = hash_token(token)
+    email = token_cache.get(token_hash)
+    if email is not None:
+        return email
 
-        logging.debug(f'Executing query "{query};"...')
-        data = pgquery.query_db(query)
-    else:
-        logging.error("User token does not exist", token)
+    if auth_mode == "LOCAL":
+        try:
+            claims = verify_token_locally(token)
+        except JWTError as e:
+            logging.error(f"User token failed verification: {e}")
+            return None
+        if claims is not None:
+            cache_token(token_hash, claims["email"], claims.get("exp"))
+            return claims["email"]
+
+    keycloak_openid = get_keycloak_openid()
+    logging.debug(f"Middleware get_token_email introspect token {token}")
+    introspect = keycloak_openid.introspect(token)
+    if not introspect["active"]:
+        logging.error("User token does not exist")
+        return None
+
+    userinfo = keycloak_openid.userinfo(token)
+    logging.debug(f"Middleware get_token_email get user info of {userinfo['email']}")
+    email = userinfo["email"]
+
+    cache_token(token_hash, email, introspect.get("exp"))
+    return email
+
+
+def get_user_permissions(email):
+    data = user_cache.get(email)
+    if data is not None:
+        return data
+
+    query = (
+        "SELECT jsonb_build_object('email', u.email, 'first_name', u.first_name, 'last_name', u.last_name, 'organization', org.name, 'role', roles.name, 'super_user', u.super_user) "
+        "FROM public.users u "
+        "JOIN public.user_organization uo on u.user_id = uo.user_id "
+        "JOIN public.organizations org on uo.organization_id = org.organization_id "
+        "JOIN public.roles on uo.role_id = roles.role_id "
+        "WHERE u.email = :email"
+    )
+
+    logging.debug(f'Executing query "{query};"...')
+    data = pgquery.query_db(query, {"email": email})
+    if len(data) != 0:
+        user_cache.set(email, data, user_cache_ttl)
+    return data
+
+
+def invalidate_user(email):
+    user_cache.pop(email)
+
+
+def invalidate_all_users():
+    user_cache.clear()
+
+
+def get_user_role(token):
+    email = get_token_email(token)
+    data = [] if email is None else get_user_permissions(email)
 
     if len(data) != 0:
         return data
@@ -87,8 +87,6 @@ def execute_command(command, rsu_ip, args, rsu_info):
 def fetch_rsu_info(rsu_ip, organization):
     logging.info(f"Fetching RSU info for RSU {rsu_ip}")
     query = (
-        "SELECT to_jsonb(row) "
-        "FROM ("
         "SELECT rd.rsu_id AS rsu_id, man.name AS manufacturer_name, rcred.username AS ssh_username, rcred.password AS ssh_password, snmp.username AS snmp_username, snmp.password AS snmp_password, snmp.encrypt_password as snmp_encrypt_pw, sver.protocol_code AS snmp_version "
         "FROM public.rsus AS rd "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
@@ -97,15 +95,16 @@ def fetch_rsu_info(rsu_ip, organization):
         "LEFT JOIN public.rsu_credentials AS rcred ON rcred.credential_id = rd.credential_id "
         "LEFT JOIN public.snmp_credentials AS snmp ON snmp.snmp_credential_id = rd.snmp_credential_id "
         "LEFT JOIN public.snmp_protocols AS sver ON sver.snmp_protocol_id = rd.snmp_protocol_id "
-        f"WHERE ron_v.name = '{organization}' AND rd.ipv4_address = '{rsu_ip}'"
-        ") as row"
+        "WHERE ron_v.name = :organization AND rd.ipv4_address = :rsu_ip"
     )
 
-    data = pgquery.query_db(query)
+    data = pgquery.query_db(
+        query, {"organization": organization, "rsu_ip": rsu_ip}, mapping=True
+    )
     logging.info("Parsing results...")
     if len(data) > 0:
         # Grab the first result, it should be the only result
-        row = dict(data[0][0])
+        row = data[0]
         rsu_info = {
             "rsu_id": row["rsu_id"],
             "manufacturer": row["manufacturer_name"],
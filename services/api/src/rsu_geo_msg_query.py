@@ -1,8 +1,8 @@
 import common.util as util
+import common.clients as clients
 import os
 import logging
 from datetime import datetime
-from pymongo import MongoClient
 import math
 
 coord_resolution = 0.0001  # lats more than this are considered different
@@ -32,7 +32,7 @@ def query_geo_data_mongo(pointList, start, end, msg_type):
         logging.debug(
             f"Connecting to Mongo {coll_name} collection with URI: {mongo_uri} with db: {db_name}"
         )
-        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+        client = clients.get_mongo_client(mongo_uri)
         db = client[db_name]
         collection = db[coll_name]
     except Exception as e:
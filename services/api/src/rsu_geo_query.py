@@ -7,11 +7,11 @@ def query_org_rsus(orgName):
     query = (
         "SELECT ipv4_address from public.rsus as rd "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
-        f"WHERE ron_v.name = '{orgName}'"
+        "WHERE ron_v.name = :organization"
     )
 
     logging.debug(query)
-    data = pgquery.query_db(query)
+    data = pgquery.query_db(query, {"organization": orgName})
 
     result = set()
     for row in data:
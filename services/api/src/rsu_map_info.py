@@ -10,10 +10,12 @@ def get_map_data(ip_address, organization):
         "FROM public.map_info AS mi "
         "JOIN public.rsus AS rd ON rd.ipv4_address = mi.ipv4_address "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
-        f"WHERE ron_v.name = '{organization}' AND mi.ipv4_address = '{ip_address}'"
+        "WHERE ron_v.name = :organization AND mi.ipv4_address = :ip_address"
     )
     try:
-        result = pgquery.query_db(query)
+        result = pgquery.query_db(
+            query, {"organization": organization, "ip_address": ip_address}
+        )
     except Exception as e:
         logging.info(f"Error selecting GeoJSON data for {ip_address}")
         return (400, f"Error selecting GeoJSON data for {ip_address}")
@@ -30,10 +32,10 @@ def get_ip_list(organization):
         "FROM public.map_info AS mi "
         "JOIN public.rsus AS rd ON rd.ipv4_address = mi.ipv4_address "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
-        f"WHERE ron_v.name = '{organization}'"
+        "WHERE ron_v.name = :organization"
     )
     try:
-        result = pgquery.query_db(query)
+        result = pgquery.query_db(query, {"organization": organization})
     except Exception as e:
         logging.info(f"Error selecting ip list: {e}")
         return (400, f"Error selecting ip list")
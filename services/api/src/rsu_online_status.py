@@ -18,14 +18,20 @@ def get_ping_data(organization):
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
         "JOIN ("
         "SELECT * FROM public.ping AS ping_data "
-        f"WHERE ping_data.timestamp >= '{t.strftime('%Y/%m/%dT%H:%M:%S')}'::timestamp"
+        "WHERE ping_data.timestamp >= :start_time::timestamp"
         ") AS ping_data ON rd.rsu_id = ping_data.rsu_id "
-        f"WHERE ron_v.name = '{organization}' "
+        "WHERE ron_v.name = :organization "
         "ORDER BY rd.rsu_id, ping_data.timestamp DESC"
     )
 
     logging.debug(f'Executing query: "{query};"')
-    data = pgquery.query_db(query)
+    data = pgquery.stream_db(
+        query,
+        {
+            "start_time": t.strftime("%Y/%m/%dT%H:%M:%S"),
+            "organization": organization,
+        },
+    )
 
     logging.info("Parsing results...")
     for row in data:
@@ -55,8 +61,8 @@ def get_last_online_data(ip, organization):
         "SELECT rsus.rsu_id, rsus.ipv4_address "
         "FROM public.rsus "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rsus.rsu_id "
-        f"WHERE rsus.ipv4_address = '{ip}' "
-        f"AND ron_v.name = '{organization}'"
+        "WHERE rsus.ipv4_address = :ip "
+        "AND ron_v.name = :organization"
         ") AS rd ON ping.rsu_id = rd.rsu_id "
         "WHERE ping.rsu_id = rd.rsu_id "
         "AND result = '1' "
@@ -65,7 +71,7 @@ def get_last_online_data(ip, organization):
     )
 
     logging.debug(f'Executing query: "{query};"')
-    data = pgquery.query_db(query)
+    data = pgquery.query_db(query, {"ip": ip, "organization": organization})
     result = [value[0] for value in data]
 
     return {
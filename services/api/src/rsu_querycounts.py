@@ -1,9 +1,10 @@
 from datetime import datetime, timedelta
 import common.pgquery as pgquery
 import common.util as util
+import common.clients as clients
 import os
 import logging
-from pymongo import MongoClient
+from pymongo import ASCENDING
 
 message_types = {
     "bsm": "BSM",
@@ -15,49 +16,98 @@ message_types = {
     "psm": "PSM",
 }
 
+# Rollup collections maintained by the count_metric rollup counter
+count_tiers = {
+    "hourly": "CVCountsHourly",
+    "daily": "CVCountsDaily",
+    "monthly": "CVCountsMonthly",
+}
+
+
+def select_count_tier(start_dt, end_dt):
+    # The coarsest tier whose buckets line up with both ends of the range
+    if start_dt.hour == 0 and end_dt.hour == 0:
+        if start_dt.day == 1 and end_dt.day == 1:
+            return "monthly"
+        return "daily"
+    return "hourly"
+
 
-def query_rsu_counts_mongo(allowed_ips_dict, message_type, start, end):
+def query_rsu_counts_mongo(allowed_ips_dict, message_type, start, end, tier=None):
     start_dt = util.format_date_utc(start, "DATETIME").replace(
-        hour=0, minute=0, second=0, microsecond=0
+        minute=0, second=0, microsecond=0
     )
     end_dt = util.format_date_utc(end, "DATETIME").replace(
-        hour=0, minute=0, second=0, microsecond=0
+        minute=0, second=0, microsecond=0
     )
+    if tier is None:
+        # The daily counter's CVCounts buckets only line up with whole days
+        start_dt = start_dt.replace(hour=0)
+        end_dt = end_dt.replace(hour=0)
+        collection_name = "CVCounts"
+    else:
+        if tier == "auto":
+            tier = select_count_tier(start_dt, end_dt)
+        collection_name = count_tiers[tier]
 
     try:
-        client = MongoClient(os.getenv("MONGO_DB_URI"), serverSelectionTimeoutMS=5000)
+        client = clients.get_mongo_client(os.getenv("MONGO_DB_URI"))
         mongo_db = client[os.getenv("MONGO_DB_NAME")]
-        collection = mongo_db[f"CVCounts"]
+        collection = mongo_db[collection_name]
     except Exception as e:
         logging.error(
             f"Failed to connect to Mongo counts collection with error message: {e}"
         )
         return {}, 503
 
+    # Sum every count bucket in the range for all of the organization's RSUs in one aggregation
+    pipeline = [
+        {
+            "$match": {
+                "messageType": message_types[message_type.lower()],
+                "rsuIp": {"$in": list(allowed_ips_dict)},
+                "timestamp": {
+                    "$gte": start_dt,
+                    "$lt": end_dt,
+                },
+            }
+        },
+        {"$group": {"_id": "$rsuIp", "count": {"$sum": "$count"}}},
+    ]
+
+    try:
+        logging.debug(f"Running pipeline: {pipeline}, on collection: {collection.name}")
+        counts = {doc["_id"]: doc["count"] for doc in collection.aggregate(pipeline)}
+    except Exception as e:
+        logging.error(f"Filter failed: {e}")
+        return {}, 500
+
     result = {}
     for rsu_ip in allowed_ips_dict:
-        query = {
-            "messageType": message_types[message_type.lower()],
-            "rsuIp": rsu_ip,
-            "timestamp": {
-                "$gte": start_dt,
-                "$lt": end_dt,
-            },
+        result[rsu_ip] = {
+            "road": allowed_ips_dict[rsu_ip],
+            "count": counts.get(rsu_ip, 0),
         }
+    return result, 200
 
-        try:
-            logging.debug(f"Running query: {query}, on collection: {collection.name}")
-            response = collection.find_one(query)
-            if not response:
-                item = {"road": allowed_ips_dict[rsu_ip], "count": 0}
-            else:
-                item = {"road": allowed_ips_dict[rsu_ip], "count": response["count"]}
-            result[rsu_ip] = item
-        except Exception as e:
-            logging.error(f"Filter failed: {e}")
-            return {}, 500
 
-    return result, 200
+def ensure_counts_index():
+    # Backs the /rsucounts aggregation, which matches on message type, RSU IP and a time range
+    mongo_uri = os.getenv("MONGO_DB_URI")
+    if not mongo_uri:
+        return
+    try:
+        client = clients.get_mongo_client(mongo_uri)
+        collection = client[os.getenv("MONGO_DB_NAME")]["CVCounts"]
+        collection.create_index(
+            [
+                ("messageType", ASCENDING),
+                ("rsuIp", ASCENDING),
+                ("timestamp", ASCENDING),
+            ]
+        )
+    except Exception as e:
+        logging.warning(f"Failed to create the CVCounts index with error message: {e}")
 
 
 def get_organization_rsus(organization):
@@ -65,22 +115,18 @@ def get_organization_rsus(organization):
 
     # Execute the query and fetch all results
     query = (
-        "SELECT to_jsonb(row) "
-        "FROM ("
-        "SELECT rd.ipv4_address, rd.primary_route "
+        "SELECT host(rd.ipv4_address) AS ipv4_address, rd.primary_route "
         "FROM public.rsus rd "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
-        f"WHERE ron_v.name = '{organization}' "
+        "WHERE ron_v.name = :organization "
         "ORDER BY primary_route ASC, milepost ASC"
-        ") as row"
     )
 
     logging.debug(f'Executing query: "{query};"')
-    data = pgquery.query_db(query)
+    data = pgquery.query_db(query, {"organization": organization}, mapping=True)
 
     rsu_dict = {}
     for row in data:
-        row = dict(row[0])
         rsu_dict[row["ipv4_address"]] = row["primary_route"]
     return rsu_dict
 
@@ -88,13 +134,17 @@ def get_organization_rsus(organization):
 # REST endpoint resource class and schema
 from flask import request, abort
 from flask_restful import Resource
-from marshmallow import Schema, fields
+from marshmallow import Schema, fields, validate
 
 
 class RsuQueryCountsSchema(Schema):
     message = fields.String(required=False)
     start = fields.DateTime(required=False)
     end = fields.DateTime(required=False)
+    tier = fields.String(
+        required=False,
+        validate=validate.OneOf(["auto", *count_tiers]),
+    )
 
 
 class RsuQueryCounts(Resource):
@@ -130,6 +180,7 @@ class RsuQueryCounts(Resource):
         end = request.args.get(
             "end", default=((datetime.now()).strftime("%Y-%m-%dT%H:%M:%S"))
         )
+        tier = request.args.get("tier", default=None)
 
         # Validate request with supported message types
         logging.debug(f"COUNTS_MSG_TYPES: {os.getenv('COUNTS_MSG_TYPES','NOT_SET')}")
@@ -145,6 +196,6 @@ class RsuQueryCounts(Resource):
         code = 204
 
         rsu_dict = get_organization_rsus(request.environ["organization"])
-        data, code = query_rsu_counts_mongo(rsu_dict, message, start, end)
+        data, code = query_rsu_counts_mongo(rsu_dict, message, start, end, tier)
 
         return (data, code, self.headers)
@@ -1,8 +1,8 @@
 import common.util as util
+import common.clients as clients
 import os
 import logging
 from datetime import datetime, timedelta
-from pymongo import MongoClient
 
 
 def query_ssm_data_mongo(result):
@@ -12,7 +12,7 @@ def query_ssm_data_mongo(result):
     start_utc = util.format_date_utc(start_date.isoformat())
 
     try:
-        client = MongoClient(os.getenv("MONGO_DB_URI"), serverSelectionTimeoutMS=5000)
+        client = clients.get_mongo_client(os.getenv("MONGO_DB_URI"))
         db = client[os.getenv("MONGO_DB_NAME")]
         collection = db[os.getenv("SSM_DB_NAME")]
     except Exception as e:
@@ -67,7 +67,7 @@ def query_srm_data_mongo(result):
     start_utc = util.format_date_utc(start_date.isoformat())
 
     try:
-        client = MongoClient(os.getenv("MONGO_DB_URI"), serverSelectionTimeoutMS=5000)
+        client = clients.get_mongo_client(os.getenv("MONGO_DB_URI"))
         db = client[os.getenv("MONGO_DB_NAME")]
         collection = db[os.getenv("SRM_DB_NAME")]
     except Exception as e:
@@ -21,10 +21,10 @@ def check_for_upgrade(rsu_ip):
         "FROM public.rsus AS rd "
         "JOIN public.firmware_upgrade_rules fur ON fur.from_id = rd.firmware_version "
         "JOIN public.firmware_images fi2 ON fi2.firmware_id = fur.to_id "
-        f"WHERE rd.ipv4_address = '{rsu_ip}'"
+        "WHERE rd.ipv4_address = :rsu_ip"
         ") as row"
     )
-    data = pgquery.query_db(query)
+    data = pgquery.query_db(query, {"rsu_ip": rsu_ip})
 
     if len(data) > 0:
         # Grab the first result, it should be the only result if the 'firmware_upgrade_rules' table is populated properly
@@ -56,8 +56,10 @@ def mark_rsu_for_upgrade(rsu_ip):
         }, 500
 
     # Modify PostgreSQL RSU row to new target firmware ID
-    query = f"UPDATE public.rsus SET target_firmware_version = {upgrade_info['upgrade_id']} WHERE ipv4_address = '{rsu_ip}'"
-    pgquery.write_db(query)
+    query = "UPDATE public.rsus SET target_firmware_version = :upgrade_id WHERE ipv4_address = :rsu_ip"
+    pgquery.write_db(
+        query, {"upgrade_id": upgrade_info["upgrade_id"], "rsu_ip": rsu_ip}
+    )
 
     logging.info(f"Initiating firmware upgrade with the firmware manager for {rsu_ip}")
     # Environment variable FIRMWARE_MANAGER_ENDPOINT must contain "http://" and port
@@ -6,25 +6,29 @@ import os
 def get_rsu_data(organization):
     # Execute the query and fetch all results
     query = (
-        "SELECT jsonb_build_object('type', 'Feature', 'id', row.rsu_id, 'geometry', ST_AsGeoJSON(row.geography)::jsonb, 'properties', to_jsonb(row)) "
-        "FROM ("
-        "SELECT rd.rsu_id, rd.geography, rd.milepost, rd.ipv4_address, rd.serial_number, rd.primary_route, rm.name AS model_name, man.name AS manufacturer_name "
+        "SELECT ST_AsGeoJSON(rd.geography)::jsonb AS geometry, rd.rsu_id, rd.geography, rd.milepost, host(rd.ipv4_address) AS ipv4_address, rd.serial_number, rd.primary_route, rm.name AS model_name, man.name AS manufacturer_name "
         "FROM public.rsus AS rd "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
         "JOIN public.rsu_models AS rm ON rm.rsu_model_id = rd.model "
         "JOIN public.manufacturers AS man ON man.manufacturer_id = rm.manufacturer "
-        f"WHERE ron_v.name = '{organization}'"
-        ") AS row"
+        "WHERE ron_v.name = :organization"
     )
 
     logging.debug(f'Executing query "{query};"')
-    data = pgquery.query_db(query)
+    data = pgquery.query_db(query, {"organization": organization}, mapping=True)
 
     logging.info("Parsing results...")
     result = {"rsuList": []}
     for row in data:
-        row = dict(row[0])
-        result["rsuList"].append(row)
+        geometry = row.pop("geometry")
+        result["rsuList"].append(
+            {
+                "type": "Feature",
+                "id": row["rsu_id"],
+                "geometry": geometry,
+                "properties": row,
+            }
+        )
     return result
 
 
@@ -33,7 +33,7 @@ request_params_good = multidict.MultiDict(
 rsu_org_query = (
     "SELECT ipv4_address from public.rsus as rd "
     "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
-    f"WHERE ron_v.name = 'Test'"
+    "WHERE ron_v.name = :organization"
 )
 
 point_list = [
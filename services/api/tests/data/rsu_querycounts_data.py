@@ -20,6 +20,15 @@ request_args_bad_message = multidict.MultiDict(
     ]
 )
 
+request_args_bad_tier = multidict.MultiDict(
+    [
+        ("message", "BSM"),
+        ("start", "2022-05-23T12:00:00"),
+        ("end", "2022-05-24T12:00:00"),
+        ("tier", "weekly"),
+    ]
+)
+
 request_args_bad_type = multidict.MultiDict(
     [("message", 14), ("start", "2022-05-23T12:00:00"), ("end", "2022-05-24T12:00:00")]
 )
@@ -204,8 +204,11 @@ def test_check_safe_input_bad():
 
 
 @patch("api.src.admin_org.check_safe_input")
-@patch("api.src.admin_org.pgquery.write_db")
-def test_modify_user_success(mock_pgquery, mock_check_safe_input):
+@patch("api.src.admin_org.pgquery.transaction")
+@patch("api.src.admin_org.middleware.invalidate_all_users")
+def test_modify_user_success(mock_invalidate_all_users, mock_transaction, mock_check_safe_input):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_safe_input.return_value = True
     expected_msg, expected_code = {"message": "Organization successfully modified"}, 200
     actual_msg, actual_code = admin_org.modify_org(admin_org_data.request_json_good)
@@ -219,13 +222,17 @@ def test_modify_user_success(mock_pgquery, mock_check_safe_input):
         call(admin_org_data.modify_org_remove_rsu_sql),
     ]
     mock_pgquery.assert_has_calls(calls)
+    mock_transaction.assert_called_once()
+    mock_invalidate_all_users.assert_called_once()
     assert actual_msg == expected_msg
     assert actual_code == expected_code
 
 
 @patch("api.src.admin_org.check_safe_input")
-@patch("api.src.admin_org.pgquery.write_db")
-def test_modify_org_check_fail(mock_pgquery, mock_check_safe_input):
+@patch("api.src.admin_org.pgquery.transaction")
+def test_modify_org_check_fail(mock_transaction, mock_check_safe_input):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_safe_input.return_value = False
     expected_msg, expected_code = {
         "message": "No special characters are allowed: !\"#$%&'()*+,./:;<=>?@[\\]^`{|}~. No sequences of '-' characters are allowed"
@@ -234,13 +241,16 @@ def test_modify_org_check_fail(mock_pgquery, mock_check_safe_input):
 
     calls = []
     mock_pgquery.assert_has_calls(calls)
+    mock_transaction.assert_not_called()
     assert actual_msg == expected_msg
     assert actual_code == expected_code
 
 
 @patch("api.src.admin_org.check_safe_input")
-@patch("api.src.admin_org.pgquery.write_db")
-def test_modify_org_generic_exception(mock_pgquery, mock_check_safe_input):
+@patch("api.src.admin_org.pgquery.transaction")
+def test_modify_org_generic_exception(mock_transaction, mock_check_safe_input):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_safe_input.return_value = True
     mock_pgquery.side_effect = Exception("Test")
     expected_msg, expected_code = {"message": "Encountered unknown issue"}, 500
@@ -251,8 +261,10 @@ def test_modify_org_generic_exception(mock_pgquery, mock_check_safe_input):
 
 
 @patch("api.src.admin_org.check_safe_input")
-@patch("api.src.admin_org.pgquery.write_db")
-def test_modify_org_sql_exception(mock_pgquery, mock_check_safe_input):
+@patch("api.src.admin_org.pgquery.transaction")
+def test_modify_org_sql_exception(mock_transaction, mock_check_safe_input):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_safe_input.return_value = True
     orig = MagicMock()
     orig.args = ({"D": "SQL issue encountered"},)
@@ -267,9 +279,12 @@ def test_modify_org_sql_exception(mock_pgquery, mock_check_safe_input):
 # delete_org
 
 
-@patch("api.src.admin_org.pgquery.write_db")
+@patch("api.src.admin_org.pgquery.transaction")
 @patch("api.src.admin_org.pgquery.query_db")
-def test_delete_org(mock_query_db, mock_write_db):
+@patch("api.src.admin_org.middleware.invalidate_all_users")
+def test_delete_org(mock_invalidate_all_users, mock_query_db, mock_transaction):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_write_db = mock_transaction.return_value.__enter__.return_value.write_db
     mock_query_db.return_value = []
     expected_result = {"message": "Organization successfully deleted"}, 200
     actual_result = admin_org.delete_org("test org")
@@ -280,6 +295,8 @@ def test_delete_org(mock_query_db, mock_write_db):
         call(admin_org_data.delete_org_calls[2]),
     ]
     mock_write_db.assert_has_calls(calls)
+    mock_transaction.assert_called_once()
+    mock_invalidate_all_users.assert_called_once()
     assert actual_result == expected_result
 
 @patch("api.src.admin_org.pgquery.query_db")
@@ -209,8 +209,10 @@ def test_get_modify_rsu_data_rsu(mock_get_rsu_data, mock_get_allowed_selections)
 
 
 @patch("api.src.admin_rsu.admin_new_rsu.check_safe_input")
-@patch("api.src.admin_rsu.pgquery.write_db")
-def test_modify_rsu_success(mock_pgquery, mock_check_safe_input):
+@patch("api.src.admin_rsu.pgquery.transaction")
+def test_modify_rsu_success(mock_transaction, mock_check_safe_input):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_safe_input.return_value = True
     expected_msg, expected_code = {"message": "RSU successfully modified"}, 200
     actual_msg, actual_code = admin_rsu.modify_rsu(admin_rsu_data.request_json_good)
@@ -221,13 +223,16 @@ def test_modify_rsu_success(mock_pgquery, mock_check_safe_input):
         call(admin_rsu_data.remove_org_sql),
     ]
     mock_pgquery.assert_has_calls(calls)
+    mock_transaction.assert_called_once()
     assert actual_msg == expected_msg
     assert actual_code == expected_code
 
 
 @patch("api.src.admin_rsu.admin_new_rsu.check_safe_input")
-@patch("api.src.admin_rsu.pgquery.write_db")
-def test_modify_rsu_check_fail(mock_pgquery, mock_check_safe_input):
+@patch("api.src.admin_rsu.pgquery.transaction")
+def test_modify_rsu_check_fail(mock_transaction, mock_check_safe_input):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_safe_input.return_value = False
     expected_msg, expected_code = {
         "message": "No special characters are allowed: !\"#$%&'()*+,./:;<=>?@[\\]^`{|}~. No sequences of '-' characters are allowed"
@@ -236,13 +241,16 @@ def test_modify_rsu_check_fail(mock_pgquery, mock_check_safe_input):
 
     calls = []
     mock_pgquery.assert_has_calls(calls)
+    mock_transaction.assert_not_called()
     assert actual_msg == expected_msg
     assert actual_code == expected_code
 
 
 @patch("api.src.admin_rsu.admin_new_rsu.check_safe_input")
-@patch("api.src.admin_rsu.pgquery.write_db")
-def test_modify_rsu_generic_exception(mock_pgquery, mock_check_safe_input):
+@patch("api.src.admin_rsu.pgquery.transaction")
+def test_modify_rsu_generic_exception(mock_transaction, mock_check_safe_input):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_safe_input.return_value = True
     mock_pgquery.side_effect = Exception("Test")
     expected_msg, expected_code = {"message": "Encountered unknown issue"}, 500
@@ -253,8 +261,10 @@ def test_modify_rsu_generic_exception(mock_pgquery, mock_check_safe_input):
 
 
 @patch("api.src.admin_rsu.admin_new_rsu.check_safe_input")
-@patch("api.src.admin_rsu.pgquery.write_db")
-def test_modify_rsu_sql_exception(mock_pgquery, mock_check_safe_input):
+@patch("api.src.admin_rsu.pgquery.transaction")
+def test_modify_rsu_sql_exception(mock_transaction, mock_check_safe_input):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_safe_input.return_value = True
     orig = MagicMock()
     orig.args = ({"D": "SQL issue encountered"},)
@@ -269,8 +279,10 @@ def test_modify_rsu_sql_exception(mock_pgquery, mock_check_safe_input):
 # delete_rsu
 
 
-@patch("api.src.admin_rsu.pgquery.write_db")
-def test_delete_rsu(mock_write_db):
+@patch("api.src.admin_rsu.pgquery.transaction")
+def test_delete_rsu(mock_transaction):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_write_db = mock_transaction.return_value.__enter__.return_value.write_db
     expected_result = {"message": "RSU successfully deleted"}
     actual_result = admin_rsu.delete_rsu("10.11.81.12")
 
@@ -282,4 +294,5 @@ def test_delete_rsu(mock_write_db):
         call(admin_rsu_data.delete_rsu_calls[4])
     ]
     mock_write_db.assert_has_calls(calls)
+    mock_transaction.assert_called_once()
     assert actual_result == expected_result
@@ -183,8 +183,13 @@ def test_check_safe_input_bad():
 # modify_user
 @patch("api.src.admin_user.check_safe_input")
 @patch("api.src.admin_user.admin_new_user.check_email")
-@patch("api.src.admin_user.pgquery.write_db")
-def test_modify_user_success(mock_pgquery, mock_check_email, mock_check_safe_input):
+@patch("api.src.admin_user.pgquery.transaction")
+@patch("api.src.admin_user.middleware.invalidate_user")
+def test_modify_user_success(
+    mock_invalidate_user, mock_transaction, mock_check_email, mock_check_safe_input
+):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_email.return_value = True
     mock_check_safe_input.return_value = True
     expected_msg, expected_code = {"message": "User successfully modified"}, 200
@@ -197,27 +202,39 @@ def test_modify_user_success(mock_pgquery, mock_check_email, mock_check_safe_inp
         call(admin_user_data.remove_org_sql),
     ]
     mock_pgquery.assert_has_calls(calls)
+    mock_transaction.assert_called_once()
+    mock_invalidate_user.assert_has_calls(
+        [
+            call(admin_user_data.request_json_good["orig_email"]),
+            call(admin_user_data.request_json_good["email"]),
+        ]
+    )
     assert actual_msg == expected_msg
     assert actual_code == expected_code
 
 
 @patch("api.src.admin_user.admin_new_user.check_email")
-@patch("api.src.admin_user.pgquery.write_db")
-def test_modify_user_email_check_fail(mock_pgquery, mock_check_email):
+@patch("api.src.admin_user.pgquery.transaction")
+def test_modify_user_email_check_fail(mock_transaction, mock_check_email):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_email.return_value = False
     expected_msg, expected_code = {"message": "Email is not valid"}, 500
     actual_msg, actual_code = admin_user.modify_user(admin_user_data.request_json_good)
 
     calls = []
     mock_pgquery.assert_has_calls(calls)
+    mock_transaction.assert_not_called()
     assert actual_msg == expected_msg
     assert actual_code == expected_code
 
 
 @patch("api.src.admin_user.check_safe_input")
 @patch("api.src.admin_user.admin_new_user.check_email")
-@patch("api.src.admin_user.pgquery.write_db")
-def test_modify_user_check_fail(mock_pgquery, mock_check_email, mock_check_safe_input):
+@patch("api.src.admin_user.pgquery.transaction")
+def test_modify_user_check_fail(mock_transaction, mock_check_email, mock_check_safe_input):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_email.return_value = True
     mock_check_safe_input.return_value = False
     expected_msg, expected_code = {
@@ -227,16 +244,19 @@ def test_modify_user_check_fail(mock_pgquery, mock_check_email, mock_check_safe_
 
     calls = []
     mock_pgquery.assert_has_calls(calls)
+    mock_transaction.assert_not_called()
     assert actual_msg == expected_msg
     assert actual_code == expected_code
 
 
 @patch("api.src.admin_user.check_safe_input")
 @patch("api.src.admin_user.admin_new_user.check_email")
-@patch("api.src.admin_user.pgquery.write_db")
+@patch("api.src.admin_user.pgquery.transaction")
 def test_modify_user_generic_exception(
-    mock_pgquery, mock_check_email, mock_check_safe_input
+    mock_transaction, mock_check_email, mock_check_safe_input
 ):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_email.return_value = True
     mock_check_safe_input.return_value = True
     mock_pgquery.side_effect = Exception("Test")
@@ -249,10 +269,12 @@ def test_modify_user_generic_exception(
 
 @patch("api.src.admin_user.check_safe_input")
 @patch("api.src.admin_user.admin_new_user.check_email")
-@patch("api.src.admin_user.pgquery.write_db")
+@patch("api.src.admin_user.pgquery.transaction")
 def test_modify_user_sql_exception(
-    mock_pgquery, mock_check_email, mock_check_safe_input
+    mock_transaction, mock_check_email, mock_check_safe_input
 ):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_pgquery = mock_transaction.return_value.__enter__.return_value.write_db
     mock_check_email.return_value = True
     mock_check_safe_input.return_value = True
     orig = MagicMock()
@@ -266,8 +288,11 @@ def test_modify_user_sql_exception(
 
 
 # delete_user
-@patch("api.src.admin_user.pgquery.write_db")
-def test_delete_user(mock_write_db):
+@patch("api.src.admin_user.pgquery.transaction")
+@patch("api.src.admin_user.middleware.invalidate_user")
+def test_delete_user(mock_invalidate_user, mock_transaction):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_write_db = mock_transaction.return_value.__enter__.return_value.write_db
     expected_result = {"message": "User successfully deleted"}
     actual_result = admin_user.delete_user("test@email.com")
 
@@ -276,4 +301,6 @@ def test_delete_user(mock_write_db):
         call(admin_user_data.delete_user_calls[1]),
     ]
     mock_write_db.assert_has_calls(calls)
+    mock_transaction.assert_called_once()
+    mock_invalidate_user.assert_called_once_with("test@email.com")
     assert actual_result == expected_result
@@ -1,7 +1,24 @@
 from unittest.mock import MagicMock, patch, Mock
 from werkzeug.wrappers import Request, Response
+from jose import jwt
 from api.src import middleware
+import api.tests.data.middleware_data as middleware_data
+import common.clients as clients
 import os
+import pytest
+import time
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    middleware.token_cache.clear()
+    middleware.user_cache.clear()
+    middleware.jwks_keys = {}
+    middleware.jwks_fetched = None
+    clients.reset()
+    yield
+    middleware.token_cache.clear()
+    middleware.user_cache.clear()
 
 
 @patch("api.src.middleware.pgquery.query_db")
@@ -33,6 +50,223 @@ def test_get_user_role_with_data(mock_keycloak, mock_query_db):
     assert result == expected_result
 
 
+@patch("api.src.middleware.pgquery.query_db")
+@patch("api.src.middleware.KeycloakOpenID")
+def test_get_user_role_cached(mock_keycloak, mock_query_db):
+    # mock
+    mock_query_db.return_value = ["test"]
+    mock_instance = mock_keycloak.return_value
+    mock_instance.introspect.return_value = {"active": True}
+    mock_instance.userinfo.return_value = {"email": "test@example.com"}
+
+    # call
+    middleware.get_user_role("dummy_token")
+    result = middleware.get_user_role("dummy_token")
+
+    # check
+    assert result == ["test"]
+    mock_instance.introspect.assert_called_once_with("dummy_token")
+    mock_instance.userinfo.assert_called_once_with("dummy_token")
+    mock_query_db.assert_called_once()
+    assert middleware.token_cache.get("dummy_token") == None
+    assert (
+        middleware.token_cache.get(middleware.hash_token("dummy_token"))
+        == "test@example.com"
+    )
+
+
+@patch("api.src.middleware.time.time", MagicMock(return_value=1000))
+@patch("api.src.middleware.pgquery.query_db")
+@patch("api.src.middleware.KeycloakOpenID")
+def test_get_user_role_expired_token_not_cached(mock_keycloak, mock_query_db):
+    # mock
+    mock_query_db.return_value = ["test"]
+    mock_instance = mock_keycloak.return_value
+    mock_instance.introspect.return_value = {"active": True, "exp": 1000}
+    mock_instance.userinfo.return_value = {"email": "test@example.com"}
+
+    # call
+    middleware.get_user_role("dummy_token")
+    middleware.get_user_role("dummy_token")
+
+    # check that the token was introspected again but the user permissions came from the cache
+    assert mock_instance.introspect.call_count == 2
+    mock_query_db.assert_called_once()
+
+
+@patch("api.src.middleware.pgquery.query_db")
+@patch("api.src.middleware.KeycloakOpenID")
+def test_get_user_role_inactive(mock_keycloak, mock_query_db):
+    # mock
+    mock_instance = mock_keycloak.return_value
+    mock_instance.introspect.return_value = {"active": False}
+
+    # call
+    result = middleware.get_user_role("dummy_token")
+
+    # check
+    assert result == None
+    mock_instance.userinfo.assert_not_called()
+    mock_query_db.assert_not_called()
+    assert len(middleware.token_cache) == 0
+
+
+@patch("api.src.middleware.pgquery.query_db")
+def test_invalidate_user(mock_query_db):
+    # mock
+    mock_query_db.return_value = ["test"]
+    middleware.get_user_permissions("test@example.com")
+    middleware.get_user_permissions("test@example.com")
+    assert mock_query_db.call_count == 1
+
+    # call
+    middleware.invalidate_user("test@example.com")
+    middleware.get_user_permissions("test@example.com")
+    assert mock_query_db.call_count == 2
+
+    middleware.invalidate_all_users()
+    middleware.get_user_permissions("test@example.com")
+    assert mock_query_db.call_count == 3
+
+
+def sign_token(claims, kid="test-kid"):
+    return jwt.encode(
+        claims,
+        middleware_data.signing_key_pem,
+        algorithm="RS256",
+        headers={"kid": kid},
+    )
+
+
+@patch("api.src.middleware.auth_mode", "LOCAL")
+@patch("api.src.middleware.pgquery.query_db")
+@patch("api.src.middleware.KeycloakOpenID")
+def test_get_user_role_local(mock_keycloak, mock_query_db):
+    # mock
+    mock_query_db.return_value = ["test"]
+    mock_instance = mock_keycloak.return_value
+    mock_instance.certs.return_value = middleware_data.jwks
+    token = sign_token({"email": "test@example.com", "exp": time.time() + 300})
+
+    # call
+    result = middleware.get_user_role(token)
+    middleware.token_cache.clear()
+    middleware.get_user_role(token)
+
+    # check that the token was verified against the cached JWKS without introspection
+    assert result == ["test"]
+    mock_instance.certs.assert_called_once()
+    mock_instance.introspect.assert_not_called()
+    mock_instance.userinfo.assert_not_called()
+    mock_query_db.assert_called_once()
+
+
+@patch("api.src.middleware.auth_mode", "LOCAL")
+@patch("api.src.middleware.pgquery.query_db")
+@patch("api.src.middleware.KeycloakOpenID")
+def test_get_user_role_local_expired(mock_keycloak, mock_query_db):
+    # mock
+    mock_instance = mock_keycloak.return_value
+    mock_instance.certs.return_value = middleware_data.jwks
+    token = sign_token({"email": "test@example.com", "exp": time.time() - 300})
+
+    # call
+    result = middleware.get_user_role(token)
+
+    # check
+    assert result == None
+    mock_instance.introspect.assert_not_called()
+    mock_query_db.assert_not_called()
+
+
+@patch("api.src.middleware.auth_mode", "LOCAL")
+@patch("api.src.middleware.pgquery.query_db")
+@patch("api.src.middleware.KeycloakOpenID")
+def test_get_user_role_local_bad_signature(mock_keycloak, mock_query_db):
+    # mock
+    mock_instance = mock_keycloak.return_value
+    mock_instance.certs.return_value = middleware_data.jwks
+    token = sign_token({"email": "test@example.com", "exp": time.time() + 300})
+    header, payload, signature = token.split(".")
+    tampered = jwt.encode(
+        {"email": "admin@example.com", "exp": time.time() + 300}, "secret"
+    ).split(".")[1]
+
+    # call
+    result = middleware.get_user_role(f"{header}.{tampered}.{signature}")
+
+    # check
+    assert result == None
+    mock_instance.introspect.assert_not_called()
+    mock_query_db.assert_not_called()
+
+
+@patch("api.src.middleware.auth_mode", "LOCAL")
+@patch("api.src.middleware.pgquery.query_db")
+@patch("api.src.middleware.KeycloakOpenID")
+def test_get_user_role_local_opaque_token(mock_keycloak, mock_query_db):
+    # mock
+    mock_query_db.return_value = ["test"]
+    mock_instance = mock_keycloak.return_value
+    mock_instance.introspect.return_value = {"active": True}
+    mock_instance.userinfo.return_value = {"email": "test@example.com"}
+
+    # call
+    result = middleware.get_user_role("opaque_token")
+
+    # check that opaque tokens fall back to introspection
+    assert result == ["test"]
+    mock_instance.certs.assert_not_called()
+    mock_instance.introspect.assert_called_once_with("opaque_token")
+
+
+@patch("api.src.middleware.auth_mode", "LOCAL")
+@patch("api.src.middleware.pgquery.query_db")
+@patch("api.src.middleware.KeycloakOpenID")
+def test_get_user_role_local_unknown_kid(mock_keycloak, mock_query_db):
+    # mock
+    mock_query_db.return_value = ["test"]
+    mock_instance = mock_keycloak.return_value
+    mock_instance.certs.return_value = middleware_data.jwks
+    mock_instance.introspect.return_value = {"active": True}
+    mock_instance.userinfo.return_value = {"email": "test@example.com"}
+    token = sign_token(
+        {"email": "test@example.com", "exp": time.time() + 300}, kid="other-kid"
+    )
+
+    # call
+    result = middleware.get_user_role(token)
+
+    # check that tokens signed by an unknown key fall back to introspection
+    assert result == ["test"]
+    mock_instance.introspect.assert_called_once_with(token)
+
+
+@patch("api.src.middleware.time.monotonic")
+@patch("api.src.middleware.KeycloakOpenID")
+def test_get_signing_key_refresh(mock_keycloak, mock_monotonic):
+    mock_instance = mock_keycloak.return_value
+    mock_instance.certs.return_value = middleware_data.jwks
+
+    # first lookup fetches the JWKS
+    mock_monotonic.return_value = 1000
+    assert middleware.get_signing_key("test-kid")["kid"] == "test-kid"
+    # unknown key IDs only trigger a refresh after the minimum refresh interval
+    mock_monotonic.return_value = 1005
+    assert middleware.get_signing_key("other-kid") == None
+    assert mock_instance.certs.call_count == 1
+    mock_monotonic.return_value = 1020
+    assert middleware.get_signing_key("other-kid") == None
+    assert mock_instance.certs.call_count == 2
+    # known key IDs are served from the cache until the JWKS is stale
+    mock_monotonic.return_value = 1100
+    middleware.get_signing_key("test-kid")
+    assert mock_instance.certs.call_count == 2
+    mock_monotonic.return_value = 1400
+    middleware.get_signing_key("test-kid")
+    assert mock_instance.certs.call_count == 3
+
+
 @patch("api.src.middleware.get_user_role")
 @patch("api.src.middleware.Request")
 @patch("api.src.middleware.KeycloakOpenID")
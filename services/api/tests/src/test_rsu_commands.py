@@ -126,18 +126,16 @@ def test_execute_command_snmpfilter(mock_ssh_commands_snmpfilter):
 def test_fetch_rsu_info(mock_query_db):
     # mock
     mock_query_db.return_value = [
-        (
-            {
-                "rsu_id": 24,
-                "manufacturer_name": "mocked manufacturer_name",
-                "ssh_username": "mocked ssh_username",
-                "ssh_password": "mocked ssh_password",
-                "snmp_username": "mocked snmp_username",
-                "snmp_password": "mocked snmp_password",
-                "snmp_encrypt_pw": "mocked snmp_encrypt_pw",
-                "snmp_version": "mocked snmp_version",
-            },
-        ),
+        {
+            "rsu_id": 24,
+            "manufacturer_name": "mocked manufacturer_name",
+            "ssh_username": "mocked ssh_username",
+            "ssh_password": "mocked ssh_password",
+            "snmp_username": "mocked snmp_username",
+            "snmp_password": "mocked snmp_password",
+            "snmp_encrypt_pw": "mocked snmp_encrypt_pw",
+            "snmp_version": "mocked snmp_version",
+        },
     ]
 
     # call
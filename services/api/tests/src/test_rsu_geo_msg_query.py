@@ -2,6 +2,15 @@ from unittest.mock import patch, MagicMock
 import os
 from api.src.rsu_geo_msg_query import query_geo_data_mongo, geo_hash
 import api.tests.data.rsu_geo_msg_query_data as rsu_geo_msg_query_data
+import pytest
+import common.clients as clients
+
+
+@pytest.fixture(autouse=True)
+def reset_clients():
+    clients.reset()
+    yield
+    clients.reset()
 
 
 def test_geo_hash():
@@ -18,7 +27,7 @@ def test_geo_hash():
         "MAX_GEO_QUERY_RECORDS": "10000",
     },
 )
-@patch("api.src.rsu_geo_msg_query.MongoClient")
+@patch("common.clients.MongoClient")
 def test_query_geo_data_mongo(mock_mongo):
     mock_db = MagicMock()
     mock_collection = MagicMock()
@@ -51,7 +60,7 @@ def test_query_geo_data_mongo(mock_mongo):
         "MAX_GEO_QUERY_RECORDS": "10000",
     },
 )
-@patch("api.src.rsu_geo_msg_query.MongoClient")
+@patch("common.clients.MongoClient")
 def test_query_geo_data_mongo_filter_failed(mock_mongo):
     mock_db = MagicMock()
     mock_collection = MagicMock()
@@ -77,7 +86,7 @@ def test_query_geo_data_mongo_filter_failed(mock_mongo):
 @patch.dict(
     os.environ, {"MONGO_DB_URI": "uri", "MONGO_DB_NAME": "name", "GEO_DB_NAME": "col"}
 )
-@patch("api.src.rsu_geo_msg_query.MongoClient")
+@patch("common.clients.MongoClient")
 def test_query_geo_data_mongo_failed_to_connect(mock_mongo):
     mock_mongo.side_effect = Exception("Failed to connect")
 
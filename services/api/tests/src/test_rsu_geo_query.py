@@ -64,7 +64,9 @@ def test_query_org_rsus(mock_pgquery):
         ({"10.11.81.14"},),
     ]
     actual_result = rsu_geo_query.query_org_rsus("Test")
-    mock_pgquery.query_db.assert_called_with(rsu_geo_query_data.rsu_org_query)
+    mock_pgquery.query_db.assert_called_with(
+        rsu_geo_query_data.rsu_org_query, {"organization": "Test"}
+    )
 
     assert actual_result == {"{10.11.81.12}", "{10.11.81.13}", "{10.11.81.14}"}
 
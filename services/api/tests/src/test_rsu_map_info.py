@@ -57,10 +57,12 @@ def test_get_map_data_query(mock_pgquery):
         "FROM public.map_info AS mi "
         "JOIN public.rsus AS rd ON rd.ipv4_address = mi.ipv4_address "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
-        f"WHERE ron_v.name = '{organization}' AND mi.ipv4_address = '{ip_address}'"
+        "WHERE ron_v.name = :organization AND mi.ipv4_address = :ip_address"
     )
     rsu_map_info.get_map_data(ip_address, organization)
-    mock_pgquery.query_db.assert_called_with(expected_query)
+    mock_pgquery.query_db.assert_called_with(
+        expected_query, {"organization": organization, "ip_address": ip_address}
+    )
     mock_pgquery.query_db.assert_called_once()
 
 
@@ -72,19 +72,25 @@ def test_ping_data_query(mock_pgquery):
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
         "JOIN ("
         "SELECT * FROM public.ping AS ping_data "
-        f"WHERE ping_data.timestamp >= '{t.strftime('%Y/%m/%dT%H:%M:%S')}'::timestamp"
+        "WHERE ping_data.timestamp >= :start_time::timestamp"
         ") AS ping_data ON rd.rsu_id = ping_data.rsu_id "
-        f"WHERE ron_v.name = '{organization}' "
+        "WHERE ron_v.name = :organization "
         "ORDER BY rd.rsu_id, ping_data.timestamp DESC"
     )
 
     rsu_online_status.get_ping_data(organization)
-    mock_pgquery.query_db.assert_called_with(expected_query)
+    mock_pgquery.stream_db.assert_called_with(
+        expected_query,
+        {
+            "start_time": t.strftime("%Y/%m/%dT%H:%M:%S"),
+            "organization": organization,
+        },
+    )
 
 
 @patch("api.src.rsu_online_status.pgquery")
 def test_ping_data_no_data(mock_pgquery):
-    mock_pgquery.query_db.return_value = []
+    mock_pgquery.stream_db.return_value = []
     expected_rsu_data = {}
     actual_result = rsu_online_status.get_ping_data("Test")
     assert actual_result == expected_rsu_data
@@ -92,7 +98,7 @@ def test_ping_data_no_data(mock_pgquery):
 
 @patch("api.src.rsu_online_status.pgquery")
 def test_ping_data_single_result(mock_pgquery):
-    mock_pgquery.query_db.return_value = data.ping_return_single
+    mock_pgquery.stream_db.return_value = data.ping_return_single
     expected_rsu_data = data.ping_expected_single
     actual_result = rsu_online_status.get_ping_data("Test")
     assert actual_result == expected_rsu_data
@@ -100,7 +106,7 @@ def test_ping_data_single_result(mock_pgquery):
 
 @patch("api.src.rsu_online_status.pgquery")
 def test_ping_data_multiple_result(mock_pgquery):
-    mock_pgquery.query_db.return_value = data.ping_return_multiple
+    mock_pgquery.stream_db.return_value = data.ping_return_multiple
     expected_rsu_data = data.ping_expected_multiple
     actual_result = rsu_online_status.get_ping_data("Test")
     assert actual_result == expected_rsu_data
@@ -113,7 +119,9 @@ def test_ping_data_multiple_result(mock_pgquery):
 def test_last_online_query(mock_pgquery):
     expected_query = data.last_online_query
     rsu_online_status.get_last_online_data("10.0.0.1", "Test")
-    mock_pgquery.query_db.assert_called_with(expected_query)
+    mock_pgquery.query_db.assert_called_with(
+        expected_query, {"ip": "10.0.0.1", "organization": "Test"}
+    )
 
 
 @patch("api.src.rsu_online_status.pgquery")
@@ -1,16 +1,26 @@
 from unittest.mock import patch, MagicMock
+from datetime import datetime
 import pytest
 import os
 import api.src.rsu_querycounts as rsu_querycounts
 from api.src.rsu_querycounts import query_rsu_counts_mongo
 import api.tests.data.rsu_querycounts_data as querycounts_data
+import common.clients as clients
+
+
+@pytest.fixture(autouse=True)
+def reset_clients():
+    clients.reset()
+    yield
+    clients.reset()
+
 
 ##################################### Testing Requests ###########################################
 
 
 def test_options_request():
     counts = rsu_querycounts.RsuQueryCounts()
-    (body, code, headers) = counts.options()
+    body, code, headers = counts.options()
     assert body == ""
     assert code == 204
     assert headers["Access-Control-Allow-Methods"] == "GET"
@@ -26,11 +36,18 @@ def test_get_request(mock_query, mock_rsus):
     mock_rsus.return_value = ["10.0.0.1", "10.0.0.2", "10.0.0.3"]
     mock_query.return_value = {"Some Data"}, 200
     with patch("api.src.rsu_querycounts.request", req):
-        (data, code, headers) = counts.get()
+        data, code, headers = counts.get()
         assert code == 200
         assert headers["Access-Control-Allow-Origin"] == "test.com"
         assert headers["Content-Type"] == "application/json"
         assert data == {"Some Data"}
+        mock_query.assert_called_with(
+            mock_rsus.return_value,
+            "BSM",
+            "2022-05-23T12:00:00",
+            "2022-05-24T12:00:00",
+            None,
+        )
 
 
 ################################### Testing Data Validation #########################################
@@ -42,7 +59,7 @@ def test_get_request_invalid_message():
     req.args = querycounts_data.request_args_bad_message
     counts = rsu_querycounts.RsuQueryCounts()
     with patch("api.src.rsu_querycounts.request", req):
-        (data, code, headers) = counts.get()
+        data, code, headers = counts.get()
         assert code == 400
         assert headers["Access-Control-Allow-Origin"] == "test.com"
         assert data == "Invalid Message Type.\nValid message types: Test, Anothertest"
@@ -54,7 +71,7 @@ def test_get_request_invalid_message_no_env():
     req.args = querycounts_data.request_args_bad_message
     counts = rsu_querycounts.RsuQueryCounts()
     with patch("api.src.rsu_querycounts.request", req):
-        (data, code, headers) = counts.get()
+        data, code, headers = counts.get()
         assert code == 400
         assert headers["Access-Control-Allow-Origin"] == "test.com"
         assert (
@@ -72,30 +89,38 @@ def test_schema_validate_bad_data():
             assert counts.get()
 
 
+def test_schema_validate_bad_tier():
+    req = MagicMock()
+    req.args = querycounts_data.request_args_bad_tier
+    counts = rsu_querycounts.RsuQueryCounts()
+    with patch("api.src.rsu_querycounts.request", req):
+        with pytest.raises(Exception):
+            assert counts.get()
+
+
 ################################### Test get_organization_rsus ########################################
 
 
 @patch("api.src.rsu_querycounts.pgquery")
 def test_rsu_counts_get_organization_rsus(mock_pgquery):
     mock_pgquery.query_db.return_value = [
-        ({"ipv4_address": "10.11.81.12", "primary_route": "Route 1"},),
-        ({"ipv4_address": "10.11.81.13", "primary_route": "Route 1"},),
-        ({"ipv4_address": "10.11.81.14", "primary_route": "Route 1"},),
+        {"ipv4_address": "10.11.81.12", "primary_route": "Route 1"},
+        {"ipv4_address": "10.11.81.13", "primary_route": "Route 1"},
+        {"ipv4_address": "10.11.81.14", "primary_route": "Route 1"},
     ]
     expected_query = (
-        "SELECT to_jsonb(row) "
-        "FROM ("
-        "SELECT rd.ipv4_address, rd.primary_route "
+        "SELECT host(rd.ipv4_address) AS ipv4_address, rd.primary_route "
         "FROM public.rsus rd "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
-        "WHERE ron_v.name = 'Test' "
+        "WHERE ron_v.name = :organization "
         "ORDER BY primary_route ASC, milepost ASC"
-        ") as row"
     )
 
     actual_result = rsu_querycounts.get_organization_rsus("Test")
 
-    mock_pgquery.query_db.assert_called_with(expected_query)
+    mock_pgquery.query_db.assert_called_with(
+        expected_query, {"organization": "Test"}, mapping=True
+    )
     assert actual_result == {
         "10.11.81.12": "Route 1",
         "10.11.81.13": "Route 1",
@@ -107,17 +132,16 @@ def test_rsu_counts_get_organization_rsus(mock_pgquery):
 def test_rsu_counts_get_organization_rsus_empty(mock_pgquery):
     mock_pgquery.query_db.return_value = []
     expected_query = (
-        "SELECT to_jsonb(row) "
-        "FROM ("
-        "SELECT rd.ipv4_address, rd.primary_route "
+        "SELECT host(rd.ipv4_address) AS ipv4_address, rd.primary_route "
         "FROM public.rsus rd "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
-        "WHERE ron_v.name = 'Test' "
+        "WHERE ron_v.name = :organization "
         "ORDER BY primary_route ASC, milepost ASC"
-        ") as row"
     )
     actual_result = rsu_querycounts.get_organization_rsus("Test")
-    mock_pgquery.query_db.assert_called_with(expected_query)
+    mock_pgquery.query_db.assert_called_with(
+        expected_query, {"organization": "Test"}, mapping=True
+    )
 
     assert actual_result == {}
 
@@ -127,7 +151,7 @@ def test_rsu_counts_get_organization_rsus_empty(mock_pgquery):
     os.environ,
     {"MONGO_DB_URI": "uri", "MONGO_DB_NAME": "name"},
 )
-@patch("api.src.rsu_querycounts.MongoClient")
+@patch("common.clients.MongoClient")
 def test_query_rsu_counts_mongo_success(mock_mongo):
     mock_db = MagicMock()
     mock_collection = MagicMock()
@@ -136,29 +160,61 @@ def test_query_rsu_counts_mongo_success(mock_mongo):
     mock_db.validate_collection.return_value = "valid"
 
     # Mock data that would be returned from MongoDB
-    mock_collection.find_one.return_value = {"count": 5}
+    mock_collection.aggregate.return_value = [
+        {"_id": "192.168.0.1", "count": 5},
+        {"_id": "192.168.0.2", "count": 12},
+    ]
 
-    allowed_ips = {"192.168.0.1": "A1", "192.168.0.2": "A2"}
+    allowed_ips = {"192.168.0.1": "A1", "192.168.0.2": "A2", "192.168.0.3": "A3"}
     message_type = "BSM"
     start = "2022-01-01T00:00:00"
     end = "2023-01-01T00:00:00"
 
     expected_result = {
         "192.168.0.1": {"road": "A1", "count": 5},
-        "192.168.0.2": {"road": "A2", "count": 5},
+        "192.168.0.2": {"road": "A2", "count": 12},
+        "192.168.0.3": {"road": "A3", "count": 0},
     }
 
     result, status_code = query_rsu_counts_mongo(allowed_ips, message_type, start, end)
 
     assert result == expected_result
     assert status_code == 200
+    mock_collection.aggregate.assert_called_once()
+    pipeline = mock_collection.aggregate.call_args[0][0]
+    assert pipeline[0]["$match"]["messageType"] == "BSM"
+    assert pipeline[0]["$match"]["rsuIp"] == {
+        "$in": ["192.168.0.1", "192.168.0.2", "192.168.0.3"]
+    }
+    assert pipeline[1] == {"$group": {"_id": "$rsuIp", "count": {"$sum": "$count"}}}
+
+
+@patch.dict(
+    os.environ,
+    {"MONGO_DB_URI": "uri", "MONGO_DB_NAME": "name"},
+)
+@patch("common.clients.MongoClient")
+def test_query_rsu_counts_mongo_aggregate_failure(mock_mongo):
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_mongo.return_value.__getitem__.return_value = mock_db
+    mock_db.__getitem__.return_value = mock_collection
+    mock_collection.aggregate.side_effect = Exception("Failed to aggregate")
+
+    allowed_ips = {"192.168.0.1": "A1"}
+    start = "2022-01-01T00:00:00"
+    end = "2023-01-01T00:00:00"
+
+    result, status_code = query_rsu_counts_mongo(allowed_ips, "BSM", start, end)
+    assert result == {}
+    assert status_code == 500
 
 
 @patch.dict(
     os.environ,
     {"MONGO_DB_URI": "uri", "MONGO_DB_NAME": "name"},
 )
-@patch("api.src.rsu_querycounts.MongoClient")
+@patch("common.clients.MongoClient")
 @patch("api.src.rsu_querycounts.logging")
 def test_query_rsu_counts_mongo_failure(mock_logging, mock_mongo):
     # Mock the MongoDB connection to throw an exception
@@ -172,3 +228,113 @@ def test_query_rsu_counts_mongo_failure(mock_logging, mock_mongo):
     result, status_code = query_rsu_counts_mongo(allowed_ips, message_type, start, end)
     assert result == {}
     assert status_code == 503
+
+
+@patch.dict(
+    os.environ,
+    {"MONGO_DB_URI": "uri", "MONGO_DB_NAME": "name"},
+)
+@patch("common.clients.MongoClient")
+def test_ensure_counts_index(mock_mongo):
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_mongo.return_value.__getitem__.return_value = mock_db
+    mock_db.__getitem__.return_value = mock_collection
+
+    rsu_querycounts.ensure_counts_index()
+
+    mock_db.__getitem__.assert_called_with("CVCounts")
+    mock_collection.create_index.assert_called_once_with(
+        [("messageType", 1), ("rsuIp", 1), ("timestamp", 1)]
+    )
+
+
+@patch.dict(
+    os.environ,
+    {"MONGO_DB_URI": "uri", "MONGO_DB_NAME": "name"},
+)
+@patch("common.clients.MongoClient")
+@patch("api.src.rsu_querycounts.logging")
+def test_ensure_counts_index_failure(mock_logging, mock_mongo):
+    mock_mongo.side_effect = Exception("Failed to connect")
+
+    rsu_querycounts.ensure_counts_index()
+
+    mock_logging.warning.assert_called_once()
+
+
+##################################### Test count tiers ###########################################
+
+
+def test_select_count_tier():
+    assert (
+        rsu_querycounts.select_count_tier(datetime(2024, 1, 1), datetime(2024, 3, 1))
+        == "monthly"
+    )
+    assert (
+        rsu_querycounts.select_count_tier(datetime(2024, 1, 1), datetime(2024, 1, 31))
+        == "daily"
+    )
+    assert (
+        rsu_querycounts.select_count_tier(
+            datetime(2024, 1, 1), datetime(2024, 1, 1, 12)
+        )
+        == "hourly"
+    )
+
+
+@patch.dict(
+    os.environ,
+    {"MONGO_DB_URI": "uri", "MONGO_DB_NAME": "name"},
+)
+@patch("common.clients.MongoClient")
+def test_query_rsu_counts_mongo_tier(mock_mongo):
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_mongo.return_value.__getitem__.return_value = mock_db
+    mock_db.__getitem__.return_value = mock_collection
+    mock_collection.aggregate.return_value = [{"_id": "192.168.0.1", "count": 30}]
+
+    result, status_code = query_rsu_counts_mongo(
+        {"192.168.0.1": "A1"},
+        "BSM",
+        "2024-01-01T06:30:00Z",
+        "2024-01-01T12:00:00Z",
+        "hourly",
+    )
+
+    assert status_code == 200
+    assert result == {"192.168.0.1": {"road": "A1", "count": 30}}
+    mock_db.__getitem__.assert_called_with("CVCountsHourly")
+    pipeline = mock_collection.aggregate.call_args[0][0]
+    time_range = pipeline[0]["$match"]["timestamp"]
+    assert time_range["$gte"].hour == 6 and time_range["$gte"].minute == 0
+    assert time_range["$lt"].hour == 12
+
+
+@patch.dict(
+    os.environ,
+    {"MONGO_DB_URI": "uri", "MONGO_DB_NAME": "name"},
+)
+@patch("common.clients.MongoClient")
+@patch("api.src.rsu_querycounts.select_count_tier")
+def test_query_rsu_counts_mongo_tier_auto(mock_select, mock_mongo):
+    mock_db = MagicMock()
+    mock_collection = MagicMock()
+    mock_mongo.return_value.__getitem__.return_value = mock_db
+    mock_db.__getitem__.return_value = mock_collection
+    mock_collection.aggregate.return_value = []
+    mock_select.return_value = "daily"
+
+    result, status_code = query_rsu_counts_mongo(
+        {"192.168.0.1": "A1"},
+        "BSM",
+        "2024-01-01T00:00:00",
+        "2024-01-31T00:00:00",
+        "auto",
+    )
+
+    assert status_code == 200
+    assert result == {"192.168.0.1": {"road": "A1", "count": 0}}
+    mock_select.assert_called_once()
+    mock_db.__getitem__.assert_called_with("CVCountsDaily")
@@ -4,6 +4,15 @@ import api.src.rsu_ssm_srm as rsu_ssm_srm
 import api.tests.data.rsu_ssm_srm_data as ssm_srm_data
 from datetime import datetime
 from pytz import UTC
+import pytest
+import common.clients as clients
+
+
+@pytest.fixture(autouse=True)
+def reset_clients():
+    clients.reset()
+    yield
+    clients.reset()
 
 
 ##################################### Testing Requests ###########################################
@@ -49,7 +58,7 @@ def test_get_request(mock_srm, mock_ssm):
     os.environ,
     {"MONGO_DB_NAME": "name", "SSM_DB_NAME": "ssm_collection"},
 )
-@patch("api.src.rsu_ssm_srm.MongoClient")
+@patch("common.clients.MongoClient")
 @patch("api.src.rsu_ssm_srm.datetime")
 def test_query_ssm_data_query(mock_date, mock_mongo):
     mock_db = MagicMock()
@@ -69,7 +78,7 @@ def test_query_ssm_data_query(mock_date, mock_mongo):
     mock_collection.find.assert_called()
 
 
-@patch("api.src.rsu_ssm_srm.MongoClient")
+@patch("common.clients.MongoClient")
 def test_query_ssm_data_no_data(mock_mongo):
     mock_db = MagicMock()
     mock_collection = MagicMock()
@@ -78,12 +87,12 @@ def test_query_ssm_data_no_data(mock_mongo):
 
     mock_collection.find.return_value = []
     with patch.dict("api.src.rsu_ssm_srm.os.environ", {"SSM_DB_NAME": "Fake_table"}):
-        (code, data) = rsu_ssm_srm.query_ssm_data_mongo([])
+        code, data = rsu_ssm_srm.query_ssm_data_mongo([])
         assert data == []
         assert code == 200
 
 
-@patch("api.src.rsu_ssm_srm.MongoClient")
+@patch("common.clients.MongoClient")
 def test_query_ssm_data_single_result(mock_mongo):
     mock_db = MagicMock()
     mock_collection = MagicMock()
@@ -92,12 +101,12 @@ def test_query_ssm_data_single_result(mock_mongo):
 
     mock_collection.find.return_value = [ssm_srm_data.ssm_record_one]
     with patch.dict("api.src.rsu_ssm_srm.os.environ", {"SSM_DB_NAME": "Fake_table"}):
-        (code, data) = rsu_ssm_srm.query_ssm_data_mongo([])
+        code, data = rsu_ssm_srm.query_ssm_data_mongo([])
         assert data == ssm_srm_data.ssm_single_result_expected
         assert code == 200
 
 
-@patch("api.src.rsu_ssm_srm.MongoClient")
+@patch("common.clients.MongoClient")
 def test_query_ssm_data_multiple_result(mock_mongo):
     mock_db = MagicMock()
     mock_collection = MagicMock()
@@ -110,7 +119,7 @@ def test_query_ssm_data_multiple_result(mock_mongo):
         ssm_srm_data.ssm_record_three,
     ]
     with patch.dict("api.src.rsu_ssm_srm.os.environ", {"SSM_DB_NAME": "Fake_table"}):
-        (code, data) = rsu_ssm_srm.query_ssm_data_mongo([])
+        code, data = rsu_ssm_srm.query_ssm_data_mongo([])
         assert data == ssm_srm_data.ssm_multiple_result_expected
         assert code == 200
 
@@ -122,7 +131,7 @@ def test_query_ssm_data_multiple_result(mock_mongo):
     os.environ,
     {"MONGO_DB_NAME": "name", "SRM_DB_NAME": "srm_collection"},
 )
-@patch("api.src.rsu_ssm_srm.MongoClient")
+@patch("common.clients.MongoClient")
 @patch("api.src.rsu_ssm_srm.datetime")
 def test_query_srm_data_query(mock_date, mock_mongo):
     mock_db = MagicMock()
@@ -140,7 +149,7 @@ def test_query_srm_data_query(mock_date, mock_mongo):
         mock_collection.find.assert_called()
 
 
-@patch("api.src.rsu_ssm_srm.MongoClient")
+@patch("common.clients.MongoClient")
 def test_query_srm_data_no_data(mock_mongo):
     mock_db = MagicMock()
     mock_collection = MagicMock()
@@ -149,12 +158,12 @@ def test_query_srm_data_no_data(mock_mongo):
 
     mock_collection.find.return_value = []
     with patch.dict("api.src.rsu_ssm_srm.os.environ", {"SRM_DB_NAME": "Fake_table"}):
-        (code, data) = rsu_ssm_srm.query_srm_data_mongo([])
+        code, data = rsu_ssm_srm.query_srm_data_mongo([])
         assert data == []
         assert code == 200
 
 
-@patch("api.src.rsu_ssm_srm.MongoClient")
+@patch("common.clients.MongoClient")
 def test_query_srm_data_single_result(mock_mongo):
     mock_db = MagicMock()
     mock_collection = MagicMock()
@@ -163,12 +172,12 @@ def test_query_srm_data_single_result(mock_mongo):
 
     mock_collection.find.return_value = [ssm_srm_data.srm_record_one]
     with patch.dict("api.src.rsu_ssm_srm.os.environ", {"SRM_DB_NAME": "Fake_table"}):
-        (code, data) = rsu_ssm_srm.query_srm_data_mongo([])
+        code, data = rsu_ssm_srm.query_srm_data_mongo([])
         assert data == ssm_srm_data.srm_single_result_expected
         assert code == 200
 
 
-@patch("api.src.rsu_ssm_srm.MongoClient")
+@patch("common.clients.MongoClient")
 def test_query_srm_data_multiple_result(mock_mongo):
     mock_db = MagicMock()
     mock_collection = MagicMock()
@@ -181,6 +190,6 @@ def test_query_srm_data_multiple_result(mock_mongo):
         ssm_srm_data.srm_record_three,
     ]
     with patch.dict("api.src.rsu_ssm_srm.os.environ", {"SRM_DB_NAME": "Fake_table"}):
-        (code, data) = rsu_ssm_srm.query_srm_data_mongo([])
+        code, data = rsu_ssm_srm.query_srm_data_mongo([])
         assert data == ssm_srm_data.srm_multiple_result_expected
         assert code == 200
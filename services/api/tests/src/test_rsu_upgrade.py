@@ -28,7 +28,7 @@ def test_check_for_upgrade_true(mock_query_db):
         "FROM public.rsus AS rd "
         "JOIN public.firmware_upgrade_rules fur ON fur.from_id = rd.firmware_version "
         "JOIN public.firmware_images fi2 ON fi2.firmware_id = fur.to_id "
-        f"WHERE rd.ipv4_address = '192.168.0.10'"
+        "WHERE rd.ipv4_address = :rsu_ip"
         ") as row"
     )
 
@@ -39,7 +39,7 @@ def test_check_for_upgrade_true(mock_query_db):
         "upgrade_version": "1.0.0",
     }
 
-    mock_query_db.assert_called_with(expected_query)
+    mock_query_db.assert_called_with(expected_query, {"rsu_ip": "192.168.0.10"})
     assert actual_response == expected_response
 
 
@@ -59,7 +59,7 @@ def test_check_for_upgrade_false(mock_query_db):
         "FROM public.rsus AS rd "
         "JOIN public.firmware_upgrade_rules fur ON fur.from_id = rd.firmware_version "
         "JOIN public.firmware_images fi2 ON fi2.firmware_id = fur.to_id "
-        f"WHERE rd.ipv4_address = '192.168.0.10'"
+        "WHERE rd.ipv4_address = :rsu_ip"
         ") as row"
     )
 
@@ -70,7 +70,7 @@ def test_check_for_upgrade_false(mock_query_db):
         "upgrade_version": "",
     }
 
-    mock_query_db.assert_called_with(expected_query)
+    mock_query_db.assert_called_with(expected_query, {"rsu_ip": "192.168.0.10"})
     assert actual_response == expected_response
 
 
@@ -101,8 +101,10 @@ def test_mark_rsu_for_upgrade_eligible(
     # Make assertions for each step of the function
     mock_check_for_upgrade.assert_called_with("192.168.0.10")
 
-    expected_query = "UPDATE public.rsus SET target_firmware_version = 2 WHERE ipv4_address = '192.168.0.10'"
-    mock_write_db.assert_called_with(expected_query)
+    expected_query = "UPDATE public.rsus SET target_firmware_version = :upgrade_id WHERE ipv4_address = :rsu_ip"
+    mock_write_db.assert_called_with(
+        expected_query, {"upgrade_id": 2, "rsu_ip": "192.168.0.10"}
+    )
 
     mock_requests_post.assert_called_with(
         "http://1.1.1.1:8080/init_firmware_upgrade", json={"rsu_ip": "192.168.0.10"}
@@ -140,8 +142,10 @@ def test_mark_rsu_for_upgrade_eligible_but_rejected(
     # Make assertions for each step of the function
     mock_check_for_upgrade.assert_called_with("192.168.0.10")
 
-    expected_query = "UPDATE public.rsus SET target_firmware_version = 2 WHERE ipv4_address = '192.168.0.10'"
-    mock_write_db.assert_called_with(expected_query)
+    expected_query = "UPDATE public.rsus SET target_firmware_version = :upgrade_id WHERE ipv4_address = :rsu_ip"
+    mock_write_db.assert_called_with(
+        expected_query, {"upgrade_id": 2, "rsu_ip": "192.168.0.10"}
+    )
 
     mock_requests_post.assert_called_with(
         "http://1.1.1.1:8080/init_firmware_upgrade", json={"rsu_ip": "192.168.0.10"}
@@ -7,7 +7,7 @@ import api.tests.data.rsu_info_data as rsu_info_data
 
 def test_request_options():
     info = rsuinfo.RsuInfo()
-    (body, code, headers) = info.options()
+    body, code, headers = info.options()
     assert body == ""
     assert code == 204
     assert headers["Access-Control-Allow-Methods"] == "GET"
@@ -20,7 +20,7 @@ def test_entry_get(mock_get_rsu_data):
     mock_get_rsu_data.return_value = {"rsuList": []}
     with patch("api.src.rsuinfo.request", req):
         info = rsuinfo.RsuInfo()
-        (body, code, headers) = info.get()
+        body, code, headers = info.get()
 
         mock_get_rsu_data.assert_called_once()
         assert code == 200
@@ -33,21 +33,20 @@ def test_entry_get(mock_get_rsu_data):
 
 @patch("api.src.rsuinfo.pgquery")
 def test_get_rsu_data_no_data(mock_pgquery):
-    mock_pgquery.query_db.return_value = {}
+    mock_pgquery.query_db.return_value = []
     expected_rsu_data = {"rsuList": []}
     expected_query = (
-        "SELECT jsonb_build_object('type', 'Feature', 'id', row.rsu_id, 'geometry', ST_AsGeoJSON(row.geography)::jsonb, 'properties', to_jsonb(row)) "
-        "FROM ("
-        "SELECT rd.rsu_id, rd.geography, rd.milepost, rd.ipv4_address, rd.serial_number, rd.primary_route, rm.name AS model_name, man.name AS manufacturer_name "
+        "SELECT ST_AsGeoJSON(rd.geography)::jsonb AS geometry, rd.rsu_id, rd.geography, rd.milepost, host(rd.ipv4_address) AS ipv4_address, rd.serial_number, rd.primary_route, rm.name AS model_name, man.name AS manufacturer_name "
         "FROM public.rsus AS rd "
         "JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id "
         "JOIN public.rsu_models AS rm ON rm.rsu_model_id = rd.model "
         "JOIN public.manufacturers AS man ON man.manufacturer_id = rm.manufacturer "
-        "WHERE ron_v.name = 'Test'"
-        ") AS row"
+        "WHERE ron_v.name = :organization"
     )
     actual_result = rsuinfo.get_rsu_data("Test")
-    mock_pgquery.query_db.assert_called_with(expected_query)
+    mock_pgquery.query_db.assert_called_with(
+        expected_query, {"organization": "Test"}, mapping=True
+    )
 
     assert actual_result == expected_rsu_data
 
@@ -79,19 +78,32 @@ def test_get_rsu_data_multiple_result(mock_pgquery):
 @patch("rsuinfo.pgquery.query_db")
 def test_get_rsu_data(mock_pgquery_query_db):
     # mock return values for function dependencies
-    mock_pgquery_query_db.return_value = [[{"name": "Alice"}]]
+    mock_pgquery_query_db.return_value = [
+        {"geometry": {"type": "Point"}, "rsu_id": 1, "name": "Alice"}
+    ]
 
     # call function
     organization = "test"
     result = rsuinfo.get_rsu_data(organization)
 
     # check return value
-    expectedResult = {"rsuList": [{"name": "Alice"}]}
+    expectedResult = {
+        "rsuList": [
+            {
+                "type": "Feature",
+                "id": 1,
+                "geometry": {"type": "Point"},
+                "properties": {"rsu_id": 1, "name": "Alice"},
+            }
+        ]
+    }
     assert result == expectedResult
 
     # check that pgquery.query_db was called with expected arguments
-    expectedQuery = "SELECT jsonb_build_object('type', 'Feature', 'id', row.rsu_id, 'geometry', ST_AsGeoJSON(row.geography)::jsonb, 'properties', to_jsonb(row)) FROM (SELECT rd.rsu_id, rd.geography, rd.milepost, rd.ipv4_address, rd.serial_number, rd.primary_route, rm.name AS model_name, man.name AS manufacturer_name FROM public.rsus AS rd JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id JOIN public.rsu_models AS rm ON rm.rsu_model_id = rd.model JOIN public.manufacturers AS man ON man.manufacturer_id = rm.manufacturer WHERE ron_v.name = 'test') AS row"
-    rsuinfo.pgquery.query_db.assert_called_once_with(expectedQuery)
+    expectedQuery = "SELECT ST_AsGeoJSON(rd.geography)::jsonb AS geometry, rd.rsu_id, rd.geography, rd.milepost, host(rd.ipv4_address) AS ipv4_address, rd.serial_number, rd.primary_route, rm.name AS model_name, man.name AS manufacturer_name FROM public.rsus AS rd JOIN public.rsu_organization_name AS ron_v ON ron_v.rsu_id = rd.rsu_id JOIN public.rsu_models AS rm ON rm.rsu_model_id = rd.model JOIN public.manufacturers AS man ON man.manufacturer_id = rm.manufacturer WHERE ron_v.name = :organization"
+    rsuinfo.pgquery.query_db.assert_called_once_with(
+        expectedQuery, {"organization": organization}, mapping=True
+    )
 
 
 # TODO: add more tests here
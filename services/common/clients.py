@@ -0,0 +1,86 @@
+import logging
+import os
+import threading
+import time
+
+try:
+    from pymongo import MongoClient
+except ImportError:
+    # pymongo is only installed in the images that query MongoDB
+    MongoClient = None
+
+try:
+    from google.cloud import storage
+except ImportError:
+    # google-cloud-storage is only installed in the images that use GCS
+    storage = None
+
+# Process-wide clients keyed by name. Each client is created on first use and shared by every
+# caller in the process, so its connection pool and handshakes are reused across requests.
+# Clients with a health check are checked at most once per health_check_interval seconds and
+# are rebuilt when the check fails.
+health_check_interval = int(os.getenv("CLIENT_HEALTH_CHECK_INTERVAL", 60))
+
+clients = {}
+clients_lock = threading.Lock()
+
+
+def reset():
+    # Drops every client without closing it. Used in forked children, where the sockets still
+    # belong to the parent process.
+    global clients, clients_lock
+    clients = {}
+    clients_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=reset)
+
+
+def close_client(client):
+    try:
+        client.close()
+    except Exception as e:
+        logging.warning(f"Failed to close client: {e}")
+
+
+def get_client(key, factory, health_check=None):
+    with clients_lock:
+        entry = clients.get(key)
+        now = time.monotonic()
+        if (
+            entry is not None
+            and health_check is not None
+            and now - entry["checked"] >= health_check_interval
+        ):
+            try:
+                health_check(entry["client"])
+                entry["checked"] = now
+            except Exception as e:
+                logging.warning(
+                    f"Client {key} failed its health check, recreating: {e}"
+                )
+                close_client(entry["client"])
+                del clients[key]
+                entry = None
+
+        if entry is None:
+            logging.debug(f"Creating client {key}")
+            entry = {"client": factory(), "checked": now}
+            clients[key] = entry
+        return entry["client"]
+
+
+def ping_mongo(client):
+    client.admin.command("ping")
+
+
+def get_mongo_client(uri):
+    return get_client(
+        ("mongo", uri),
+        lambda: MongoClient(uri, serverSelectionTimeoutMS=5000),
+        ping_mongo,
+    )
+
+
+def get_storage_client(project):
+    return get_client(("gcs", project), lambda: storage.Client(project))
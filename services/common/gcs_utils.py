@@ -1,5 +1,5 @@
-from google.cloud import storage
 from common.util import validate_file_type
+import common.clients as clients
 import logging
 import os
 
@@ -20,7 +20,7 @@ def download_gcp_blob(blob_name, destination_file_name, file_extension=None):
 
     gcp_project = os.environ.get("GCP_PROJECT")
     bucket_name = os.environ.get("BLOB_STORAGE_BUCKET")
-    storage_client = storage.Client(gcp_project)
+    storage_client = clients.get_storage_client(gcp_project)
     bucket = storage_client.get_bucket(bucket_name)
     blob = bucket.blob(blob_name)
 
@@ -38,7 +38,7 @@ def list_gcs_blobs(gcs_prefix, file_extension):
     gcp_project = os.environ.get("GCP_PROJECT")
     bucket_name = os.environ.get("BLOB_STORAGE_BUCKET")
     logging.debug(f"Listing blobs in bucket {bucket_name} with prefix {gcs_prefix}.")
-    storage_client = storage.Client(gcp_project)
+    storage_client = clients.get_storage_client(gcp_project)
     blobs = storage_client.list_blobs(bucket_name, prefix=gcs_prefix, delimiter="/")
     blob_count = 0
     download_count = 0
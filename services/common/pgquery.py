@@ -1,22 +1,57 @@
+import bisect
+import csv
+import io
 import os
+import threading
+import time
+import weakref
 import sqlalchemy
 import logging
+from collections import OrderedDict
+from contextlib import contextmanager
+import pg8000.dbapi
+from pg8000.native import PreparedStatement, to_statement
 
 db_config = {
     # Pool size is the maximum number of permanent connections to keep.
-    "pool_size": 5,
+    "pool_size": int(os.environ.get("PG_DB_POOL_SIZE", 5)),
     # Temporarily exceeds the set pool_size if no connections are available.
-    "max_overflow": 2,
+    "max_overflow": int(os.environ.get("PG_DB_POOL_MAX_OVERFLOW", 2)),
     # Maximum number of seconds to wait when retrieving a
     # new connection from the pool. After the specified amount of time, an
     # exception will be thrown.
-    "pool_timeout": 30,  # 30 seconds
+    "pool_timeout": int(os.environ.get("PG_DB_POOL_TIMEOUT", 30)),  # 30 seconds
     # 'pool_recycle' is the maximum number of seconds a connection can persist.
     # Connections that live longer than the specified amount of time will be
     # reestablished
-    "pool_recycle": 60,  # 1 minutes
+    "pool_recycle": int(os.environ.get("PG_DB_POOL_RECYCLE", 1800)),  # 30 minutes
+    # Tests each connection with a lightweight query on checkout so connections
+    # dropped by the server are replaced instead of failing the request
+    "pool_pre_ping": os.environ.get("PG_DB_POOL_PRE_PING", "False").lower() == "true",
 }
 
+# Minimum number of seconds between pool statistics log messages, 0 disables the logging
+pool_stats_interval = int(os.environ.get("PG_DB_POOL_STATS_INTERVAL", 300))
+
+# Upper bounds, in seconds, of the checkout wait time histogram buckets
+pool_wait_buckets = [0.001, 0.01, 0.1, 1, 5, 30]
+
+pool_stats_lock = threading.Lock()
+pool_counters = {
+    "checkouts": 0,
+    "timeouts": 0,
+    "recycled": 0,
+    "wait_total": 0.0,
+    "wait_max": 0.0,
+    "wait_histogram": [0] * (len(pool_wait_buckets) + 1),
+}
+pool_stats_logged = time.monotonic()
+seen_connections = weakref.WeakSet()
+
+# Maximum number of server-side prepared statements kept open on each pooled connection.
+# The least recently used statement is deallocated once this limit is exceeded.
+statement_cache_size = 100
+
 db = None
 
 
@@ -84,25 +119,290 @@ def init_connection_engine():
         )
 
 
-def query_db(query_string):
+@sqlalchemy.event.listens_for(sqlalchemy.pool.Pool, "connect")
+def count_recycle(dbapi_connection, connection_record):
+    # A connection record that connects again has had its connection recycled or invalidated
+    with pool_stats_lock:
+        if connection_record in seen_connections:
+            pool_counters["recycled"] += 1
+        else:
+            seen_connections.add(connection_record)
+
+
+def record_checkout(wait):
+    global pool_stats_logged
+    with pool_stats_lock:
+        pool_counters["checkouts"] += 1
+        pool_counters["wait_total"] += wait
+        pool_counters["wait_max"] = max(pool_counters["wait_max"], wait)
+        pool_counters["wait_histogram"][
+            bisect.bisect_left(pool_wait_buckets, wait)
+        ] += 1
+
+        now = time.monotonic()
+        log_stats = (
+            pool_stats_interval > 0 and now - pool_stats_logged >= pool_stats_interval
+        )
+        if log_stats:
+            pool_stats_logged = now
+
+    if log_stats:
+        logging.info(f"DB pool stats: {pool_stats()}")
+
+
+def checkout(connect):
+    # Times how long a caller waits for a pooled connection, including establishing a new one
+    start = time.monotonic()
+    try:
+        conn = connect()
+    except sqlalchemy.exc.TimeoutError:
+        with pool_stats_lock:
+            pool_counters["timeouts"] += 1
+        logging.warning(f"Timed out waiting for a DB connection: {pool_stats()}")
+        raise
+    record_checkout(time.monotonic() - start)
+    return conn
+
+
+def pool_stats():
+    with pool_stats_lock:
+        counters = dict(pool_counters)
+        counters["wait_histogram"] = list(pool_counters["wait_histogram"])
+
+    labels = [f"<={bound}s" for bound in pool_wait_buckets] + [
+        f">{pool_wait_buckets[-1]}s"
+    ]
+    stats = {
+        "pool_size": db_config["pool_size"],
+        "max_overflow": db_config["max_overflow"],
+        "checked_in": 0,
+        "checked_out": 0,
+        "overflow": 0,
+        "checkouts": counters["checkouts"],
+        "timeouts": counters["timeouts"],
+        "recycled": counters["recycled"],
+        "wait_avg": (
+            counters["wait_total"] / counters["checkouts"]
+            if counters["checkouts"]
+            else 0.0
+        ),
+        "wait_max": counters["wait_max"],
+        "wait_histogram": dict(zip(labels, counters["wait_histogram"])),
+    }
+    if isinstance(db, sqlalchemy.engine.Engine) and isinstance(
+        db.pool, sqlalchemy.pool.QueuePool
+    ):
+        stats["checked_in"] = db.pool.checkedin()
+        stats["checked_out"] = db.pool.checkedout()
+        stats["overflow"] = max(db.pool.overflow(), 0)
+    return stats
+
+
+def get_prepared_statement(conn, query_string):
+    # Prepared statements live on the DBAPI connection, so the cache is kept in the pool's
+    # per-connection info dict and is discarded automatically when the connection is recycled
+    cache = conn.info.setdefault("prepared_statements", OrderedDict())
+    statement = cache.get(query_string)
+    if statement is not None:
+        cache.move_to_end(query_string)
+        return statement
+
+    logging.debug("Preparing new server-side statement...")
+    statement = PreparedStatement(conn.driver_connection, query_string)
+    cache[query_string] = statement
+    if len(cache) > statement_cache_size:
+        _, evicted = cache.popitem(last=False)
+        evicted.close()
+    return statement
+
+
+def begin_transaction(driver_conn):
+    # Mirror the pg8000 DBAPI cursor by opening a transaction for the statement
+    if not driver_conn._in_transaction and not driver_conn.autocommit:
+        driver_conn.execute_simple("begin transaction")
+
+
+def map_rows(column_names, rows):
+    # Pairs each row's values with the column names, so callers can read values by name without
+    # the query wrapping every row in to_jsonb
+    return [dict(zip(column_names, row)) for row in rows]
+
+
+def execute_prepared(conn, query_string, params, mapping=False):
+    begin_transaction(conn.driver_connection)
+    statement = get_prepared_statement(conn, query_string)
+    rows = statement.run(**params)
+    if mapping and rows is not None:
+        return map_rows([column["name"] for column in statement.columns], rows)
+    return rows
+
+
+def translate_error(e):
+    # Raise driver errors from raw connections as the same SQLAlchemy exceptions that query_db
+    # and write_db produce. Integrity constraint violations (SQLSTATE class 23) are reported as
+    # IntegrityError so callers can surface the failed value.
+    details = e.args[0] if len(e.args) > 0 and isinstance(e.args[0], dict) else {}
+    if details.get("C", "").startswith("23"):
+        return sqlalchemy.exc.IntegrityError(None, None, e)
+    return sqlalchemy.exc.DBAPIError.instance(None, None, e, pg8000.dbapi.Error)
+
+
+@contextmanager
+def raw_connection(commit=False):
     global db
     if db is None:
         db = init_connection_engine()
 
     logging.info("DB connection starting...")
-    with db.connect() as conn:
+    conn = checkout(db.raw_connection)
+    try:
+        yield conn
+        if commit:
+            conn.commit()
+    except pg8000.dbapi.Error as e:
+        conn.rollback()
+        raise translate_error(e) from e
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        # Returns the connection, and its prepared statements, to the pool
+        conn.close()
+
+
+def run_prepared(query_string, params, commit=False, mapping=False):
+    with raw_connection(commit) as conn:
+        logging.debug("Executing prepared statement...")
+        return execute_prepared(conn, query_string, params, mapping)
+
+
+class Transaction:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def query_db(self, query_string, params=None, mapping=False):
+        if params is not None:
+            return execute_prepared(self.conn, query_string, params, mapping)
+
+        cursor = self.conn.cursor()
+        cursor.execute(query_string)
+        data = cursor.fetchall()
+        if mapping:
+            data = map_rows([column[0] for column in cursor.description], data)
+        cursor.close()
+        return data
+
+    def write_db(self, query_string, params=None):
+        if params is not None:
+            execute_prepared(self.conn, query_string, params)
+            return
+
+        cursor = self.conn.cursor()
+        cursor.execute(query_string)
+        cursor.close()
+
+
+@contextmanager
+def transaction():
+    # Runs every statement issued through the yielded Transaction on one pooled connection. The
+    # statements are committed together when the block exits, or rolled back if it raises.
+    with raw_connection(commit=True) as conn:
+        logging.debug("Starting transaction...")
+        yield Transaction(conn)
+
+
+def query_db(query_string, params=None, mapping=False):
+    # Queries that provide bound parameters (using :name placeholders) are executed as
+    # server-side prepared statements that are reused for the lifetime of the pooled connection.
+    # With mapping enabled, each row is returned as a dict keyed by column name.
+    if params is not None:
+        return run_prepared(query_string, params, mapping=mapping)
+
+    global db
+    if db is None:
+        db = init_connection_engine()
+
+    logging.info("DB connection starting...")
+    with checkout(db.connect) as conn:
         logging.debug("Executing query...")
-        data = conn.execute(sqlalchemy.text(query_string)).fetchall()
+        result = conn.execute(sqlalchemy.text(query_string))
+        if mapping:
+            return [dict(row) for row in result.mappings()]
+        data = result.fetchall()
         return data
 
 
-def write_db(query_string):
+def write_db(query_string, params=None):
+    if params is not None:
+        run_prepared(query_string, params, commit=True)
+        return
+
     global db
     if db is None:
         db = init_connection_engine()
 
     logging.info("DB connection starting...")
-    with db.connect() as conn:
+    with checkout(db.connect) as conn:
         logging.debug("Executing insert query...")
         conn.execute(sqlalchemy.text(query_string))
         conn.commit()
+
+
+def stream_db(query_string, params=None, batch_size=1000, mapping=False):
+    # Reads the query results through a server-side cursor, holding at most batch_size rows in
+    # memory at a time. The cursor only lives for the transaction, which is rolled back when the
+    # connection is returned to the pool after the generator is exhausted or closed.
+    statement, make_vals = to_statement(
+        f"DECLARE pgquery_stream NO SCROLL CURSOR FOR {query_string}"
+    )
+    with raw_connection() as conn:
+        driver_conn = conn.driver_connection
+        begin_transaction(driver_conn)
+        logging.debug("Declaring server-side cursor...")
+        driver_conn.execute_unnamed(statement, make_vals(params or {}))
+
+        while True:
+            logging.debug(f"Fetching next {batch_size} rows...")
+            context = driver_conn.execute_simple(
+                f"FETCH FORWARD {int(batch_size)} FROM pgquery_stream"
+            )
+            if not context.rows:
+                break
+            if mapping:
+                yield from map_rows(
+                    [column["name"] for column in context.columns], context.rows
+                )
+            else:
+                yield from context.rows
+
+
+def bulk_insert(table, columns, rows):
+    # Streams every row through a single COPY FROM STDIN in one transaction
+    # None values are written as empty unquoted CSV fields, which COPY loads as NULL
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    if buffer.tell() == 0:
+        return
+    buffer.seek(0)
+
+    query = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    with raw_connection(commit=True) as conn:
+        logging.debug(f"Executing bulk insert into {table}...")
+        cursor = conn.cursor()
+        cursor.execute(query, stream=buffer)
+        cursor.close()
+
+
+def bulk_delete(table, keys):
+    # Each key is a dict of column values identifying the rows to delete. All keys share a single
+    # prepared DELETE statement on one connection and are committed together.
+    if len(keys) == 0:
+        return
+
+    query = f"DELETE FROM {table} WHERE " + " AND ".join(
+        f"{column} = :{column}" for column in keys[0]
+    )
+    with raw_connection(commit=True) as conn:
+        logging.debug(f"Executing bulk delete of {len(keys)} keys from {table}...")
+        for key in keys:
+            execute_prepared(conn, query, key)
@@ -0,0 +1,54 @@
+import asyncio
+import functools
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+import common.pgquery as pgquery
+
+# Number of threads that run blocking pgquery calls for the event loop. Defaults to the number of
+# connections the pool can hand out, so queued queries wait on the executor instead of a checkout.
+max_workers = int(
+    os.environ.get(
+        "PG_DB_ASYNC_WORKERS",
+        pgquery.db_config["pool_size"] + pgquery.db_config["max_overflow"],
+    )
+)
+
+executor = None
+
+
+def get_executor():
+    global executor
+    if executor is None:
+        logging.info(f"Creating DB executor with {max_workers} workers")
+        executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pgquery"
+        )
+    return executor
+
+
+async def run(func, *args, **kwargs):
+    # Runs a blocking database call on the DB executor so the event loop keeps serving requests
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+async def query_db(query_string, params=None, mapping=False):
+    return await run(pgquery.query_db, query_string, params, mapping=mapping)
+
+
+async def write_db(query_string, params=None):
+    await run(pgquery.write_db, query_string, params)
+
+
+def run_transaction(func):
+    with pgquery.transaction() as transaction:
+        return func(transaction)
+
+
+async def transaction(func):
+    # Calls func with a pgquery.Transaction on the DB executor. Every statement func issues is
+    # committed together, or rolled back if it raises.
+    return await run(run_transaction, func)
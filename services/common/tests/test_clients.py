@@ -0,0 +1,123 @@
+import os
+from unittest.mock import MagicMock, patch
+
+import pytest
+from common import clients
+
+
+@pytest.fixture(autouse=True)
+def reset_clients():
+    clients.reset()
+    yield
+    clients.reset()
+
+
+def test_get_client_reuses_client():
+    factory = MagicMock()
+
+    first = clients.get_client("key", factory)
+    second = clients.get_client("key", factory)
+
+    factory.assert_called_once()
+    assert first is second
+
+
+def test_get_client_separate_keys():
+    factory = MagicMock(side_effect=[MagicMock(), MagicMock()])
+
+    first = clients.get_client("one", factory)
+    second = clients.get_client("two", factory)
+
+    assert factory.call_count == 2
+    assert first is not second
+
+
+@patch("common.clients.time.monotonic")
+def test_get_client_health_check_interval(mock_monotonic):
+    factory = MagicMock()
+    health_check = MagicMock()
+    mock_monotonic.return_value = 100
+
+    clients.get_client("key", factory, health_check)
+    mock_monotonic.return_value = 100 + clients.health_check_interval - 1
+    clients.get_client("key", factory, health_check)
+    health_check.assert_not_called()
+
+    mock_monotonic.return_value = 100 + clients.health_check_interval
+    clients.get_client("key", factory, health_check)
+    health_check.assert_called_once_with(factory.return_value)
+    factory.assert_called_once()
+
+
+@patch("common.clients.time.monotonic")
+def test_get_client_health_check_failed(mock_monotonic):
+    old_client = MagicMock()
+    new_client = MagicMock()
+    factory = MagicMock(side_effect=[old_client, new_client])
+    health_check = MagicMock(side_effect=Exception("unreachable"))
+    mock_monotonic.return_value = 100
+
+    clients.get_client("key", factory, health_check)
+    mock_monotonic.return_value = 100 + clients.health_check_interval
+    result = clients.get_client("key", factory, health_check)
+
+    assert result is new_client
+    old_client.close.assert_called_once()
+    assert factory.call_count == 2
+
+
+def test_get_client_factory_failed():
+    factory = MagicMock(side_effect=[Exception("Failed to connect"), MagicMock()])
+
+    with pytest.raises(Exception):
+        clients.get_client("key", factory)
+    clients.get_client("key", factory)
+
+    assert factory.call_count == 2
+
+
+def test_reset():
+    factory = MagicMock(side_effect=[MagicMock(), MagicMock()])
+
+    first = clients.get_client("key", factory)
+    clients.reset()
+    second = clients.get_client("key", factory)
+
+    first.close.assert_not_called()
+    assert first is not second
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_reset_after_fork():
+    clients.get_client("key", MagicMock())
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.write(write_fd, str(len(clients.clients)).encode())
+        os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    child_count = os.read(read_fd, 16)
+    os.close(read_fd)
+
+    assert child_count == b"0"
+    assert len(clients.clients) == 1
+
+
+@patch("common.clients.MongoClient")
+def test_get_mongo_client(mock_mongo):
+    result = clients.get_mongo_client("uri")
+
+    mock_mongo.assert_called_once_with("uri", serverSelectionTimeoutMS=5000)
+    assert result is mock_mongo.return_value
+
+
+@patch("common.clients.storage.Client")
+def test_get_storage_client(mock_storage_client):
+    first = clients.get_storage_client("test-project")
+    second = clients.get_storage_client("test-project")
+
+    mock_storage_client.assert_called_once_with("test-project")
+    assert first is second
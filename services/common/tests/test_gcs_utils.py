@@ -1,13 +1,22 @@
 from unittest.mock import patch, MagicMock
 import os
+import pytest
 from common import gcs_utils
+import common.clients as clients
+
+
+@pytest.fixture(autouse=True)
+def reset_clients():
+    clients.reset()
+    yield
+    clients.reset()
 
 
 @patch.dict(
     os.environ, {"GCP_PROJECT": "test-project", "BLOB_STORAGE_BUCKET": "test-bucket"}
 )
 @patch("common.gcs_utils.logging")
-@patch("common.gcs_utils.storage.Client")
+@patch("common.clients.storage.Client")
 def test_download_gcp_blob(mock_storage_client, mock_logging):
     # mock
     mock_client = mock_storage_client.return_value
@@ -32,7 +41,7 @@ def test_download_gcp_blob(mock_storage_client, mock_logging):
 @patch.dict(
     os.environ, {"GCP_PROJECT": "test-project", "BLOB_STORAGE_BUCKET": "test-bucket"}
 )
-@patch("common.gcs_utils.storage.Client")
+@patch("common.clients.storage.Client")
 def test_list_gcs_blobs(mock_storage_client):
     # mock
     mock_client = mock_storage_client.return_value
@@ -61,7 +70,7 @@ def test_list_gcs_blobs(mock_storage_client):
 @patch.dict(
     os.environ, {"GCP_PROJECT": "test-project", "BLOB_STORAGE_BUCKET": "test-bucket"}
 )
-@patch("common.gcs_utils.storage.Client")
+@patch("common.clients.storage.Client")
 def test_list_gcs_blobs_empty(mock_storage_client):
     # mock
     mock_client = mock_storage_client.return_value
@@ -1,6 +1,7 @@
-from unittest.mock import MagicMock, patch, Mock
+from unittest.mock import MagicMock, patch, Mock, call
 from common import pgquery
 import sqlalchemy
+import pg8000.dbapi
 import os
 
 
@@ -236,3 +237,409 @@ def test_write_db():
 
     # check that init_connection_engine was called once
     pgquery.init_connection_engine.assert_called_once()
+
+
+# test that query_db runs parameterized queries as prepared statements on a raw pooled connection
+@patch("common.pgquery.db", new=None)
+@patch("common.pgquery.PreparedStatement")
+def test_query_db_params(mock_prepared_statement):
+    mock_conn = MagicMock(info={})
+    mock_conn.driver_connection._in_transaction = False
+    mock_conn.driver_connection.autocommit = False
+    mock_engine = MagicMock()
+    mock_engine.raw_connection.return_value = mock_conn
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+    mock_prepared_statement.return_value.run.return_value = "myresult"
+
+    # call function
+    query = "SELECT * FROM mytable WHERE name = :name"
+    result = pgquery.query_db(query, {"name": "value"})
+
+    # check return value
+    assert result == "myresult"
+
+    # check that the statement was prepared and run with the bound parameters
+    mock_prepared_statement.assert_called_once_with(mock_conn.driver_connection, query)
+    mock_prepared_statement.return_value.run.assert_called_once_with(name="value")
+    mock_conn.driver_connection.execute_simple.assert_called_once_with(
+        "begin transaction"
+    )
+    mock_conn.commit.assert_not_called()
+    mock_conn.close.assert_called_once()
+
+
+# test that write_db commits parameterized writes
+@patch("common.pgquery.db", new=None)
+@patch("common.pgquery.PreparedStatement")
+def test_write_db_params(mock_prepared_statement):
+    mock_conn = MagicMock(info={})
+    mock_engine = MagicMock()
+    mock_engine.raw_connection.return_value = mock_conn
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+
+    # call function
+    query = "INSERT INTO mytable (name) VALUES (:name)"
+    pgquery.write_db(query, {"name": "value"})
+
+    # check that the write was committed and the connection returned to the pool
+    mock_prepared_statement.return_value.run.assert_called_once_with(name="value")
+    mock_conn.commit.assert_called_once()
+    mock_conn.rollback.assert_not_called()
+    mock_conn.close.assert_called_once()
+
+
+# test that a failed parameterized query is rolled back
+@patch("common.pgquery.db", new=None)
+@patch("common.pgquery.PreparedStatement")
+def test_write_db_params_exception(mock_prepared_statement):
+    mock_conn = MagicMock(info={})
+    mock_engine = MagicMock()
+    mock_engine.raw_connection.return_value = mock_conn
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+    mock_prepared_statement.return_value.run.side_effect = Exception("failed")
+
+    # call function
+    try:
+        pgquery.write_db("DELETE FROM mytable WHERE id = :id", {"id": 1})
+        assert False
+    except Exception as e:
+        assert str(e) == "failed"
+
+    mock_conn.commit.assert_not_called()
+    mock_conn.rollback.assert_called_once()
+    mock_conn.close.assert_called_once()
+
+
+# test that prepared statements are reused per connection and evicted once the cache is full
+@patch("common.pgquery.statement_cache_size", new=2)
+@patch("common.pgquery.PreparedStatement")
+def test_get_prepared_statement_cache(mock_prepared_statement):
+    mock_conn = MagicMock(info={})
+    mock_prepared_statement.side_effect = lambda conn, query: MagicMock(query=query)
+
+    first = pgquery.get_prepared_statement(mock_conn, "SELECT 1")
+    assert pgquery.get_prepared_statement(mock_conn, "SELECT 1") is first
+    assert mock_prepared_statement.call_count == 1
+
+    pgquery.get_prepared_statement(mock_conn, "SELECT 2")
+    pgquery.get_prepared_statement(mock_conn, "SELECT 3")
+
+    # the least recently used statement is deallocated
+    first.close.assert_called_once()
+    assert list(mock_conn.info["prepared_statements"]) == ["SELECT 2", "SELECT 3"]
+
+
+# test that bulk_insert streams all rows through a single COPY and commits once
+@patch("common.pgquery.db", new=None)
+def test_bulk_insert():
+    mock_conn = MagicMock(info={})
+    mock_cursor = mock_conn.cursor.return_value
+    streamed = []
+    mock_cursor.execute.side_effect = lambda query, stream: streamed.append(
+        stream.read()
+    )
+    mock_engine = MagicMock()
+    mock_engine.raw_connection.return_value = mock_conn
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+
+    # call function
+    rows = [(1, "value", None), (2, "a,b", "1")]
+    pgquery.bulk_insert("public.mytable", ["id", "name", "flag"], rows)
+
+    # check that one COPY was executed with the CSV encoded rows
+    mock_cursor.execute.assert_called_once()
+    assert (
+        mock_cursor.execute.call_args[0][0]
+        == "COPY public.mytable (id, name, flag) FROM STDIN WITH (FORMAT csv)"
+    )
+    assert streamed == ['1,value,\r\n2,"a,b",1\r\n']
+    mock_conn.commit.assert_called_once()
+    mock_conn.close.assert_called_once()
+
+
+# test that bulk_insert does not connect when there are no rows
+@patch("common.pgquery.db", new=None)
+def test_bulk_insert_empty():
+    pgquery.init_connection_engine = MagicMock()
+
+    pgquery.bulk_insert("public.mytable", ["id"], [])
+
+    pgquery.init_connection_engine.assert_not_called()
+
+
+# test that bulk_delete runs every key through one prepared statement and commits once
+@patch("common.pgquery.db", new=None)
+@patch("common.pgquery.PreparedStatement")
+def test_bulk_delete(mock_prepared_statement):
+    mock_conn = MagicMock(info={})
+    mock_engine = MagicMock()
+    mock_engine.raw_connection.return_value = mock_conn
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+
+    # call function
+    keys = [{"id": 1, "type": 2}, {"id": 3, "type": 4}]
+    pgquery.bulk_delete("public.mytable", keys)
+
+    # check
+    mock_prepared_statement.assert_called_once_with(
+        mock_conn.driver_connection,
+        "DELETE FROM public.mytable WHERE id = :id AND type = :type",
+    )
+    mock_prepared_statement.return_value.run.assert_has_calls(
+        [call(id=1, type=2), call(id=3, type=4)]
+    )
+    mock_conn.commit.assert_called_once()
+    mock_conn.close.assert_called_once()
+
+
+# test that every statement in a transaction shares one connection and a single commit
+@patch("common.pgquery.db", new=None)
+@patch("common.pgquery.PreparedStatement")
+def test_transaction(mock_prepared_statement):
+    mock_conn = MagicMock(info={})
+    mock_engine = MagicMock()
+    mock_engine.raw_connection.return_value = mock_conn
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+    mock_conn.cursor.return_value.fetchall.return_value = "myresult"
+
+    # call function
+    with pgquery.transaction() as transaction:
+        transaction.write_db("DELETE FROM mytable WHERE id = :id", {"id": 1})
+        transaction.write_db("DELETE FROM othertable")
+        result = transaction.query_db("SELECT * FROM mytable")
+
+    # check
+    assert result == "myresult"
+    mock_engine.raw_connection.assert_called_once()
+    mock_prepared_statement.return_value.run.assert_called_once_with(id=1)
+    mock_conn.cursor.return_value.execute.assert_has_calls(
+        [call("DELETE FROM othertable"), call("SELECT * FROM mytable")]
+    )
+    mock_conn.commit.assert_called_once()
+    mock_conn.rollback.assert_not_called()
+    mock_conn.close.assert_called_once()
+
+
+# test that a failed transaction is rolled back without committing
+@patch("common.pgquery.db", new=None)
+def test_transaction_exception():
+    mock_conn = MagicMock(info={})
+    mock_engine = MagicMock()
+    mock_engine.raw_connection.return_value = mock_conn
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+    mock_conn.cursor.return_value.execute.side_effect = [
+        None,
+        pg8000.dbapi.DatabaseError({"C": "23505", "D": "Key (name)=(test) exists."}),
+    ]
+
+    # call function
+    try:
+        with pgquery.transaction() as transaction:
+            transaction.write_db("UPDATE mytable SET name = 'test'")
+            transaction.write_db("INSERT INTO mytable (name) VALUES ('test')")
+        assert False
+    except sqlalchemy.exc.IntegrityError as e:
+        assert e.orig.args[0]["D"] == "Key (name)=(test) exists."
+
+    mock_conn.commit.assert_not_called()
+    mock_conn.rollback.assert_called_once()
+    mock_conn.close.assert_called_once()
+
+
+# test that non-integrity driver errors are raised as generic SQLAlchemy database errors
+def test_translate_error():
+    error = pg8000.dbapi.DatabaseError({"C": "42P01", "M": "relation does not exist"})
+    result = pgquery.translate_error(error)
+    assert type(result) == sqlalchemy.exc.DatabaseError
+    assert result.orig == error
+
+
+def fresh_pool_counters():
+    return {
+        "checkouts": 0,
+        "timeouts": 0,
+        "recycled": 0,
+        "wait_total": 0.0,
+        "wait_max": 0.0,
+        "wait_histogram": [0] * 7,
+    }
+
+
+@patch("common.pgquery.db", new=None)
+@patch("common.pgquery.pool_stats_interval", new=0)
+@patch("common.pgquery.db_config", new={"pool_size": 10, "max_overflow": 4})
+def test_pool_stats():
+    with patch("common.pgquery.pool_counters", new=fresh_pool_counters()):
+        pgquery.checkout(MagicMock(return_value="conn"))
+        pgquery.record_checkout(0.5)
+        pgquery.record_checkout(40)
+
+        stats = pgquery.pool_stats()
+
+    assert stats["pool_size"] == 10
+    assert stats["max_overflow"] == 4
+    assert stats["checked_out"] == 0
+    assert stats["checkouts"] == 3
+    assert stats["timeouts"] == 0
+    assert stats["wait_max"] == 40
+    assert stats["wait_histogram"]["<=1s"] == 1
+    assert stats["wait_histogram"][">30s"] == 1
+    assert sum(stats["wait_histogram"].values()) == 3
+
+
+@patch("common.pgquery.db", new=None)
+@patch("common.pgquery.db_config", new={"pool_size": 5, "max_overflow": 2})
+def test_checkout_timeout():
+    connect = MagicMock(side_effect=sqlalchemy.exc.TimeoutError("pool exhausted"))
+    with patch("common.pgquery.pool_counters", new=fresh_pool_counters()):
+        try:
+            pgquery.checkout(connect)
+            assert False
+        except sqlalchemy.exc.TimeoutError:
+            pass
+
+        stats = pgquery.pool_stats()
+
+    assert stats["timeouts"] == 1
+    assert stats["checkouts"] == 0
+
+
+@patch("common.pgquery.db", new=None)
+@patch("common.pgquery.db_config", new={"pool_size": 5, "max_overflow": 2})
+@patch("common.pgquery.logging")
+def test_pool_stats_logged_periodically(mock_logging):
+    with patch("common.pgquery.pool_counters", new=fresh_pool_counters()), patch(
+        "common.pgquery.pool_stats_interval", new=300
+    ), patch("common.pgquery.pool_stats_logged", new=0), patch(
+        "common.pgquery.time.monotonic", return_value=1000
+    ):
+        pgquery.record_checkout(0.1)
+        pgquery.record_checkout(0.1)
+
+    mock_logging.info.assert_called_once()
+
+
+@patch("common.pgquery.db", new=None)
+@patch("common.pgquery.db_config", new={"pool_size": 5, "max_overflow": 2})
+def test_count_recycle():
+    record = Mock()
+    with patch("common.pgquery.pool_counters", new=fresh_pool_counters()):
+        pgquery.count_recycle(Mock(), record)
+        pgquery.count_recycle(Mock(), Mock())
+        pgquery.count_recycle(Mock(), record)
+
+        stats = pgquery.pool_stats()
+
+    assert stats["recycled"] == 1
+
+
+@patch("common.pgquery.db", new=None)
+def test_stream_db():
+    mock_engine = MagicMock()
+    mock_conn = mock_engine.raw_connection.return_value
+    driver_conn = mock_conn.driver_connection
+    driver_conn._in_transaction = False
+    driver_conn.autocommit = False
+    driver_conn.execute_simple.side_effect = [
+        Mock(),
+        Mock(rows=[["row1"], ["row2"]]),
+        Mock(rows=[["row3"]]),
+        Mock(rows=[]),
+    ]
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+
+    # call function
+    query = "SELECT * FROM mytable WHERE name = :name"
+    result = list(pgquery.stream_db(query, {"name": "test"}, batch_size=2))
+
+    # check return value
+    assert result == [["row1"], ["row2"], ["row3"]]
+
+    # check that the cursor was declared with the bound parameters and fetched in batches
+    driver_conn.execute_unnamed.assert_called_once_with(
+        "DECLARE pgquery_stream NO SCROLL CURSOR FOR SELECT * FROM mytable WHERE name = $1",
+        ("test",),
+    )
+    driver_conn.execute_simple.assert_has_calls(
+        [
+            call("begin transaction"),
+            call("FETCH FORWARD 2 FROM pgquery_stream"),
+            call("FETCH FORWARD 2 FROM pgquery_stream"),
+            call("FETCH FORWARD 2 FROM pgquery_stream"),
+        ]
+    )
+    mock_conn.commit.assert_not_called()
+    mock_conn.close.assert_called_once()
+
+
+@patch("common.pgquery.db", new=None)
+def test_stream_db_closed_early():
+    mock_engine = MagicMock()
+    mock_conn = mock_engine.raw_connection.return_value
+    driver_conn = mock_conn.driver_connection
+    driver_conn._in_transaction = True
+    driver_conn.execute_simple.return_value = Mock(rows=[["row1"], ["row2"]])
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+
+    # call function and stop reading after the first row
+    stream = pgquery.stream_db("SELECT * FROM mytable")
+    assert next(stream) == ["row1"]
+    stream.close()
+
+    # check that the connection was returned to the pool
+    mock_conn.close.assert_called_once()
+
+
+# test that query_db returns rows keyed by column name in mapping mode
+@patch("common.pgquery.db", new=None)
+@patch("common.pgquery.PreparedStatement")
+def test_query_db_params_mapping(mock_prepared_statement):
+    mock_conn = MagicMock(info={})
+    mock_conn.driver_connection._in_transaction = True
+    mock_engine = MagicMock()
+    mock_engine.raw_connection.return_value = mock_conn
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+    mock_prepared_statement.return_value.run.return_value = [[1, "a"], [2, "b"]]
+    mock_prepared_statement.return_value.columns = [{"name": "id"}, {"name": "name"}]
+
+    # call function
+    query = "SELECT id, name FROM mytable WHERE name = :name"
+    result = pgquery.query_db(query, {"name": "value"}, mapping=True)
+
+    # check return value
+    assert result == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+
+
+# test that query_db returns rows keyed by column name in mapping mode without parameters
+@patch("common.pgquery.db", new=None)
+def test_query_db_mapping():
+    mock_engine = MagicMock()
+    mock_conn = mock_engine.connect.return_value.__enter__.return_value
+    mock_conn.execute.return_value.mappings.return_value = [{"id": 1, "name": "a"}]
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+
+    # call function
+    result = pgquery.query_db("SELECT id, name FROM mytable", mapping=True)
+
+    # check return value
+    assert result == [{"id": 1, "name": "a"}]
+    mock_conn.execute.return_value.fetchall.assert_not_called()
+
+
+@patch("common.pgquery.db", new=None)
+def test_stream_db_mapping():
+    mock_engine = MagicMock()
+    driver_conn = mock_engine.raw_connection.return_value.driver_connection
+    driver_conn._in_transaction = True
+    columns = [{"name": "id"}, {"name": "name"}]
+    driver_conn.execute_simple.side_effect = [
+        Mock(rows=[[1, "a"], [2, "b"]], columns=columns),
+        Mock(rows=[], columns=columns),
+    ]
+    pgquery.init_connection_engine = MagicMock(return_value=mock_engine)
+
+    # call function
+    result = list(pgquery.stream_db("SELECT id, name FROM mytable", mapping=True))
+
+    # check return value
+    assert result == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
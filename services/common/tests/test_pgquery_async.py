@@ -0,0 +1,59 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from common import pgquery_async
+
+
+@pytest.mark.asyncio
+@patch("common.pgquery_async.pgquery.query_db")
+async def test_query_db(mock_query_db):
+    mock_query_db.return_value = [{"id": 1}]
+
+    result = await pgquery_async.query_db(
+        "SELECT id FROM mytable WHERE name = :name", {"name": "a"}, mapping=True
+    )
+
+    assert result == [{"id": 1}]
+    mock_query_db.assert_called_once_with(
+        "SELECT id FROM mytable WHERE name = :name", {"name": "a"}, mapping=True
+    )
+
+
+@pytest.mark.asyncio
+@patch("common.pgquery_async.pgquery.write_db")
+async def test_write_db(mock_write_db):
+    await pgquery_async.write_db("DELETE FROM mytable WHERE id = :id", {"id": 1})
+
+    mock_write_db.assert_called_once_with(
+        "DELETE FROM mytable WHERE id = :id", {"id": 1}
+    )
+
+
+@pytest.mark.asyncio
+@patch("common.pgquery_async.pgquery.write_db")
+async def test_write_db_exception(mock_write_db):
+    mock_write_db.side_effect = Exception("test exception")
+
+    with pytest.raises(Exception, match="test exception"):
+        await pgquery_async.write_db("DELETE FROM mytable")
+
+
+@pytest.mark.asyncio
+@patch("common.pgquery_async.pgquery.transaction")
+async def test_transaction(mock_transaction):
+    mock_transaction.return_value.__exit__.return_value = False
+    mock_tx = mock_transaction.return_value.__enter__.return_value
+    func = MagicMock(return_value="result")
+
+    result = await pgquery_async.transaction(func)
+
+    assert result == "result"
+    func.assert_called_once_with(mock_tx)
+
+
+@patch("common.pgquery_async.executor", new=None)
+def test_get_executor():
+    executor = pgquery_async.get_executor()
+
+    assert executor is pgquery_async.get_executor()
+    assert executor._max_workers == pgquery_async.max_workers
+    executor.shutdown()
@@ -1,48 +1,56 @@
 from mock import MagicMock, call, patch
+from datetime import datetime
 from common import update_rsu_snmp_pg
 from common.tests.data import test_update_rsu_snm_pg_data
 
 
-@patch("common.update_rsu_snmp_pg.pgquery.write_db")
-def test_insert_config_list(mock_write_db):
+@patch("common.update_rsu_snmp_pg.pgquery.bulk_insert")
+def test_insert_config_list(mock_bulk_insert):
     # call
     update_rsu_snmp_pg.insert_config_list(test_update_rsu_snm_pg_data.snmp_config_data)
 
     # check
-    expected_query = (
-        "INSERT INTO public.snmp_msgfwd_config("
-        "rsu_id, msgfwd_type, snmp_index, message_type, dest_ipv4, dest_port, start_datetime, end_datetime, active) "
-        "VALUES "
-        "(1, 2, 1, 'BSM', '5.5.5.5', 46800, '2024-02-05 00:00', '2034-02-05 00:00', '1'), "
-        "(2, 3, 1, 'MAP', '5.5.5.5', 44920, '2024-02-05 00:00', '2034-02-05 00:00', '1')"
+    expected_columns = [
+        "rsu_id",
+        "msgfwd_type",
+        "snmp_index",
+        "message_type",
+        "dest_ipv4",
+        "dest_port",
+        "start_datetime",
+        "end_datetime",
+        "active",
+    ]
+    expected_rows = [
+        [1, 2, 1, "BSM", "5.5.5.5", 46800, "2024-02-05 00:00", "2034-02-05 00:00", "1"],
+        [2, 3, 1, "MAP", "5.5.5.5", 44920, "2024-02-05 00:00", "2034-02-05 00:00", "1"],
+    ]
+    mock_bulk_insert.assert_called_once_with(
+        "public.snmp_msgfwd_config", expected_columns, expected_rows
     )
-    mock_write_db.assert_called_with(expected_query)
 
 
-@patch("common.update_rsu_snmp_pg.pgquery.write_db")
-def test_delete_config_list(mock_write_db):
+@patch("common.update_rsu_snmp_pg.pgquery.bulk_delete")
+def test_delete_config_list(mock_bulk_delete):
     # call
     update_rsu_snmp_pg.delete_config_list(test_update_rsu_snm_pg_data.snmp_config_data)
 
     # check
-    mock_write_db.assert_has_calls(
+    mock_bulk_delete.assert_called_once_with(
+        "public.snmp_msgfwd_config",
         [
-            call(
-                "DELETE FROM public.snmp_msgfwd_config WHERE rsu_id=1 AND msgfwd_type=2 AND snmp_index=1"
-            ),
-            call(
-                "DELETE FROM public.snmp_msgfwd_config WHERE rsu_id=2 AND msgfwd_type=3 AND snmp_index=1"
-            ),
-        ]
+            {"rsu_id": 1, "msgfwd_type": 2, "snmp_index": 1},
+            {"rsu_id": 2, "msgfwd_type": 3, "snmp_index": 1},
+        ],
     )
 
 
 @patch("common.update_rsu_snmp_pg.pgquery.query_db")
 def test_get_msgfwd_types(mock_query_db):
     mock_query_db.return_value = [
-        ({"snmp_msgfwd_type_id": 1, "name": "rsuDsrcFwd"},),
-        ({"snmp_msgfwd_type_id": 2, "name": "rsuReceivedMsg"},),
-        ({"snmp_msgfwd_type_id": 3, "name": "rsuXmitMsgFwding"},),
+        {"snmp_msgfwd_type_id": 1, "name": "rsuDsrcFwd"},
+        {"snmp_msgfwd_type_id": 2, "name": "rsuReceivedMsg"},
+        {"snmp_msgfwd_type_id": 3, "name": "rsuXmitMsgFwding"},
     ]
 
     # call
@@ -52,35 +60,31 @@ def test_get_msgfwd_types(mock_query_db):
     assert result == test_update_rsu_snm_pg_data.msgfwd_types
 
 
-@patch("common.update_rsu_snmp_pg.pgquery.query_db")
-def test_get_config_list(mock_query_db):
-    mock_query_db.return_value = [
-        (
-            {
-                "rsu_id": 1,
-                "msgfwd_type": "rsuReceivedMsg",
-                "snmp_index": 1,
-                "message_type": "BSM",
-                "dest_ipv4": "5.5.5.5",
-                "dest_port": 46800,
-                "start_datetime": "2024-02-05T00:00:00",
-                "end_datetime": "2034-02-05T00:00:00",
-                "active": "1",
-            },
-        ),
-        (
-            {
-                "rsu_id": 2,
-                "msgfwd_type": "rsuXmitMsgFwding",
-                "snmp_index": 1,
-                "message_type": "MAP",
-                "dest_ipv4": "5.5.5.5",
-                "dest_port": 44920,
-                "start_datetime": "2024-02-05T00:00:00",
-                "end_datetime": "2034-02-05T00:00:00",
-                "active": "1",
-            },
-        ),
+@patch("common.update_rsu_snmp_pg.pgquery.stream_db")
+def test_get_config_list(mock_stream_db):
+    mock_stream_db.return_value = [
+        {
+            "rsu_id": 1,
+            "msgfwd_type": "rsuReceivedMsg",
+            "snmp_index": 1,
+            "message_type": "BSM",
+            "dest_ipv4": "5.5.5.5",
+            "dest_port": 46800,
+            "start_datetime": datetime(2024, 2, 5),
+            "end_datetime": datetime(2034, 2, 5),
+            "active": "1",
+        },
+        {
+            "rsu_id": 2,
+            "msgfwd_type": "rsuXmitMsgFwding",
+            "snmp_index": 1,
+            "message_type": "MAP",
+            "dest_ipv4": "5.5.5.5",
+            "dest_port": 44920,
+            "start_datetime": datetime(2024, 2, 5),
+            "end_datetime": datetime(2034, 2, 5),
+            "active": "1",
+        },
     ]
 
     # call
@@ -1,4 +1,5 @@
 import datetime
+from unittest.mock import patch
 
 import pytz
 from common import util
@@ -67,3 +68,47 @@ def test_validation_file_type_failure():
     file_extension = ".tar"
     validation = util.validate_file_type(file_name, file_extension)
     assert validation == False
+
+
+def test_ttl_cache():
+    cache = util.TTLCache(2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    assert cache.get("a") == 1
+    assert cache.get("b") == 2
+    assert cache.get("c") == None
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = util.TTLCache(2)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    cache.get("a")
+    cache.set("c", 3, 60)
+    assert cache.get("a") == 1
+    assert cache.get("b") == None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+@patch("common.util.time.monotonic")
+def test_ttl_cache_expired(mock_monotonic):
+    cache = util.TTLCache(10)
+    mock_monotonic.return_value = 100
+    cache.set("a", 1, 30)
+    cache.set("b", 2, 0)
+    mock_monotonic.return_value = 131
+    assert cache.get("a") == None
+    assert cache.get("b") == None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_pop_clear():
+    cache = util.TTLCache(10)
+    cache.set("a", 1, 60)
+    cache.set("b", 2, 60)
+    cache.pop("a")
+    cache.pop("missing")
+    assert cache.get("a") == None
+    cache.clear()
+    assert cache.get("b") == None
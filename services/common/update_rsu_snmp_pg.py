@@ -2,51 +2,48 @@ import os
 import logging
 import common.pgquery as pgquery
 import common.rsufwdsnmpwalk as rsufwdsnmpwalk
-from datetime import datetime
 
+config_columns = [
+    "rsu_id",
+    "msgfwd_type",
+    "snmp_index",
+    "message_type",
+    "dest_ipv4",
+    "dest_port",
+    "start_datetime",
+    "end_datetime",
+    "active",
+]
 
-def insert_config_list(snmp_config_list):
-    query = (
-        "INSERT INTO public.snmp_msgfwd_config("
-        "rsu_id, msgfwd_type, snmp_index, message_type, dest_ipv4, dest_port, start_datetime, end_datetime, active) "
-        "VALUES"
-    )
 
-    for snmp_config in snmp_config_list:
-        query += (
-            f" ({snmp_config['rsu_id']}, {snmp_config['msgfwd_type']}, {snmp_config['snmp_index']}, "
-            f"'{snmp_config['message_type']}', '{snmp_config['dest_ipv4']}', {snmp_config['dest_port']}, "
-            f"'{snmp_config['start_datetime']}', '{snmp_config['end_datetime']}', '{snmp_config['active']}'),"
-        )
-
-    pgquery.write_db(query[:-1])
+def insert_config_list(snmp_config_list):
+    rows = [
+        [snmp_config[column] for column in config_columns]
+        for snmp_config in snmp_config_list
+    ]
+    pgquery.bulk_insert("public.snmp_msgfwd_config", config_columns, rows)
 
 
 def delete_config_list(snmp_config_list):
-    for snmp_config in snmp_config_list:
-        query = (
-            "DELETE FROM public.snmp_msgfwd_config "
-            f"WHERE rsu_id={snmp_config['rsu_id']} AND msgfwd_type={snmp_config['msgfwd_type']} AND snmp_index={snmp_config['snmp_index']}"
-        )
-
-        pgquery.write_db(query)
+    keys = [
+        {
+            "rsu_id": snmp_config["rsu_id"],
+            "msgfwd_type": snmp_config["msgfwd_type"],
+            "snmp_index": snmp_config["snmp_index"],
+        }
+        for snmp_config in snmp_config_list
+    ]
+    pgquery.bulk_delete("public.snmp_msgfwd_config", keys)
 
 
 def get_msgfwd_types():
-    query = (
-        "SELECT to_jsonb(row) "
-        "FROM ("
-        "SELECT snmp_msgfwd_type_id, name "
-        "FROM public.snmp_msgfwd_type"
-        ") as row"
-    )
+    query = "SELECT snmp_msgfwd_type_id, name FROM public.snmp_msgfwd_type"
 
     # Query PostgreSQL for the list of SNMP message forwarding types
-    data = pgquery.query_db(query)
+    data = pgquery.query_db(query, mapping=True)
 
     msgfwd_types = {}
     for row in data:
-        row = dict(row[0])
         msgfwd_types[row["name"]] = row["snmp_msgfwd_type_id"]
 
     return msgfwd_types
@@ -54,9 +51,7 @@ def get_msgfwd_types():
 
 def get_config_list(rsu_obj={}):
     query = (
-        "SELECT to_jsonb(row) "
-        "FROM ("
-        "SELECT rsu_id, smt.name msgfwd_type, snmp_index, message_type, dest_ipv4, dest_port, start_datetime, end_datetime, active "
+        "SELECT rsu_id, smt.name msgfwd_type, snmp_index, message_type, host(dest_ipv4) AS dest_ipv4, dest_port, start_datetime, end_datetime, active "
         "FROM public.snmp_msgfwd_config smc "
         "JOIN public.snmp_msgfwd_type smt ON smc.msgfwd_type = smt.snmp_msgfwd_type_id"
     )
@@ -69,20 +64,13 @@ def get_config_list(rsu_obj={}):
         # Trim off the last " OR " which is 4 characters long
         query = query[:-4]
 
-    query += ") as row"
-
     # Query PostgreSQL for the list of SNMP message forwarding configurations tracked in PostgreSQL
-    data = pgquery.query_db(query)
+    data = pgquery.stream_db(query, mapping=True)
 
     config_list = []
     for row in data:
-        row = dict(row[0])
-        row["start_datetime"] = datetime.strptime(
-            row["start_datetime"], "%Y-%m-%dT%H:%M:%S"
-        ).strftime("%Y-%m-%d %H:%M")
-        row["end_datetime"] = datetime.strptime(
-            row["end_datetime"], "%Y-%m-%dT%H:%M:%S"
-        ).strftime("%Y-%m-%d %H:%M")
+        row["start_datetime"] = row["start_datetime"].strftime("%Y-%m-%d %H:%M")
+        row["end_datetime"] = row["end_datetime"].strftime("%Y-%m-%d %H:%M")
         config_list.append(row)
 
     return config_list
@@ -1,7 +1,10 @@
 from dateutil.parser import parse
+from collections import OrderedDict
 import pytz
 import os
 import logging
+import threading
+import time
 
 
 # expects datetime string
@@ -58,3 +61,48 @@ def validate_file_type(file_name, extension=".tar"):
         )
         return False
     return True
+
+
+class TTLCache:
+    """Thread-safe least recently used cache whose entries expire after a per-entry time to live.
+
+    Args:
+        max_size (int): The maximum number of entries kept before the least recently used is evicted.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)